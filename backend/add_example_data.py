@@ -2,6 +2,7 @@
 Script to add example deck and card for user 'asd'
 """
 from database import SessionLocal
+import counters  # noqa: F401  (maintains the deck counters)
 from models import User, Deck, Card, UserCardProgress
 from datetime import datetime
 
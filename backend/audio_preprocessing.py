@@ -0,0 +1,223 @@
+"""
+Audio normalization before speech-to-text
+
+Decodes WAV (PCM 8/16/24/32-bit, 32/64-bit float) and raw 16-bit PCM
+(audio/l16, audio/pcm with rate/channels parameters), then:
+1. downmixes to mono
+2. resamples to 16 kHz (windowed-sinc low-pass + interpolation)
+3. trims leading and trailing silence with an energy-based VAD
+4. re-encodes as 16-bit mono WAV
+
+Formats that can't be decoded here (webm/opus, mp3, ...) pass through
+unchanged. Pure Python/NumPy so it runs in the slim container.
+"""
+import os
+import io
+import struct
+import time
+import wave
+from typing import NamedTuple, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # Lightweight deployments without NumPy skip preprocessing
+    np = None
+
+AUDIO_PREPROCESSING_ENABLED = os.getenv("AUDIO_PREPROCESSING_ENABLED", "true").lower() == "true"
+TARGET_SAMPLE_RATE = int(os.getenv("AUDIO_TARGET_SAMPLE_RATE", "16000"))
+# Frames quieter than this (or than the loudest frame minus SILENCE_RELATIVE_DB) are silence
+SILENCE_THRESHOLD_DBFS = float(os.getenv("AUDIO_SILENCE_THRESHOLD_DBFS", "-45"))
+SILENCE_RELATIVE_DB = float(os.getenv("AUDIO_SILENCE_RELATIVE_DB", "35"))
+VAD_FRAME_MS = 20
+# Audio kept around detected speech so word onsets/tails aren't clipped
+SILENCE_PADDING_MS = int(os.getenv("AUDIO_SILENCE_PADDING_MS", "200"))
+
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_IEEE_FLOAT = 0x0003
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+
+class NormalizedAudio(NamedTuple):
+    audio: bytes
+    mimetype: str
+    stats: dict
+
+
+def _decode_wav(data: bytes) -> Tuple["np.ndarray", int]:
+    """Parse a RIFF/WAVE file into (samples [frames, channels] float32 in [-1, 1], sample_rate)"""
+    if len(data) < 12 or data[:4] != b"RIFF" or data[8:12] != b"WAVE":
+        raise ValueError("Not a WAV file")
+
+    fmt = None
+    samples = None
+    offset = 12
+    while offset + 8 <= len(data):
+        chunk_id, chunk_size = struct.unpack_from("<4sI", data, offset)
+        body = data[offset + 8: offset + 8 + chunk_size]
+        if chunk_id == b"fmt ":
+            format_tag, channels, sample_rate, _, _, bits = struct.unpack_from("<HHIIHH", body)
+            if format_tag == WAVE_FORMAT_EXTENSIBLE and len(body) >= 26:
+                # First two bytes of the SubFormat GUID hold the actual format tag
+                format_tag = struct.unpack_from("<H", body, 24)[0]
+            fmt = (format_tag, channels, sample_rate, bits)
+        elif chunk_id == b"data":
+            samples = body
+        offset += 8 + chunk_size + (chunk_size & 1)  # Chunks are word aligned
+
+    if fmt is None or samples is None:
+        raise ValueError("WAV file is missing fmt or data chunk")
+
+    format_tag, channels, sample_rate, bits = fmt
+    if channels < 1 or sample_rate < 1 or bits < 8:
+        raise ValueError("Invalid WAV format header")
+    width = bits // 8
+    usable = len(samples) - len(samples) % (width * channels)
+    samples = samples[:usable]
+
+    if format_tag == WAVE_FORMAT_IEEE_FLOAT and bits in (32, 64):
+        pcm = np.frombuffer(samples, dtype="<f4" if bits == 32 else "<f8").astype(np.float32)
+    elif format_tag == WAVE_FORMAT_PCM and bits == 8:
+        pcm = (np.frombuffer(samples, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    elif format_tag == WAVE_FORMAT_PCM and bits == 16:
+        pcm = np.frombuffer(samples, dtype="<i2").astype(np.float32) / 32768.0
+    elif format_tag == WAVE_FORMAT_PCM and bits == 24:
+        raw = np.frombuffer(samples, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        values = raw[:, 0] | (raw[:, 1] << 8) | (raw[:, 2] << 16)
+        values = np.where(values >= 1 << 23, values - (1 << 24), values)
+        pcm = values.astype(np.float32) / float(1 << 23)
+    elif format_tag == WAVE_FORMAT_PCM and bits == 32:
+        pcm = np.frombuffer(samples, dtype="<i4").astype(np.float32) / float(1 << 31)
+    else:
+        raise ValueError(f"Unsupported WAV encoding (format {format_tag}, {bits} bits)")
+
+    return pcm.reshape(-1, channels), sample_rate
+
+
+def _decode_raw_pcm(data: bytes, mimetype: str) -> Tuple["np.ndarray", int]:
+    """Decode headerless 16-bit little-endian PCM, e.g. 'audio/l16; rate=48000; channels=2'"""
+    params = {}
+    for part in mimetype.split(";")[1:]:
+        if "=" in part:
+            key, value = part.split("=", 1)
+            params[key.strip().lower()] = value.strip()
+    sample_rate = int(params.get("rate", TARGET_SAMPLE_RATE))
+    channels = int(params.get("channels", 1))
+    if channels < 1 or sample_rate < 1:
+        raise ValueError("Invalid PCM rate or channel count")
+
+    usable = len(data) - len(data) % (2 * channels)
+    pcm = np.frombuffer(data[:usable], dtype="<i2").astype(np.float32) / 32768.0
+    return pcm.reshape(-1, channels), sample_rate
+
+
+def _resample(samples: "np.ndarray", source_rate: int, target_rate: int) -> "np.ndarray":
+    """Resample mono audio; a windowed-sinc low-pass prevents aliasing when downsampling"""
+    if source_rate == target_rate or len(samples) == 0:
+        return samples
+
+    if target_rate < source_rate:
+        cutoff = 0.5 * target_rate / source_rate  # Normalized to the source rate
+        taps = np.arange(-32, 33)
+        kernel = 2 * cutoff * np.sinc(2 * cutoff * taps) * np.hamming(len(taps))
+        kernel /= kernel.sum()
+        samples = np.convolve(samples, kernel.astype(np.float32), mode="same")
+
+    duration = len(samples) / source_rate
+    target_length = int(round(duration * target_rate))
+    source_times = np.arange(len(samples)) / source_rate
+    target_times = np.arange(target_length) / target_rate
+    return np.interp(target_times, source_times, samples).astype(np.float32)
+
+
+def _trim_silence(samples: "np.ndarray", sample_rate: int) -> "np.ndarray":
+    """Drop leading/trailing frames whose energy is below the silence threshold"""
+    frame = max(1, sample_rate * VAD_FRAME_MS // 1000)
+    frame_count = len(samples) // frame
+    if frame_count == 0:
+        return samples
+
+    frames = samples[:frame_count * frame].reshape(frame_count, frame)
+    rms = np.sqrt(np.mean(frames ** 2, axis=1))
+    energy_db = 20 * np.log10(np.maximum(rms, 1e-10))
+
+    threshold = max(SILENCE_THRESHOLD_DBFS, energy_db.max() - SILENCE_RELATIVE_DB)
+    voiced = np.flatnonzero(energy_db > threshold)
+
+    padding = sample_rate * SILENCE_PADDING_MS // 1000
+    if len(voiced) == 0:
+        # Nothing but silence: send a short clip rather than the whole recording
+        return samples[:padding]
+
+    start = max(0, voiced[0] * frame - padding)
+    end = min(len(samples), (voiced[-1] + 1) * frame + padding)
+    return samples[start:end]
+
+
+def _encode_wav(samples: "np.ndarray", sample_rate: int) -> bytes:
+    pcm = (np.clip(samples, -1.0, 1.0) * 32767).astype("<i2")
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(pcm.tobytes())
+    return buffer.getvalue()
+
+
+def _decode(data: bytes, mimetype: str) -> Optional[Tuple["np.ndarray", int]]:
+    """Decode supported formats; None means pass the audio through untouched"""
+    base_type = mimetype.split(";")[0].strip().lower()
+    if data[:4] == b"RIFF" and data[8:12] == b"WAVE":
+        return _decode_wav(data)
+    if base_type in ("audio/l16", "audio/pcm", "audio/x-pcm"):
+        return _decode_raw_pcm(data, mimetype)
+    return None
+
+
+def normalize_audio(data: bytes, mimetype: str = "audio/*") -> NormalizedAudio:
+    """
+    Downmix, resample and trim audio for transcription
+
+    Args:
+        data: Encoded audio
+        mimetype: Content type, including parameters for raw PCM
+
+    Returns:
+        NormalizedAudio(audio, mimetype, stats); stats["normalized"] is False
+        when the format isn't supported and the input is returned unchanged,
+        and stats["decode_error"] says why if a supported format failed to decode
+    """
+    started = time.perf_counter()
+    stats = {"normalized": False, "bytes_before": len(data), "bytes_after": len(data)}
+
+    if not AUDIO_PREPROCESSING_ENABLED or np is None:
+        return NormalizedAudio(data, mimetype, stats)
+
+    try:
+        decoded = _decode(data, mimetype)
+    except (ValueError, struct.error) as e:
+        # Malformed WAV/PCM is passed through and counted (see deepgram_utils.get_upload_stats)
+        stats["decode_error"] = str(e)
+        decoded = None
+    if decoded is None:
+        return NormalizedAudio(data, mimetype, stats)
+
+    samples, sample_rate = decoded
+    channels = samples.shape[1]
+    duration_before = len(samples) / sample_rate if sample_rate else 0.0
+
+    mono = samples.mean(axis=1) if channels > 1 else samples[:, 0]
+    mono = _resample(mono, sample_rate, TARGET_SAMPLE_RATE)
+    mono = _trim_silence(mono, TARGET_SAMPLE_RATE)
+    audio = _encode_wav(mono, TARGET_SAMPLE_RATE)
+
+    stats.update({
+        "normalized": True,
+        "bytes_after": len(audio),
+        "sample_rate_before": sample_rate,
+        "channels_before": channels,
+        "seconds_before": duration_before,
+        "seconds_after": len(mono) / TARGET_SAMPLE_RATE,
+        "processing_ms": 1000 * (time.perf_counter() - started),
+    })
+    return NormalizedAudio(audio, "audio/wav", stats)
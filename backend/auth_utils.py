@@ -1,12 +1,19 @@
 import os
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
-from typing import Optional
+from typing import NamedTuple, Optional
 from jose import JWTError, jwt
 import bcrypt
 from dotenv import load_dotenv
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, object_session
+from cache_utils import TTLCache
+from database import SessionLocal, engine, get_async_db, get_db, read_sessionmaker_for
+from models import User
 
 load_dotenv()
 
@@ -14,15 +21,68 @@ SECRET_KEY = os.getenv("SECRET_KEY", "dev-secret-key-change-in-production")
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
 
+# Authenticated principals cached per user id, so most requests skip the users lookup
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", "10000"))
+AUTH_CACHE_TTL_SECONDS = float(os.getenv("AUTH_CACHE_TTL_SECONDS", "60"))
+
+# bcrypt work factor for new hashes; existing hashes are migrated on login
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# Threads reserved for password hashing, separate from the request threadpool
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+
 security = HTTPBearer()
 
+_password_executor = None
+
+
+class AuthenticatedUser(NamedTuple):
+    """Lightweight principal returned by get_current_user (routers only need id/username)"""
+    id: int
+    username: str
+
+
+principal_cache = TTLCache(AUTH_CACHE_SIZE, AUTH_CACHE_TTL_SECONDS)
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
 
 def get_password_hash(password: str) -> str:
-    salt = bcrypt.gensalt()
+    salt = bcrypt.gensalt(rounds=BCRYPT_ROUNDS)
     return bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
 
+def needs_rehash(hashed_password: str) -> bool:
+    """True if the hash was made with a cost other than BCRYPT_ROUNDS ($2b$<cost>$...)"""
+    try:
+        return int(hashed_password.split("$")[2]) != BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return True
+
+def _get_password_executor() -> ThreadPoolExecutor:
+    global _password_executor
+    if _password_executor is None:
+        _password_executor = ThreadPoolExecutor(
+            max_workers=PASSWORD_HASH_WORKERS,
+            thread_name_prefix="password-hash"
+        )
+    return _password_executor
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """verify_password on the dedicated hashing pool, so logins can't starve other endpoints"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_password_executor(), verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    """get_password_hash on the dedicated hashing pool"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_password_executor(), get_password_hash, password)
+
+def shutdown_password_executor() -> None:
+    """Stop the hashing pool (called on app shutdown)"""
+    global _password_executor
+    if _password_executor is not None:
+        _password_executor.shutdown(wait=False, cancel_futures=True)
+        _password_executor = None
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -40,44 +100,168 @@ def decode_access_token(token: str):
     except JWTError:
         return None
 
+def _token_claims(token: str):
+    """(username, user_id or None) from a valid token, else None"""
+    payload = decode_access_token(token)
+    if payload is None:
+        return None
+    
+    username: str = payload.get("sub")
+    if username is None:
+        return None
+    
+    return username, payload.get("uid")
+
+def _cached_principal(username: str, user_id: int):
+    """(hit, principal) from principal_cache; a hit for another username is a rejection"""
+    principal = principal_cache.get(user_id)
+    if principal is None:
+        return False, None
+    return True, principal if principal.username == username else None
+
+def _remember_principal(user, username: str) -> Optional[AuthenticatedUser]:
+    if user is None or user.username != username:
+        return None
+    
+    principal = AuthenticatedUser(id=user.id, username=user.username)
+    principal_cache.set(user.id, principal)
+    return principal
+
+def get_user_from_token(token: str, db: Session) -> Optional[AuthenticatedUser]:
+    """
+    Resolve a JWT access token to its user
+    Tokens carry the user id ("uid"); the principal is served from
+    principal_cache and only looked up by primary key on a miss.
+    Tokens issued before "uid" existed fall back to a username lookup.
+    Returns None if the token is invalid or the user no longer exists
+    """
+    claims = _token_claims(token)
+    if claims is None:
+        return None
+    username, user_id = claims
+    
+    if user_id is not None:
+        hit, principal = _cached_principal(username, user_id)
+        if hit:
+            return principal
+        user = db.get(User, user_id)
+    else:
+        user = db.query(User).filter(User.username == username).first()
+    
+    return _remember_principal(user, username)
+
+async def get_user_from_token_async(token: str, db: AsyncSession) -> Optional[AuthenticatedUser]:
+    """get_user_from_token for an AsyncSession"""
+    claims = _token_claims(token)
+    if claims is None:
+        return None
+    username, user_id = claims
+    
+    if user_id is not None:
+        hit, principal = _cached_principal(username, user_id)
+        if hit:
+            return principal
+        user = await db.get(User, user_id)
+    else:
+        user = (await db.execute(select(User).where(User.username == username))).scalars().first()
+    
+    return _remember_principal(user, username)
+
 def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(lambda: None)
-):
+    db: Session = Depends(get_db)
+) -> AuthenticatedUser:
     """
     Get current user from JWT token
-    Note: db dependency is injected by the router
+    Shares the request's session with the router (FastAPI caches get_db per request)
     """
-    from database import get_db
-    from models import User
-    
-    # Get actual db session if not provided
-    if db is None:
-        db = next(get_db())
-    
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
     
-    try:
-        token = credentials.credentials
-        payload = decode_access_token(token)
-        
-        if payload is None:
-            raise credentials_exception
-        
-        username: str = payload.get("sub")
-        if username is None:
-            raise credentials_exception
-            
-    except JWTError:
+    user = get_user_from_token(credentials.credentials, db)
+    
+    if user is None:
         raise credentials_exception
     
-    user = db.query(User).filter(User.username == username).first()
+    # Commits on this session mark the user for read-your-writes (see database.py)
+    db.info["user_id"] = user.id
+    return user
+
+def get_read_db(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    """
+    Session for read-only endpoints: served by a read replica when
+    READ_REPLICA_URLS is set, or by the primary if the replicas are down or
+    the user committed within READ_YOUR_WRITES_SECONDS. The user id for that
+    choice comes from the token; get_read_user verifies it on this session
+    """
+    claims = _token_claims(credentials.credentials)
+    db = read_sessionmaker_for(claims[1] if claims else None)()
+    try:
+        yield db
+    finally:
+        db.close()
+
+def get_read_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_read_db)
+) -> AuthenticatedUser:
+    """
+    get_current_user for read-only endpoints, resolved on the get_read_db
+    session so a replica-routed request doesn't also open one on the primary.
+    A user the replica doesn't have yet (replication lag) is looked up on the primary
+    """
+    user = get_user_from_token(credentials.credentials, db)
+    if user is None and db.get_bind() is not engine:
+        with SessionLocal() as primary_db:
+            user = get_user_from_token(credentials.credentials, primary_db)
+    
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    
+    return user
+
+async def get_current_user_async(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_async_db)
+) -> AuthenticatedUser:
+    """get_current_user for the async routers (DATABASE_MODE=async)"""
+    user = await get_user_from_token_async(credentials.credentials, db)
     
     if user is None:
-        raise credentials_exception
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
     
     return user
+
+@event.listens_for(User, "after_delete")
+@event.listens_for(User, "after_update")
+def _invalidate_principal(mapper, connection, target):
+    """
+    Drop the cached principal when a user is deleted or renamed through the
+    ORM; dropped again once the transaction commits (see below)
+    """
+    principal_cache.delete(target.id)
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault("stale_principals", set()).add(target.id)
+
+@event.listens_for(Session, "after_commit")
+def _evict_committed_principals(session):
+    # Between the flush and the commit a concurrent request can still read
+    # the old row and cache it again
+    for user_id in session.info.pop("stale_principals", ()):
+        principal_cache.delete(user_id)
+
+@event.listens_for(Session, "after_rollback")
+def _forget_rolled_back_principals(session):
+    session.info.pop("stale_principals", None)
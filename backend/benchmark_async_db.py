@@ -0,0 +1,141 @@
+"""
+Load comparison: sync (threadpool + blocking driver) vs async database mode
+
+Usage:
+    python benchmark_async_db.py [clients] [seconds]
+
+Seeds a local database (a throwaway SQLite file unless DATABASE_URL is set),
+then starts uvicorn once with DATABASE_MODE=sync and once with
+DATABASE_MODE=async and drives each with the same number of concurrent
+clients (default 200) cycling through the dashboard reads: deck list, deck
+cards and next due card. Reports requests/sec, p50 and p99 latency.
+
+Requires uvicorn and, for async mode, aiosqlite/asyncpg.
+"""
+import asyncio
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+if "DATABASE_URL" not in os.environ:
+    os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/benchmark_async_db.db"
+
+import httpx
+
+from auth_utils import create_access_token
+from database import SessionLocal
+from migrations import run_migrations
+from models import Card, Deck, User, UserCardProgress
+
+CLIENTS = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+SECONDS = float(sys.argv[2]) if len(sys.argv) > 2 else 15
+USERS = 20
+DECKS_PER_USER = 2
+CARDS_PER_DECK = 50
+
+
+def seed():
+    """Returns [(auth headers, [deck ids])] for the benchmark users"""
+    run_migrations()
+    db = SessionLocal()
+    try:
+        students = []
+        for u in range(USERS):
+            user = db.query(User).filter(User.username == f"load-{u}").first()
+            if user is None:
+                user = User(username=f"load-{u}", hashed_password="x")
+                db.add(user)
+                db.flush()
+                for d in range(DECKS_PER_USER):
+                    deck = Deck(user_id=user.id, name=f"Deck {d}")
+                    db.add(deck)
+                    db.flush()
+                    cards = [Card(deck_id=deck.id, concept=f"Concept {c}", definition="Definition") for c in range(CARDS_PER_DECK)]
+                    db.add_all(cards)
+                    db.flush()
+                    db.add_all(UserCardProgress(user_id=user.id, card_id=card.id) for card in cards)
+                db.commit()
+            deck_ids = [deck_id for (deck_id,) in db.query(Deck.id).filter(Deck.user_id == user.id)]
+            token = create_access_token({"sub": user.username, "uid": user.id})
+            students.append(({"Authorization": f"Bearer {token}"}, deck_ids))
+        return students
+    finally:
+        db.close()
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def wait_until_up(client):
+    for _ in range(100):
+        try:
+            if (await client.get("/health")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError("server did not start")
+
+
+async def drive(base_url, students):
+    latencies = []
+    errors = 0
+    limits = httpx.Limits(max_connections=CLIENTS, max_keepalive_connections=CLIENTS)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        await wait_until_up(client)
+        deadline = time.perf_counter() + SECONDS
+
+        async def worker(i):
+            nonlocal errors
+            headers, deck_ids = students[i % len(students)]
+            rng = random.Random(i)
+            while time.perf_counter() < deadline:
+                deck_id = rng.choice(deck_ids)
+                path = rng.choice(["/api/decks/", f"/api/cards/deck/{deck_id}", f"/api/study/deck/{deck_id}/next"])
+                started = time.perf_counter()
+                try:
+                    response = await client.get(path, headers=headers)
+                    if response.status_code != 200:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(i) for i in range(CLIENTS)))
+        elapsed = time.perf_counter() - started
+    return latencies, errors, elapsed
+
+
+def run_mode(mode, students):
+    port = free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        env={**os.environ, "DATABASE_MODE": mode},
+    )
+    try:
+        return asyncio.run(drive(f"http://127.0.0.1:{port}", students))
+    finally:
+        server.terminate()
+        server.wait()
+
+
+students = seed()
+print(f"{CLIENTS} concurrent clients for {SECONDS:.0f}s per mode, {os.environ['DATABASE_URL'].split(':')[0]}\n")
+print(f"{'mode':>6} {'requests':>9} {'req/s':>8} {'p50':>9} {'p99':>9} {'errors':>7}")
+for mode in ("sync", "async"):
+    latencies, errors, elapsed = run_mode(mode, students)
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2]
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(
+        f"{mode:>6} {len(latencies):>9} {len(latencies) / elapsed:>8.1f} "
+        f"{p50 * 1000:>7.1f}ms {p99 * 1000:>7.1f}ms {errors:>7}"
+    )
@@ -0,0 +1,138 @@
+"""
+Benchmark: authenticated request overhead, before vs after the principal cache
+
+Usage:
+    python benchmark_auth.py [requests]
+
+Serves one trivial endpoint behind each authentication dependency and
+reports per-request latency, queries against the users table and database
+connections checked out:
+- before: the previous get_current_user (opens its own session via
+  next(get_db()), never closes it, and queries users by username)
+- before (closed): the same username query on the request's session, to
+  separate the cost of the lookup from the leak
+- after: auth_utils.get_current_user (request-scoped session, "uid" claim,
+  cached principal)
+
+Runs against a throwaway SQLite database unless DATABASE_URL is set.
+"""
+import gc
+import os
+import sys
+import tempfile
+import time
+
+if "DATABASE_URL" not in os.environ:
+    os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/benchmark_auth.db"
+
+from fastapi import Depends, FastAPI, HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+from auth_utils import (
+    create_access_token, decode_access_token, get_current_user, get_password_hash,
+    principal_cache, security
+)
+from database import SessionLocal, engine, get_db
+from migrations import run_migrations
+from models import User
+
+REQUESTS = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+
+
+def get_current_user_before(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    """Previous implementation, kept here as the reference"""
+    db = next(get_db())
+    payload = decode_access_token(credentials.credentials)
+    if payload is None:
+        raise HTTPException(status_code=401)
+    user = db.query(User).filter(User.username == payload.get("sub")).first()
+    if user is None:
+        raise HTTPException(status_code=401)
+    return user
+
+
+def get_current_user_lookup(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db=Depends(get_db)
+):
+    payload = decode_access_token(credentials.credentials)
+    if payload is None:
+        raise HTTPException(status_code=401)
+    user = db.query(User).filter(User.username == payload.get("sub")).first()
+    if user is None:
+        raise HTTPException(status_code=401)
+    return user
+
+
+app = FastAPI()
+
+
+@app.get("/before")
+def before(current_user=Depends(get_current_user_before)):
+    return {"id": current_user.id}
+
+
+@app.get("/before-closed")
+def before_closed(current_user=Depends(get_current_user_lookup), db=Depends(get_db)):
+    return {"id": current_user.id}
+
+
+@app.get("/after")
+def after(current_user=Depends(get_current_user), db=Depends(get_db)):
+    return {"id": current_user.id}
+
+
+counters = {"user_queries": 0, "checkouts": 0}
+
+
+@event.listens_for(engine, "before_cursor_execute")
+def count_user_queries(conn, cursor, statement, parameters, context, executemany):
+    if "FROM users" in statement:
+        counters["user_queries"] += 1
+
+
+@event.listens_for(engine, "checkout")
+def count_checkouts(dbapi_connection, connection_record, connection_proxy):
+    counters["checkouts"] += 1
+
+
+run_migrations(engine)
+db = SessionLocal()
+user = db.query(User).filter(User.username == "benchmark").first()
+if user is None:
+    user = User(username="benchmark", hashed_password=get_password_hash("benchmark"))
+    db.add(user)
+    db.commit()
+headers = {"Authorization": f"Bearer {create_access_token({'sub': user.username, 'uid': user.id})}"}
+db.close()
+
+# Fail fast when the leaked sessions exhaust the pool instead of waiting the default 30s
+engine.pool._timeout = 2
+
+client = TestClient(app)
+print(f"{REQUESTS} authenticated requests per variant\n")
+print(f"{'variant':>14} {'per request':>12} {'user queries':>13} {'checkouts':>10} {'checked out after':>18}")
+for path in ("/before", "/before-closed", "/after"):
+    principal_cache.clear()
+    counters.update(user_queries=0, checkouts=0)
+
+    started = time.perf_counter()
+    try:
+        for completed in range(REQUESTS):
+            assert client.get(path, headers=headers).status_code == 200
+    except PoolTimeoutError:
+        print(f"{path[1:]:>14} connection pool exhausted after {completed} requests (sessions never closed)")
+        # Reclaim the leaked connections before the next variant
+        gc.collect()
+        engine.dispose()
+        engine.pool._timeout = 2
+        continue
+    elapsed = time.perf_counter() - started
+
+    print(
+        f"{path[1:]:>14} {elapsed / REQUESTS * 1e6:>10.0f}us {counters['user_queries']:>13} "
+        f"{counters['checkouts']:>10} {engine.pool.checkedout():>18}"
+    )
@@ -0,0 +1,94 @@
+"""
+Deck listing and cards-remaining latency: COUNT(*) per request vs the
+maintained counters (counters.py)
+
+Usage:
+    python benchmark_deck_counters.py [largest deck size]
+
+For decks of growing size (up to 50k cards by default, reviews spread over
+the past month and the next one) times the old statements (grouped COUNT of
+cards per deck, COUNT of due progress rows) against the new ones
+(decks.card_count, queries.cards_remaining) on a throwaway SQLite file.
+"""
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/benchmark_deck_counters.db"
+
+from sqlalchemy import func, insert, select
+
+import queries
+from counters import repair_counters
+from database import engine
+from migrations import run_migrations
+from models import Card, Deck, User, UserCardProgress
+
+LARGEST = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+SIZES = [size for size in (100, 1000, 10000, 50000, 100000) if size <= LARGEST]
+REPEATS = 20
+
+
+def seed(connection, size):
+    """A user with one deck of size cards, every card with a progress row"""
+    now = datetime.utcnow()
+    user_id = connection.execute(
+        insert(User).values(username=f"counters-{size}", hashed_password="x").returning(User.id)
+    ).scalar()
+    deck_id = connection.execute(insert(Deck).values(user_id=user_id, name="Deck").returning(Deck.id)).scalar()
+    connection.execute(insert(Card), [
+        {"deck_id": deck_id, "concept": f"Concept {c}", "definition": "Definition"} for c in range(size)
+    ])
+    card_ids = connection.execute(select(Card.id).where(Card.deck_id == deck_id)).scalars().all()
+    connection.execute(insert(UserCardProgress), [
+        {"user_id": user_id, "card_id": card_id, "next_review": now + timedelta(hours=(card_id * 13) % 1440 - 720)}
+        for card_id in card_ids
+    ])
+    return user_id, deck_id
+
+
+def old_deck_list(user_id, deck_id, now):
+    return (
+        select(Deck, func.count(Card.id))
+        .outerjoin(Card, Card.deck_id == Deck.id)
+        .where(Deck.user_id == user_id)
+        .group_by(Deck.id)
+    )
+
+
+def old_cards_remaining(user_id, deck_id, now):
+    return (
+        select(func.count())
+        .select_from(Card)
+        .join(UserCardProgress, (UserCardProgress.card_id == Card.id) & (UserCardProgress.user_id == user_id))
+        .where(Card.deck_id == deck_id, UserCardProgress.next_review <= now)
+    )
+
+
+def timed(connection, statement):
+    started = time.perf_counter()
+    for _ in range(REPEATS):
+        result = connection.execute(statement).all()
+    return (time.perf_counter() - started) / REPEATS * 1000, result
+
+
+run_migrations()
+with engine.begin() as connection:
+    decks = {size: seed(connection, size) for size in SIZES}
+    repair_counters(connection)
+
+print(f"{'cards':>7} {'list COUNT':>11} {'list column':>12} {'due COUNT':>10} {'due counters':>13}  same result")
+with engine.connect() as connection:
+    now = datetime.utcnow()
+    for size, (user_id, deck_id) in decks.items():
+        old_list_ms, old_list = timed(connection, old_deck_list(user_id, deck_id, now))
+        new_list_ms, new_list = timed(connection, queries.user_decks(user_id))
+        old_due_ms, old_due = timed(connection, old_cards_remaining(user_id, deck_id, now))
+        new_due_ms, new_due = timed(connection, queries.cards_remaining(deck_id, user_id, now))
+        same = old_list[0][-1] == new_list[0].card_count and old_due == new_due
+        print(
+            f"{size:>7} {old_list_ms:>9.2f}ms {new_list_ms:>10.2f}ms "
+            f"{old_due_ms:>8.2f}ms {new_due_ms:>11.2f}ms  {'yes' if same else 'NO'}"
+        )
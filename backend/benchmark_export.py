@@ -0,0 +1,117 @@
+"""
+Peak memory of the streaming export vs the JSON deck listing as decks grow
+
+Usage:
+    python benchmark_export.py [largest deck size]
+
+Seeds decks of 1k, 10k and 100k cards (by default) in a throwaway SQLite
+file, then calls the app directly over ASGI (discarding the body as it
+arrives, as a client would stream it to disk) for:
+
+- GET /api/cards/deck/{id}: the whole deck as one JSON array
+- GET /api/export/deck/{id}: NDJSON, CSV and gzipped NDJSON
+
+reporting latency, bytes sent and the peak Python memory allocated while
+serving (tracemalloc). The export's peak should stay flat as the deck grows.
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/benchmark_export.db"
+
+from sqlalchemy import insert, select
+
+from auth_utils import create_access_token
+from counters import repair_counters
+from database import engine
+from main import app
+from migrations import run_migrations
+from models import Card, Deck, User, UserCardProgress
+
+LARGEST = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+SIZES = [size for size in (1000, 10000, 100000, 500000) if size <= LARGEST]
+DEFINITION = "A word or phrase used in a particular field, explained in a sentence or two of plain text. " * 2
+
+
+def seed(connection, size):
+    now = datetime.utcnow()
+    user_id = connection.execute(
+        insert(User).values(username=f"export-{size}", hashed_password="x").returning(User.id)
+    ).scalar()
+    deck_id = connection.execute(insert(Deck).values(user_id=user_id, name="Vocabulary").returning(Deck.id)).scalar()
+    for start in range(0, size, 10000):
+        connection.execute(insert(Card), [
+            {"deck_id": deck_id, "concept": f"Term {c}", "definition": DEFINITION}
+            for c in range(start, min(size, start + 10000))
+        ])
+    card_ids = connection.execute(select(Card.id).where(Card.deck_id == deck_id)).scalars().all()
+    for start in range(0, len(card_ids), 10000):
+        connection.execute(insert(UserCardProgress), [
+            {"user_id": user_id, "card_id": card_id, "next_review": now + timedelta(minutes=card_id % 5000)}
+            for card_id in card_ids[start:start + 10000]
+        ])
+    return user_id, deck_id
+
+
+async def get(path, headers):
+    """(status, bytes sent) of a GET through the ASGI app, dropping body chunks as they arrive"""
+    path, _, query = path.partition("?")
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": query.encode(),
+        "root_path": "", "client": ("benchmark", 0), "server": ("testserver", 80),
+        "headers": [(name.lower().encode(), value.encode()) for name, value in headers.items()],
+    }
+    received = False
+    response = {"status": None, "bytes": 0}
+
+    async def receive():
+        nonlocal received
+        if not received:
+            received = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await asyncio.Event().wait()  # the client never disconnects
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+        elif message["type"] == "http.response.body":
+            response["bytes"] += len(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return response["status"], response["bytes"]
+
+
+def measure(path, headers):
+    tracemalloc.start()
+    started = time.perf_counter()
+    status, size = asyncio.run(get(path, headers))
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert status == 200, f"{path}: {status}"
+    return elapsed, size, peak
+
+
+run_migrations()
+with engine.begin() as connection:
+    decks = {size: seed(connection, size) for size in SIZES}
+    repair_counters(connection)
+
+print(f"{'cards':>7}  {'request':<28} {'latency':>10} {'sent':>10} {'peak mem':>10}")
+for size, (user_id, deck_id) in decks.items():
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': f'export-{size}', 'uid': user_id})}"}
+    measure(f"/api/export/deck/{deck_id}", headers)  # warm up auth and the pool
+    for name, path in (
+        ("JSON listing", f"/api/cards/deck/{deck_id}"),
+        ("export NDJSON", f"/api/export/deck/{deck_id}"),
+        ("export CSV", f"/api/export/deck/{deck_id}?format=csv"),
+        ("export NDJSON, gzip", f"/api/export/deck/{deck_id}?gzip=true"),
+    ):
+        elapsed, sent, peak = measure(path, headers)
+        print(f"{size:>7}  {name:<28} {elapsed * 1000:>8.0f}ms {sent / 1e6:>8.2f}MB {peak / 1e6:>8.1f}MB")
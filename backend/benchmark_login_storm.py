@@ -0,0 +1,111 @@
+"""
+Benchmark: study endpoint latency during a login storm
+
+Usage:
+    python benchmark_login_storm.py [logins] [study_clients]
+
+Fires a burst of concurrent logins (the start of a class) while a few
+clients keep sending authenticated GET /api/decks/ requests, in two variants:
+- shared: the previous sync login, hashing on the request threadpool
+- dedicated: routers/auth.login, hashing on the bounded bcrypt pool
+  (PASSWORD_HASH_WORKERS threads)
+
+Reports study-request latency percentiles and login throughput for each.
+Runs in-process against a throwaway SQLite database unless DATABASE_URL is set.
+"""
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+if "DATABASE_URL" not in os.environ:
+    os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/benchmark_login_storm.db"
+
+import httpx
+from fastapi import Depends, HTTPException
+
+from auth_utils import (
+    BCRYPT_ROUNDS, PASSWORD_HASH_WORKERS, create_access_token, get_password_hash, verify_password
+)
+from database import SessionLocal, engine, get_db
+from main import app
+from migrations import run_migrations
+from models import User
+from schemas import UserLogin
+
+LOGINS = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+STUDY_CLIENTS = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+STUDENTS = 20
+
+
+@app.post("/benchmark/login-shared")
+def login_shared(user_credentials: UserLogin, db=Depends(get_db)):
+    """Previous implementation, kept here as the reference"""
+    user = db.query(User).filter(User.username == user_credentials.username).first()
+    if not user or not verify_password(user_credentials.password, user.hashed_password):
+        raise HTTPException(status_code=401)
+    return {"access_token": create_access_token({"sub": user.username, "uid": user.id})}
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+async def run_storm(client, login_path, headers):
+    study_latencies = []
+
+    async def login(i):
+        response = await client.post(login_path, json={"username": f"student{i % STUDENTS}", "password": "password"})
+        assert response.status_code == 200, response.text
+
+    async def study(done):
+        # A few students keep studying for as long as the storm lasts
+        while not done.is_set():
+            started = time.perf_counter()
+            response = await client.get("/api/decks/", headers=headers)
+            assert response.status_code == 200, response.text
+            study_latencies.append(time.perf_counter() - started)
+            await asyncio.sleep(0.01)
+
+    async def storm(done):
+        started = time.perf_counter()
+        await asyncio.gather(*(login(i) for i in range(LOGINS)))
+        done.set()
+        return time.perf_counter() - started
+
+    done = asyncio.Event()
+    results = await asyncio.gather(storm(done), *(study(done) for _ in range(STUDY_CLIENTS)))
+    return study_latencies, results[0]
+
+
+async def main():
+    run_migrations(engine)
+    db = SessionLocal()
+    hashed_password = get_password_hash("password")
+    for i in range(STUDENTS):
+        if db.query(User).filter(User.username == f"student{i}").first() is None:
+            db.add(User(username=f"student{i}", hashed_password=hashed_password))
+    db.commit()
+    teacher = db.query(User).filter(User.username == "student0").first()
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': teacher.username, 'uid': teacher.id})}"}
+    db.close()
+
+    print(f"{LOGINS} concurrent logins (bcrypt cost {BCRYPT_ROUNDS}) alongside {STUDY_CLIENTS} studying clients")
+    print(f"dedicated pool: {PASSWORD_HASH_WORKERS} threads\n")
+    print(f"{'variant':>10} {'requests':>9} {'study p50':>10} {'study p95':>10} {'study max':>10} {'logins/s':>9}")
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+        for name, path in (("shared", "/benchmark/login-shared"), ("dedicated", "/api/auth/login")):
+            latencies, login_seconds = await run_storm(client, path, headers)
+            print(
+                f"{name:>10} {len(latencies):>9} {statistics.median(latencies) * 1000:>8.1f}ms "
+                f"{percentile(latencies, 0.95) * 1000:>8.1f}ms {max(latencies) * 1000:>8.1f}ms "
+                f"{LOGINS / login_seconds:>9.1f}"
+            )
+
+
+asyncio.run(main())
@@ -0,0 +1,114 @@
+"""
+Full deck listing vs keyset pages on a synthetic 100k-card deck
+
+Usage:
+    python benchmark_pagination.py [cards] [page size]
+
+Seeds one deck (a throwaway SQLite file) with vocabulary-sized definitions
+and a progress row per card, then through the app measures:
+
+- GET /api/cards/deck/{id}: the whole deck in one response
+- GET /api/cards/deck/{id}/page: one page, all fields
+- the same page with fields=id,concept,next_review
+- walking every page of the deck with that projection
+
+reporting latency, response size and the peak Python memory allocated while
+serving (tracemalloc).
+"""
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/benchmark_pagination.db"
+
+from fastapi.testclient import TestClient
+from sqlalchemy import insert, select
+
+from auth_utils import create_access_token
+from counters import repair_counters
+from database import engine
+from main import app
+from migrations import run_migrations
+from models import Card, Deck, User, UserCardProgress
+
+CARDS = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+PAGE_SIZE = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+DEFINITION = "A word or phrase used in a particular field, explained in a sentence or two of plain text. " * 2
+
+
+def seed(connection):
+    now = datetime.utcnow()
+    user_id = connection.execute(
+        insert(User).values(username="pagination", hashed_password="x").returning(User.id)
+    ).scalar()
+    deck_id = connection.execute(insert(Deck).values(user_id=user_id, name="Vocabulary").returning(Deck.id)).scalar()
+    for start in range(0, CARDS, 10000):
+        connection.execute(insert(Card), [
+            {"deck_id": deck_id, "concept": f"Term {c}", "definition": DEFINITION}
+            for c in range(start, min(CARDS, start + 10000))
+        ])
+    card_ids = connection.execute(select(Card.id).where(Card.deck_id == deck_id)).scalars().all()
+    for start in range(0, len(card_ids), 10000):
+        connection.execute(insert(UserCardProgress), [
+            {"user_id": user_id, "card_id": card_id, "next_review": now + timedelta(minutes=card_id % 5000)}
+            for card_id in card_ids[start:start + 10000]
+        ])
+    repair_counters(connection)
+    return user_id, deck_id
+
+
+def measure(client, path, headers):
+    tracemalloc.start()
+    started = time.perf_counter()
+    response = client.get(path, headers=headers)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert response.status_code == 200, response.text[:200]
+    return elapsed, len(response.content), peak, response.json()
+
+
+def report(name, elapsed, size, peak):
+    print(f"{name:<42} {elapsed * 1000:>9.0f}ms {size / 1e6:>8.2f}MB {peak / 1e6:>8.1f}MB")
+
+
+run_migrations()
+with engine.begin() as connection:
+    user_id, deck_id = seed(connection)
+headers = {"Authorization": f"Bearer {create_access_token({'sub': 'pagination', 'uid': user_id})}"}
+
+print(f"{CARDS} cards, page size {PAGE_SIZE}\n")
+print(f"{'request':<42} {'latency':>11} {'response':>10} {'peak mem':>10}")
+with TestClient(app) as client:
+    client.get("/api/decks/", headers=headers)  # warm up auth and the pool
+
+    elapsed, size, peak, _ = measure(client, f"/api/cards/deck/{deck_id}", headers)
+    report("full deck (GET /deck/{id})", elapsed, size, peak)
+
+    base = f"/api/cards/deck/{deck_id}/page?limit={PAGE_SIZE}"
+    elapsed, size, peak, _ = measure(client, base, headers)
+    report("first page, all fields", elapsed, size, peak)
+
+    projected = f"{base}&fields=id,concept,next_review"
+    elapsed, size, peak, body = measure(client, projected, headers)
+    report("first page, fields=id,concept,next_review", elapsed, size, peak)
+
+    # Deepest page costs the same as the first with keyset pagination
+    pages, total_elapsed, total_size, max_peak, max_page = 0, 0.0, 0, 0, 0.0
+    cursor = None
+    while True:
+        path = projected + (f"&cursor={cursor}" if cursor else "")
+        elapsed, size, peak, body = measure(client, path, headers)
+        pages += 1
+        total_elapsed += elapsed
+        total_size += size
+        max_peak = max(max_peak, peak)
+        max_page = max(max_page, elapsed)
+        cursor = body["next_cursor"]
+        if not cursor:
+            break
+    report(f"all {pages} pages, projected (total)", total_elapsed, total_size, max_peak)
+    print(f"{'  slowest single page':<42} {max_page * 1000:>9.0f}ms")
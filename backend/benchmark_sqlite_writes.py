@@ -0,0 +1,174 @@
+"""
+Concurrent review commits on SQLite: default settings vs the tuned profile
+
+Usage:
+    python benchmark_sqlite_writes.py [writers] [readers] [seconds] [reader think ms]
+
+Builds two throwaway SQLite files next to this script (so commits hit the
+real disk, not tmpfs) and drives each with the same workload: writer threads
+doing what submit_review commits (read the progress row, update it, insert a
+Review) and reader threads running the dashboard queries (decks with card
+counts, due-card count) with a pause between page loads, so the readers
+model students browsing rather than saturating the CPU.
+
+"default" is the old engine: rollback journal, synchronous=FULL, no writer
+queue. "tuned" is database.py's SQLite profile: WAL, synchronous=NORMAL,
+cache/mmap/busy_timeout pragmas and the single-writer lock.
+"""
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+import counters  # noqa: F401  (maintains the deck counters on commit)
+import queries
+from database import configure_sqlite, use_single_writer
+from migrations import run_migrations
+from models import Card, Deck, Review, User, UserCardProgress
+from spaced_repetition import calculate_next_review
+
+WRITERS = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+READERS = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+SECONDS = float(sys.argv[3]) if len(sys.argv) > 3 else 10
+READER_THINK_SECONDS = (float(sys.argv[4]) if len(sys.argv) > 4 else 20) / 1000
+USERS = 20
+CARDS_PER_USER = 50
+
+
+def seed(session_factory):
+    """Returns [(user_id, deck_id, [card ids])]"""
+    db = session_factory()
+    try:
+        students = []
+        for u in range(USERS):
+            user = User(username=f"writer-{u}", hashed_password="x")
+            db.add(user)
+            db.flush()
+            deck = Deck(user_id=user.id, name="Deck")
+            db.add(deck)
+            db.flush()
+            cards = [Card(deck_id=deck.id, concept=f"Concept {c}", definition="Definition") for c in range(CARDS_PER_USER)]
+            db.add_all(cards)
+            db.flush()
+            db.add_all(UserCardProgress(user_id=user.id, card_id=card.id, next_review=datetime.utcnow()) for card in cards)
+            students.append((user.id, deck.id, [card.id for card in cards]))
+        db.commit()
+        return students
+    finally:
+        db.close()
+
+
+def submit_review(session_factory, user_id, card_id, rng):
+    db = session_factory()
+    try:
+        progress = db.execute(queries.card_progress(card_id, user_id)).scalars().first()
+        quality = rng.randint(0, 3)
+        progress.ease_factor, progress.interval, progress.repetitions, progress.next_review = calculate_next_review(
+            quality, progress.ease_factor, progress.interval, progress.repetitions
+        )
+        progress.last_reviewed = datetime.utcnow()
+        db.add(Review(card_id=card_id, user_id=user_id, user_answer="answer", similarity_score=0.5, quality=quality))
+        db.commit()
+    finally:
+        db.close()
+
+
+def load_dashboard(session_factory, user_id, deck_id):
+    db = session_factory()
+    try:
+        db.execute(queries.user_decks(user_id)).scalars().all()
+        db.scalar(queries.cards_remaining(deck_id, user_id, datetime.utcnow()))
+    finally:
+        db.close()
+
+
+def run(session_factory, students):
+    deadline = time.perf_counter() + SECONDS
+    write_latencies, read_latencies = [], []
+    errors = {"write": 0, "read": 0}
+
+    def worker(i, kind):
+        rng = random.Random(i)
+        while time.perf_counter() < deadline:
+            user_id, deck_id, card_ids = students[rng.randrange(len(students))]
+            started = time.perf_counter()
+            try:
+                if kind == "write":
+                    submit_review(session_factory, user_id, rng.choice(card_ids), rng)
+                else:
+                    load_dashboard(session_factory, user_id, deck_id)
+                    time.sleep(READER_THINK_SECONDS)
+            except OperationalError:
+                # "database is locked"
+                errors[kind] += 1
+                continue
+            elapsed = time.perf_counter() - started
+            if kind == "write":
+                write_latencies.append(elapsed)
+            else:
+                read_latencies.append(elapsed - READER_THINK_SECONDS)
+
+    threads = [threading.Thread(target=worker, args=(i, "write")) for i in range(WRITERS)]
+    threads += [threading.Thread(target=worker, args=(WRITERS + i, "read")) for i in range(READERS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return write_latencies, read_latencies, errors
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+directory = tempfile.mkdtemp(dir=".")
+try:
+    configurations = {}
+
+    default_engine = create_engine(
+        f"sqlite:///{directory}/default.db",
+        connect_args={"check_same_thread": False},
+        pool_size=WRITERS + READERS,
+    )
+    configurations["default"] = sessionmaker(autocommit=False, autoflush=False, bind=default_engine)
+
+    tuned_engine = create_engine(
+        f"sqlite:///{directory}/tuned.db",
+        connect_args={"check_same_thread": False},
+        pool_size=WRITERS + READERS,
+    )
+    configure_sqlite(tuned_engine)
+    tuned_factory = sessionmaker(autocommit=False, autoflush=False, bind=tuned_engine)
+    use_single_writer(tuned_factory)
+    configurations["tuned"] = tuned_factory
+
+    for session_factory in configurations.values():
+        run_migrations(session_factory.kw["bind"])
+
+    print(
+        f"{WRITERS} review writers + {READERS} dashboard readers "
+        f"({READER_THINK_SECONDS * 1000:.0f}ms think time) for {SECONDS:.0f}s per profile\n"
+    )
+    print(f"{'profile':>8} {'writes/s':>9} {'w p50':>8} {'w p99':>8} {'reads/s':>8} {'r p99':>8} {'locked':>7}")
+    for name, session_factory in configurations.items():
+        students = seed(session_factory)
+        writes, reads, errors = run(session_factory, students)
+        print(
+            f"{name:>8} {len(writes) / SECONDS:>9.1f} "
+            f"{percentile(writes, 0.5) * 1000:>6.1f}ms {percentile(writes, 0.99) * 1000:>6.0f}ms "
+            f"{len(reads) / SECONDS:>8.1f} {percentile(reads, 0.99) * 1000:>6.0f}ms "
+            f"{errors['write'] + errors['read']:>7}"
+        )
+        session_factory.kw["bind"].dispose()
+finally:
+    shutil.rmtree(directory, ignore_errors=True)
@@ -0,0 +1,154 @@
+"""
+Query-count check for the card and study read endpoints
+
+Usage:
+    python check_card_queries.py
+    DATABASE_MODE=async python check_card_queries.py
+
+Creates users with decks of 2, 20 and 300 cards in a throwaway SQLite
+database and, for each, calls through the app:
+
+- GET /api/cards/deck/{id} and /api/cards/deck/{id}/page
+- GET and PUT /api/cards/{id}
+- GET /api/study/card/{id} and /api/study/deck/{id}/next
+
+counting the SQL statements every call runs. Exits non-zero if a count
+grows with the deck size (an N+1 regression), exceeds its budget below, or
+if a response disagrees with the seeded cards and progress.
+"""
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/check_card_queries.db"
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event, insert, select
+
+from auth_utils import create_access_token
+from database import DATABASE_MODE, engine, get_async_engine
+from main import app
+from migrations import run_migrations
+from models import Card, Deck, User, UserCardProgress
+
+DECK_SIZES = (2, 20, 300)
+
+# Most statements each call may run once authentication is cached
+BUDGETS = {
+    "GET /api/cards/deck/{id}": 2,
+    "GET /api/cards/deck/{id}/page": 2,
+    "GET /api/cards/{id}": 1,
+    "PUT /api/cards/{id}": 3,
+    "GET /api/study/card/{id}": 1,
+    "GET /api/study/deck/{id}/next": 3,
+}
+
+
+def seed_user(connection, size):
+    """A user with one deck of size cards; every card but the last has progress, the first is due"""
+    now = datetime.utcnow()
+    user_id = connection.execute(
+        insert(User).values(username=f"cards-{size}", hashed_password="x").returning(User.id)
+    ).scalar()
+    deck_id = connection.execute(insert(Deck).values(user_id=user_id, name="Deck").returning(Deck.id)).scalar()
+    connection.execute(insert(Card), [
+        {"deck_id": deck_id, "concept": f"Concept {c}", "definition": "Definition"} for c in range(size)
+    ])
+    card_ids = connection.execute(select(Card.id).where(Card.deck_id == deck_id).order_by(Card.id)).scalars().all()
+    connection.execute(insert(UserCardProgress), [
+        {"user_id": user_id, "card_id": card_id, "next_review": now + timedelta(days=-1 if i == 0 else 1)}
+        for i, card_id in enumerate(card_ids[:-1])
+    ])
+    return user_id, deck_id, card_ids
+
+
+def count_statements(client, method, path, headers, **kwargs):
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    engines = [engine, get_async_engine().sync_engine] if DATABASE_MODE == "async" else [engine]
+    for counted in engines:
+        event.listen(counted, "before_cursor_execute", record)
+    try:
+        response = client.request(method, path, headers=headers, **kwargs)
+    finally:
+        for counted in engines:
+            event.remove(counted, "before_cursor_execute", record)
+    assert response.status_code == 200, response.text
+    return len(statements), response.json()
+
+
+run_migrations()
+with engine.begin() as connection:
+    users = {size: seed_user(connection, size) for size in DECK_SIZES}
+
+failures = 0
+
+
+def expect(condition, message):
+    global failures
+    if not condition:
+        print(f"✗ {message}")
+        failures += 1
+
+
+counts = {name: [] for name in BUDGETS}
+with TestClient(app) as client:
+    for size, (user_id, deck_id, card_ids) in users.items():
+        headers = {"Authorization": f"Bearer {create_access_token({'sub': f'cards-{size}', 'uid': user_id})}"}
+        # Warm the principal cache so every measured call does the same auth work
+        client.get(f"/api/cards/deck/{deck_id}/page", headers=headers)
+        first = card_ids[0]
+
+        calls = {
+            "GET /api/cards/deck/{id}": ("GET", f"/api/cards/deck/{deck_id}", {}),
+            "GET /api/cards/deck/{id}/page": ("GET", f"/api/cards/deck/{deck_id}/page?limit=1000", {}),
+            "GET /api/cards/{id}": ("GET", f"/api/cards/{first}", {}),
+            "PUT /api/cards/{id}": ("PUT", f"/api/cards/{first}", {"json": {"concept": "Renamed"}}),
+            "GET /api/study/card/{id}": ("GET", f"/api/study/card/{first}", {}),
+            "GET /api/study/deck/{id}/next": ("GET", f"/api/study/deck/{deck_id}/next", {}),
+        }
+        bodies = {}
+        for name, (method, path, kwargs) in calls.items():
+            statements, bodies[name] = count_statements(client, method, path, headers, **kwargs)
+            counts[name].append(statements)
+
+        listing = bodies["GET /api/cards/deck/{id}"]
+        expect([card["id"] for card in listing] == card_ids, f"{size} cards: listing returned the wrong cards")
+        expect(
+            sum(card["next_review"] is None for card in listing) == 1,
+            f"{size} cards: listing should have exactly one card without next_review"
+        )
+        expect(len(bodies["GET /api/cards/deck/{id}/page"]["items"]) == size, f"{size} cards: page size")
+        expect(bodies["PUT /api/cards/{id}"]["concept"] == "Renamed", f"{size} cards: PUT response")
+        expect(bodies["GET /api/study/card/{id}"] == bodies["PUT /api/cards/{id}"], f"{size} cards: study card")
+        expect(bodies["GET /api/study/deck/{id}/next"]["card"]["id"] == first, f"{size} cards: next card")
+
+        # Cards in someone else's deck stay hidden
+        other = users[DECK_SIZES[0]][2][0] if size != DECK_SIZES[0] else users[DECK_SIZES[-1]][2][0]
+        expect(client.get(f"/api/cards/{other}", headers=headers).status_code == 404, "other user's card: GET")
+        expect(client.get(f"/api/study/card/{other}", headers=headers).status_code == 403, "other user's card: study")
+
+    # Studying a card without progress gives it a fresh row (the last card of each deck has none)
+    user_id, deck_id, card_ids = users[DECK_SIZES[0]]
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': f'cards-{DECK_SIZES[0]}', 'uid': user_id})}"}
+    studied = client.get(f"/api/study/card/{card_ids[-1]}", headers=headers).json()
+    expect(
+        studied["next_review"] is not None
+        and client.get(f"/api/cards/{card_ids[-1]}", headers=headers).json()["next_review"] == studied["next_review"],
+        "studying a card without progress did not create its progress row"
+    )
+
+for name, statement_counts in counts.items():
+    within = len(set(statement_counts)) == 1 and max(statement_counts) <= BUDGETS[name]
+    failures += not within
+    per_size = ", ".join(f"{s} cards: {n}" for s, n in zip(DECK_SIZES, statement_counts))
+    print(f"{'✓' if within else '✗'} {name} statements ({per_size}; budget {BUDGETS[name]})")
+
+if failures:
+    print(f"\n❌ {failures} check(s) failed")
+    sys.exit(1)
+print("\n✅ Card and study reads run a constant number of queries")
@@ -0,0 +1,114 @@
+"""
+Query-count check for the deck list and deck dashboard endpoints
+
+Usage:
+    python check_dashboard_queries.py
+
+Creates users with 1, 10 and 150 decks in a throwaway SQLite database,
+calls GET /api/decks/ and GET /api/decks/dashboard for each through the app
+and counts the SQL statements every call runs. Exits non-zero if the count
+grows with the number of decks (an N+1 regression) or if the dashboard
+numbers disagree with the seeded due/new/studied cards.
+"""
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/check_dashboard_queries.db"
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event, insert, select
+
+from auth_utils import create_access_token
+from database import engine
+from main import app
+from migrations import run_migrations
+from models import Card, Deck, User, UserCardProgress
+
+DECK_COUNTS = (1, 10, 150)
+CARDS_PER_DECK = 6
+
+
+def seed_user(connection, deck_count):
+    """A user with deck_count decks; per deck: 2 due, 2 scheduled later, 2 never reviewed"""
+    now = datetime.utcnow()
+    user_id = connection.execute(
+        insert(User).values(username=f"dashboard-{deck_count}", hashed_password="x").returning(User.id)
+    ).scalar()
+    for d in range(deck_count):
+        deck_id = connection.execute(
+            insert(Deck).values(user_id=user_id, name=f"Deck {d}").returning(Deck.id)
+        ).scalar()
+        connection.execute(insert(Card), [
+            {"deck_id": deck_id, "concept": f"Concept {c}", "definition": "Definition"}
+            for c in range(CARDS_PER_DECK)
+        ])
+        card_ids = connection.execute(select(Card.id).where(Card.deck_id == deck_id)).scalars().all()
+        progress = []
+        for i, card_id in enumerate(card_ids[:4]):
+            progress.append({
+                "user_id": user_id, "card_id": card_id,
+                "next_review": now + timedelta(days=-1 if i < 2 else 3),
+                "last_reviewed": now - timedelta(days=d + 1),
+            })
+        # Card 5 has a fresh progress row, card 6 none at all; both count as new
+        progress.append({
+            "user_id": user_id, "card_id": card_ids[4],
+            "next_review": now + timedelta(days=1), "last_reviewed": None,
+        })
+        connection.execute(insert(UserCardProgress), progress)
+    return user_id
+
+
+def count_statements(client, path, headers):
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        response = client.get(path, headers=headers)
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    assert response.status_code == 200, response.text
+    return len(statements), response.json()
+
+
+run_migrations()
+with engine.begin() as connection:
+    users = {deck_count: seed_user(connection, deck_count) for deck_count in DECK_COUNTS}
+
+failures = 0
+counts = {"/api/decks/": [], "/api/decks/dashboard": []}
+with TestClient(app) as client:
+    for deck_count, user_id in users.items():
+        headers = {"Authorization": f"Bearer {create_access_token({'sub': f'dashboard-{deck_count}', 'uid': user_id})}"}
+        # Warm the principal cache so every measured call does the same auth work
+        client.get("/api/decks/", headers=headers)
+
+        for path in counts:
+            statements, body = count_statements(client, path, headers)
+            counts[path].append(statements)
+            if len(body) != deck_count:
+                print(f"✗ {path} returned {len(body)} decks for a user with {deck_count}")
+                failures += 1
+
+        for deck in body:  # the dashboard response
+            expected = (CARDS_PER_DECK, 2, 2)
+            actual = (deck["card_count"], deck["due_count"], deck["new_count"])
+            if actual != expected or deck["last_studied"] is None:
+                print(f"✗ deck {deck['id']}: (cards, due, new) = {actual}, expected {expected}")
+                failures += 1
+
+for path, statement_counts in counts.items():
+    constant = len(set(statement_counts)) == 1
+    failures += not constant
+    per_size = ", ".join(f"{d} decks: {n}" for d, n in zip(DECK_COUNTS, statement_counts))
+    print(f"{'✓' if constant else '✗'} GET {path} statements ({per_size})")
+
+if failures:
+    print(f"\n❌ {failures} check(s) failed")
+    sys.exit(1)
+print("\n✅ Deck list and dashboard run a constant number of queries")
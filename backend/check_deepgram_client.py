@@ -0,0 +1,202 @@
+"""
+Check of the Deepgram client against a local stub server
+
+Usage:
+    python check_deepgram_client.py
+
+Starts a stub of Deepgram's prerecorded /v1/listen endpoint on localhost,
+points DEEPGRAM_API_URL at it (with short timeouts and backoff) and checks
+deepgram_utils.transcribe_audio_bytes:
+
+- success: transcript and confidence parsed, API key and options sent
+- retries with growing backoff on 429/5xx, then success
+- giving up after DEEPGRAM_MAX_RETRIES on persistent 5xx, and no retry on 400
+- the timeout path: a stalled upstream is retried and given up on in bounded time
+- the concurrency cap: never more than DEEPGRAM_MAX_CONCURRENCY requests in flight
+
+Exits non-zero if any check fails.
+"""
+import asyncio
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+MAX_CONCURRENCY = 2
+MAX_RETRIES = 2
+TIMEOUT_SECONDS = 0.5
+BACKOFF_SECONDS = 0.05
+
+
+class Stub:
+    """Scripted responses: each request pops (status, delay seconds); 200 once the script runs out"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.script = []
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def reset(self, script=()):
+        # Handlers of timed-out requests keep sleeping after the client hangs up
+        while self.in_flight:
+            time.sleep(0.01)
+        with self.lock:
+            self.script = list(script)
+            self.requests = []
+            self.max_in_flight = 0
+
+    def next_response(self):
+        with self.lock:
+            return self.script.pop(0) if self.script else (200, 0.0)
+
+
+stub = Stub()
+
+
+class Handler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        url = urlparse(self.path)
+        with stub.lock:
+            stub.requests.append({
+                "time": time.perf_counter(),
+                "path": url.path,
+                "query": parse_qs(url.query),
+                "authorization": self.headers.get("Authorization"),
+                "content_type": self.headers.get("Content-Type"),
+                "body": body,
+            })
+            stub.in_flight += 1
+            stub.max_in_flight = max(stub.max_in_flight, stub.in_flight)
+        try:
+            status, delay = stub.next_response()
+            time.sleep(delay)
+            payload = json.dumps({"results": {"channels": [{"alternatives": [
+                {"transcript": f"heard {body.decode(errors='ignore')}", "confidence": 0.9}
+            ]}]}}).encode() if status == 200 else b'{"err_msg": "stub error"}'
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # the client timed out and hung up
+        finally:
+            with stub.lock:
+                stub.in_flight -= 1
+
+    def log_message(self, format, *args):
+        pass
+
+
+server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+server.daemon_threads = True
+threading.Thread(target=server.serve_forever, daemon=True).start()
+
+os.environ.update({
+    "DEEPGRAM_API_KEY": "stub-key",
+    "DEEPGRAM_API_URL": f"http://127.0.0.1:{server.server_port}",
+    "DEEPGRAM_MAX_CONCURRENCY": str(MAX_CONCURRENCY),
+    "DEEPGRAM_MAX_RETRIES": str(MAX_RETRIES),
+    "DEEPGRAM_TIMEOUT_SECONDS": str(TIMEOUT_SECONDS),
+    "DEEPGRAM_RETRY_BACKOFF_SECONDS": str(BACKOFF_SECONDS),
+})
+
+import deepgram_utils  # noqa: E402  (reads the settings above at import)
+
+_audio_ids = itertools.count()
+
+
+def audio():
+    """Distinct bytes per call, so no check is answered from the transcription cache"""
+    return f"clip-{next(_audio_ids)}".encode()
+
+
+failures = 0
+
+
+def expect(condition, message):
+    global failures
+    print(f"{'✓' if condition else '✗'} {message}")
+    failures += not condition
+
+
+async def main():
+    # Success
+    stub.reset()
+    clip = audio()
+    transcript, confidence = await deepgram_utils.transcribe_audio_bytes(clip, "audio/webm")
+    request = stub.requests[0]
+    expect(
+        (transcript, confidence) == (f"heard {clip.decode()}", 0.9) and len(stub.requests) == 1,
+        "success: transcript and confidence from one request"
+    )
+    expect(
+        request["path"] == "/v1/listen" and request["authorization"] == "Token stub-key"
+        and request["query"].get("model") == ["nova-2"] and request["content_type"] == "audio/webm"
+        and request["body"] == clip,
+        "success: API key, options, content type and audio sent"
+    )
+
+    # Retry with backoff on 429 and 5xx
+    stub.reset([(429, 0.0), (503, 0.0)])
+    clip = audio()
+    transcript, _ = await deepgram_utils.transcribe_audio_bytes(clip, "audio/webm")
+    gaps = [later["time"] - earlier["time"] for earlier, later in zip(stub.requests, stub.requests[1:])]
+    expect(transcript == f"heard {clip.decode()}" and len(stub.requests) == 3, "429 then 503: retried until success")
+    expect(
+        len(gaps) == 2 and gaps[0] >= BACKOFF_SECONDS and gaps[1] >= 2 * BACKOFF_SECONDS,
+        f"429 then 503: exponential backoff between attempts ({', '.join(f'{gap * 1000:.0f}ms' for gap in gaps)})"
+    )
+
+    # Persistent 5xx gives up after the retries; 4xx is not retried
+    stub.reset([(500, 0.0)] * (MAX_RETRIES + 1))
+    transcript, confidence = await deepgram_utils.transcribe_audio_bytes(audio(), "audio/webm")
+    expect(
+        (transcript, confidence) == ("", 0.0) and len(stub.requests) == MAX_RETRIES + 1,
+        f"persistent 500: {MAX_RETRIES + 1} attempts, then an empty transcript"
+    )
+    stub.reset([(400, 0.0)])
+    transcript, _ = await deepgram_utils.transcribe_audio_bytes(audio(), "audio/webm")
+    expect(transcript == "" and len(stub.requests) == 1, "400: not retried")
+
+    # Timeout: every attempt stalls past DEEPGRAM_TIMEOUT_SECONDS
+    stub.reset([(200, TIMEOUT_SECONDS * 4)] * (MAX_RETRIES + 1))
+    started = time.perf_counter()
+    transcript, _ = await deepgram_utils.transcribe_audio_bytes(audio(), "audio/webm")
+    elapsed = time.perf_counter() - started
+    budget = (MAX_RETRIES + 1) * TIMEOUT_SECONDS + 4 * BACKOFF_SECONDS * 2 ** MAX_RETRIES + 1.0
+    expect(
+        transcript == "" and len(stub.requests) == MAX_RETRIES + 1 and elapsed < budget,
+        f"stalled upstream: {len(stub.requests)} timed-out attempts, gave up after {elapsed:.2f}s"
+    )
+    # A timeout followed by a good response recovers
+    stub.reset([(200, TIMEOUT_SECONDS * 4)])
+    clip = audio()
+    transcript, _ = await deepgram_utils.transcribe_audio_bytes(clip, "audio/webm")
+    expect(transcript == f"heard {clip.decode()}" and len(stub.requests) == 2, "one timeout, then success on retry")
+
+    # Concurrency cap
+    stub.reset([(200, 0.2)] * 8)
+    results = await asyncio.gather(*(deepgram_utils.transcribe_audio_bytes(audio(), "audio/webm") for _ in range(8)))
+    expect(
+        all(transcript.startswith("heard ") for transcript, _ in results) and stub.max_in_flight == MAX_CONCURRENCY,
+        f"8 concurrent calls: at most {stub.max_in_flight} in flight upstream (cap {MAX_CONCURRENCY})"
+    )
+
+    await deepgram_utils.close_client()
+
+
+asyncio.run(main())
+server.shutdown()
+
+if failures:
+    print(f"\n❌ {failures} check(s) failed")
+    sys.exit(1)
+print("\n✅ Deepgram client behaves against the stub server")
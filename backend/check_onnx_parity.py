@@ -0,0 +1,125 @@
+"""
+Parity and performance check: int8 ONNX backend vs fp32 SentenceTransformer
+
+Usage:
+    python check_onnx_parity.py [tolerance]
+
+Scores a fixed set of answer/definition pairs with both backends and fails
+(exit code 1) if any cosine score differs by more than the tolerance
+(default 0.03). Also reports per-pair latency, batched throughput and the
+resident memory each backend adds. Each backend runs in its own subprocess
+so memory numbers are not polluted by the other runtime.
+"""
+import json
+import os
+import subprocess
+import sys
+import time
+
+PAIRS = [
+    ("designing and decorating useful objects", "concerned with the design and decoration of objects in practical use"),
+    ("plants turn sunlight into food", "the process by which green plants use sunlight to synthesize nutrients from carbon dioxide and water"),
+    ("the powerhouse of the cell", "an organelle in which the biochemical processes of respiration and energy production occur"),
+    ("a word that describes a noun", "a word naming an attribute of a noun, such as sweet, red, or technical"),
+    ("money paid to the government", "a compulsory contribution to state revenue, levied by the government on workers' income and business profits"),
+    ("when supply is more than demand prices go down", "the principle that prices fall when the supply of a good exceeds the demand for it"),
+    ("force equals mass times acceleration", "the acceleration of an object is directly proportional to the net force acting on it and inversely proportional to its mass"),
+    ("I don't know", "a sequence of instructions that a computer follows to solve a problem"),
+    ("a story that teaches a lesson using animals", "a short story, typically with animals as characters, conveying a moral"),
+    ("", "the smallest unit of a chemical element that retains its properties"),
+    ("the study of living things", "the study of living organisms, divided into many specialized fields that cover their morphology, physiology, anatomy, behavior, origin, and distribution"),
+    ("a triangle with all sides equal", "a triangle whose three sides are all of equal length"),
+]
+
+
+def _rss_mb() -> float:
+    """Current resident set size in MB (Linux), falling back to peak RSS"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6
+    except OSError:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1e3
+
+
+def measure(backend_name: str) -> dict:
+    """Load one backend and score every pair (runs inside a subprocess)"""
+    import numpy as np
+    from embedding_backends import create_backend
+    from sbert_utils import MODEL_NAME
+
+    rss_before = _rss_mb()
+    started = time.perf_counter()
+    backend = create_backend(MODEL_NAME, backend_name)
+    backend.encode(["warmup"])
+    load_seconds = time.perf_counter() - started
+    rss_after = _rss_mb()
+
+    # Per-pair latency, as in a single /evaluate call
+    scores, latencies = [], []
+    for answer, definition in PAIRS:
+        started = time.perf_counter()
+        answer_vec, definition_vec = backend.encode([answer, definition])
+        latencies.append(time.perf_counter() - started)
+        scores.append(max(0.0, min(1.0, float(np.dot(answer_vec, definition_vec)))))
+
+    # Batched throughput, as produced by the inference scheduler
+    texts = [text for pair in PAIRS for text in pair] * 4
+    started = time.perf_counter()
+    backend.encode(texts)
+    batch_seconds = time.perf_counter() - started
+
+    return {
+        "backend": backend_name,
+        "scores": scores,
+        "load_seconds": load_seconds,
+        "rss_added_mb": rss_after - rss_before,
+        "rss_total_mb": _rss_mb(),
+        "median_pair_ms": 1000 * sorted(latencies)[len(latencies) // 2],
+        "batch_texts_per_second": len(texts) / batch_seconds,
+    }
+
+
+def run_in_subprocess(backend_name: str) -> dict:
+    result = subprocess.run(
+        [sys.executable, __file__, "--measure", backend_name],
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        print(result.stderr)
+        raise SystemExit(f"Backend '{backend_name}' failed")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 2 and sys.argv[1] == "--measure":
+        print(json.dumps(measure(sys.argv[2])))
+        sys.exit(0)
+
+    tolerance = float(sys.argv[1]) if len(sys.argv) > 1 else 0.03
+
+    reference = run_in_subprocess("sentence-transformers")
+    candidate = run_in_subprocess("onnx")
+
+    print(f"{'fp32':>7} {'onnx':>7} {'diff':>7}  answer")
+    diffs = []
+    for (answer, _), ref, cand in zip(PAIRS, reference["scores"], candidate["scores"]):
+        diffs.append(abs(ref - cand))
+        print(f"{ref:>7.4f} {cand:>7.4f} {diffs[-1]:>7.4f}  {answer[:50]!r}")
+
+    print(f"\n{'':<24}{'fp32 torch':>14}{'int8 onnx':>14}")
+    for key, label in (
+        ("load_seconds", "load time (s)"),
+        ("rss_added_mb", "model memory (MB)"),
+        ("rss_total_mb", "process RSS (MB)"),
+        ("median_pair_ms", "median pair (ms)"),
+        ("batch_texts_per_second", "batch texts/s"),
+    ):
+        print(f"{label:<24}{reference[key]:>14.1f}{candidate[key]:>14.1f}")
+
+    max_diff = max(diffs)
+    if max_diff > tolerance:
+        print(f"\n❌ Max score difference {max_diff:.4f} exceeds tolerance {tolerance}")
+        sys.exit(1)
+    print(f"\n✅ Max score difference {max_diff:.4f} within tolerance {tolerance}")
@@ -0,0 +1,147 @@
+"""
+Query-plan check for the hot study/card queries
+
+Usage:
+    python check_query_plans.py [users] [cards_per_user]
+
+Migrates and seeds a database (a throwaway SQLite file unless DATABASE_URL
+is set), runs ANALYZE, then EXPLAINs the queries behind the study endpoints
+and checks that each reads user_card_progress / cards through an index
+rather than a full table scan. Exits non-zero if any plan regresses, so it
+can run in CI against SQLite and PostgreSQL.
+
+Don't point DATABASE_URL at a database with real data: the seed rows are
+added to it.
+"""
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+if "DATABASE_URL" not in os.environ:
+    os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/check_query_plans.db"
+
+from sqlalchemy import and_, func, insert, select, text
+
+from database import engine
+from migrations import run_migrations
+from models import Card, Deck, User, UserCardProgress
+import queries
+
+USERS = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+CARDS_PER_USER = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+DECKS_PER_USER = 4
+
+
+def seed(connection):
+    if connection.execute(select(func.count()).select_from(User)).scalar() >= USERS:
+        return
+    now = datetime.utcnow()
+    for u in range(USERS):
+        user_id = connection.execute(
+            insert(User).values(username=f"plan-check-{u}", hashed_password="x").returning(User.id)
+        ).scalar()
+        cards_per_deck = CARDS_PER_USER // DECKS_PER_USER
+        for d in range(DECKS_PER_USER):
+            deck_id = connection.execute(
+                insert(Deck).values(user_id=user_id, name=f"Deck {d}").returning(Deck.id)
+            ).scalar()
+            connection.execute(insert(Card), [
+                {"deck_id": deck_id, "concept": f"Concept {c}", "definition": "Definition"}
+                for c in range(cards_per_deck)
+            ])
+            card_ids = connection.execute(select(Card.id).where(Card.deck_id == deck_id)).scalars().all()
+            connection.execute(insert(UserCardProgress), [
+                {
+                    "user_id": user_id, "card_id": card_id, "ease_factor": 2.5, "interval": 1,
+                    "repetitions": 1, "next_review": now + timedelta(hours=(card_id * 7) % 240 - 120),
+                }
+                for card_id in card_ids
+            ])
+
+
+def explain(connection, statement):
+    compiled = statement.compile(dialect=engine.dialect)
+    params = tuple(compiled.params[name] for name in compiled.positiontup) if compiled.positional else compiled.params
+    if engine.dialect.name == "sqlite":
+        rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}", params)
+        return [row[-1] for row in rows]
+    rows = connection.exec_driver_sql(f"EXPLAIN {compiled}", params)
+    return [row[0] for row in rows]
+
+
+def uses_index(plan, table):
+    """True if no step reads table with a full scan"""
+    for step in plan:
+        if engine.dialect.name == "sqlite":
+            if step.startswith(f"SCAN {table}") and "INDEX" not in step:
+                return False
+        elif f"Seq Scan on {table}" in step:
+            return False
+    return any(table in step for step in plan)
+
+
+run_migrations(engine)
+with engine.begin() as connection:
+    seed(connection)
+    connection.execute(text("ANALYZE"))
+
+with engine.connect() as connection:
+    user_id, deck_id = connection.execute(select(Deck.user_id, Deck.id).order_by(Deck.id.desc()).limit(1)).one()
+    card_id = connection.execute(select(Card.id).where(Card.deck_id == deck_id).limit(1)).scalar()
+    now = datetime.utcnow()
+
+    checks = [
+        (
+            "due cards in a deck (study.get_next_card_for_review)",
+            "user_card_progress",
+            select(Card, UserCardProgress).join(
+                UserCardProgress,
+                and_(Card.id == UserCardProgress.card_id, UserCardProgress.user_id == user_id)
+            ).where(Card.deck_id == deck_id, UserCardProgress.next_review <= now)
+            .order_by(UserCardProgress.next_review.asc()).limit(1),
+        ),
+        (
+            "due cards across decks (user_id, next_review)",
+            "user_card_progress",
+            select(UserCardProgress.card_id).where(
+                UserCardProgress.user_id == user_id, UserCardProgress.next_review <= now
+            ).order_by(UserCardProgress.next_review.asc()),
+        ),
+        (
+            "progress lookup (user_id, card_id)",
+            "user_card_progress",
+            select(UserCardProgress).where(
+                UserCardProgress.user_id == user_id, UserCardProgress.card_id == card_id
+            ),
+        ),
+        (
+            "cards in a deck (cards.get_deck_cards)",
+            "cards",
+            select(Card).where(Card.deck_id == deck_id),
+        ),
+        (
+            "keyset page of a deck (cards.get_deck_cards_page)",
+            "cards",
+            queries.card_page(deck_id, user_id, ["concept"], "id", (card_id,), 100),
+        ),
+        (
+            "streaming export of a deck (export.export_deck)",
+            "cards",
+            queries.export_rows(user_id, deck_id),
+        ),
+    ]
+
+    failures = 0
+    for name, table, statement in checks:
+        plan = explain(connection, statement)
+        ok = uses_index(plan, table)
+        failures += not ok
+        print(f"{'✓' if ok else '✗'} {name}")
+        for step in plan:
+            print(f"    {step}")
+
+if failures:
+    print(f"\n❌ {failures} query plan(s) scan {', '.join(sorted({c[1] for c in checks}))} without an index")
+    sys.exit(1)
+print("\n✅ All hot queries use an index")
@@ -0,0 +1,203 @@
+"""
+Denormalized deck counters
+
+- decks.card_count: cards in the deck
+- deck_due_counters: per (user, deck, UTC day), how many of the user's
+  progress rows in the deck have next_review on that day
+
+Both are kept up to date by a flush listener on every ORM Session (sync and
+async), in the same transaction as the change: adding or deleting a Card or
+UserCardProgress, or moving a progress row's next_review (reviews, resets).
+Bulk query.update()/delete() and raw SQL bypass the listener; run
+`python repair_counters.py` after those (it rebuilds both counters from the
+base tables and reports any drift).
+
+Due-now counts then only need the counters for past days plus an indexed
+count of today's rows (see queries.cards_remaining).
+"""
+from collections import Counter
+from datetime import date, datetime, timezone
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import delete, event, func, inspect, select, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from models import Card, Deck, DeckDueCounter, UserCardProgress
+
+
+def due_day(next_review: Optional[datetime]) -> Optional[date]:
+    """UTC day a review falls on (naive datetimes are UTC, as stored by the app)"""
+    if next_review is None:
+        return None
+    if next_review.tzinfo is not None:
+        next_review = next_review.astimezone(timezone.utc)
+    return next_review.date()
+
+
+def _next_review_change(progress: UserCardProgress) -> Tuple[Optional[date], Optional[date]]:
+    """(day before, day after) of a progress row's next_review in this flush"""
+    history = inspect(progress).attrs.next_review.history
+    if history.deleted:
+        before = history.deleted[0]
+    elif history.unchanged:
+        before = history.unchanged[0]
+    else:
+        before = None
+    after = history.added[0] if history.added else before
+    return due_day(before), due_day(after)
+
+
+def _increment_due_counters(connection: Connection, deltas: Dict[Tuple[int, int, date], int]) -> None:
+    if connection.dialect.name == "postgresql":
+        insert = postgresql_insert
+    else:
+        insert = sqlite_insert
+
+    for (user_id, deck_id, day), delta in deltas.items():
+        statement = insert(DeckDueCounter).values(user_id=user_id, deck_id=deck_id, day=day, due_count=delta)
+        connection.execute(statement.on_conflict_do_update(
+            index_elements=["user_id", "deck_id", "day"],
+            set_={"due_count": DeckDueCounter.due_count + statement.excluded.due_count},
+        ))
+
+
+@event.listens_for(Session, "after_flush")
+def _update_counters(session, flush_context):
+    # After the flush: new rows have their ids, and new/deleted/dirty plus
+    # attribute history still describe what this flush changed
+    deleted_decks = {obj.id for obj in session.deleted if isinstance(obj, Deck)}
+    card_decks = {
+        obj.id: obj.deck_id
+        for obj in (*session.new, *session.deleted, *session.dirty)
+        if isinstance(obj, Card)
+    }
+
+    card_count_deltas = Counter()
+    progress_moves: List[Tuple[int, int, Optional[date], Optional[date]]] = []
+    for obj in session.new:
+        if isinstance(obj, Card):
+            card_count_deltas[obj.deck_id] += 1
+        elif isinstance(obj, UserCardProgress):
+            progress_moves.append((obj.user_id, obj.card_id, None, due_day(obj.next_review)))
+    for obj in session.deleted:
+        if isinstance(obj, Card):
+            card_count_deltas[obj.deck_id] -= 1
+        elif isinstance(obj, UserCardProgress):
+            progress_moves.append((obj.user_id, obj.card_id, _next_review_change(obj)[0], None))
+    for obj in session.dirty:
+        if isinstance(obj, UserCardProgress) and obj not in session.deleted:
+            before, after = _next_review_change(obj)
+            if before != after:
+                progress_moves.append((obj.user_id, obj.card_id, before, after))
+
+    connection = session.connection()
+
+    # Deck of each moved progress row (one query for cards not in the session)
+    unknown_cards = {card_id for _, card_id, _, _ in progress_moves if card_id not in card_decks}
+    if unknown_cards:
+        card_decks.update(connection.execute(select(Card.id, Card.deck_id).where(Card.id.in_(unknown_cards))).all())
+
+    due_deltas = Counter()
+    for user_id, card_id, before, after in progress_moves:
+        deck_id = card_decks.get(card_id)
+        if deck_id is None:
+            continue
+        if before is not None:
+            due_deltas[(user_id, deck_id, before)] -= 1
+        if after is not None:
+            due_deltas[(user_id, deck_id, after)] += 1
+
+    # A deleted deck takes its counters with it
+    card_count_deltas = {deck_id: delta for deck_id, delta in card_count_deltas.items() if delta and deck_id not in deleted_decks}
+    due_deltas = {key: delta for key, delta in due_deltas.items() if delta and key[1] not in deleted_decks}
+
+    for deck_id, delta in card_count_deltas.items():
+        # updated_at is set explicitly so the column's onupdate doesn't mark the deck as edited
+        connection.execute(update(Deck).where(Deck.id == deck_id).values(
+            card_count=Deck.card_count + delta, updated_at=Deck.updated_at
+        ))
+    if due_deltas:
+        _increment_due_counters(connection, due_deltas)
+
+    if card_count_deltas:
+        session.info.setdefault("recounted_decks", set()).update(card_count_deltas)
+
+
+@event.listens_for(Session, "after_flush_postexec")
+def _expire_card_counts(session, flush_context):
+    # Loaded Deck objects would otherwise keep showing the pre-flush card_count
+    for deck_id in session.info.pop("recounted_decks", ()):
+        deck = session.identity_map.get(inspect(Deck).identity_key_from_primary_key((deck_id,)))
+        if deck is not None:
+            session.expire(deck, ["card_count"])
+
+
+class Drift(NamedTuple):
+    counter: str
+    key: tuple
+    stored: int
+    actual: int
+
+
+def find_drift(connection: Connection) -> List[Drift]:
+    """Compare both counters against counts rebuilt from cards and user_card_progress"""
+    drift = []
+
+    actual_card_counts = dict(connection.execute(
+        select(Card.deck_id, func.count(Card.id)).group_by(Card.deck_id)
+    ).all())
+    for deck_id, stored in connection.execute(select(Deck.id, Deck.card_count)):
+        actual = actual_card_counts.get(deck_id, 0)
+        if stored != actual:
+            drift.append(Drift("decks.card_count", (deck_id,), stored, actual))
+
+    actual_due = Counter()
+    rows = connection.execute(
+        select(UserCardProgress.user_id, Card.deck_id, UserCardProgress.next_review)
+        .join(Card, Card.id == UserCardProgress.card_id)
+        .where(UserCardProgress.next_review.is_not(None))
+        .execution_options(yield_per=5000)
+    )
+    for user_id, deck_id, next_review in rows:
+        actual_due[(user_id, deck_id, due_day(next_review))] += 1
+
+    stored_due = {
+        (user_id, deck_id, day): due_count
+        for user_id, deck_id, day, due_count in connection.execute(select(
+            DeckDueCounter.user_id, DeckDueCounter.deck_id, DeckDueCounter.day, DeckDueCounter.due_count
+        ))
+    }
+    for key in sorted(stored_due.keys() | actual_due.keys()):
+        stored, actual = stored_due.get(key, 0), actual_due.get(key, 0)
+        if stored != actual:
+            drift.append(Drift("deck_due_counters", key, stored, actual))
+
+    return drift
+
+
+def repair_counters(connection: Connection) -> List[Drift]:
+    """
+    Rewrite every drifted counter with its rebuilt value and drop empty
+    due-day rows; run inside a transaction (engine.begin())
+
+    Returns:
+        list: The drift that was found (and fixed)
+    """
+    drift = find_drift(connection)
+    for counter, key, stored, actual in drift:
+        if counter == "decks.card_count":
+            connection.execute(update(Deck).where(Deck.id == key[0]).values(card_count=actual, updated_at=Deck.updated_at))
+            continue
+        user_id, deck_id, day = key
+        connection.execute(delete(DeckDueCounter).where(
+            DeckDueCounter.user_id == user_id, DeckDueCounter.deck_id == deck_id, DeckDueCounter.day == day
+        ))
+        if actual:
+            connection.execute(DeckDueCounter.__table__.insert().values(
+                user_id=user_id, deck_id=deck_id, day=day, due_count=actual
+            ))
+    connection.execute(delete(DeckDueCounter).where(DeckDueCounter.due_count == 0))
+    return drift
@@ -1,67 +0,0 @@
-"""
-Create tables using raw SQL
-"""
-from database import engine
-from sqlalchemy import text
-
-create_tables_sql = """
--- Decks table
-CREATE TABLE IF NOT EXISTS decks (
-    id SERIAL PRIMARY KEY,
-    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
-    name VARCHAR NOT NULL,
-    description TEXT,
-    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
-    updated_at TIMESTAMP WITH TIME ZONE
-);
-
--- Cards table  
-CREATE TABLE IF NOT EXISTS cards (
-    id SERIAL PRIMARY KEY,
-    deck_id INTEGER NOT NULL REFERENCES decks(id) ON DELETE CASCADE,
-    concept VARCHAR NOT NULL,
-    definition TEXT NOT NULL,
-    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
-    updated_at TIMESTAMP WITH TIME ZONE
-);
-
--- User card progress table
-CREATE TABLE IF NOT EXISTS user_card_progress (
-    id SERIAL PRIMARY KEY,
-    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
-    card_id INTEGER NOT NULL REFERENCES cards(id) ON DELETE CASCADE,
-    ease_factor DOUBLE PRECISION DEFAULT 2.5,
-    interval INTEGER DEFAULT 0,
-    repetitions INTEGER DEFAULT 0,
-    next_review TIMESTAMP WITH TIME ZONE,
-    last_reviewed TIMESTAMP WITH TIME ZONE,
-    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
-    updated_at TIMESTAMP WITH TIME ZONE
-);
-
--- Reviews table
-CREATE TABLE IF NOT EXISTS reviews (
-    id SERIAL PRIMARY KEY,
-    card_id INTEGER NOT NULL REFERENCES cards(id) ON DELETE CASCADE,
-    user_id INTEGER NOT NULL REFERENCES users(id),
-    user_answer TEXT NOT NULL,
-    similarity_score DOUBLE PRECISION NOT NULL,
-    quality INTEGER NOT NULL,
-    reviewed_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
-);
-"""
-
-try:
-    with engine.connect() as connection:
-        # Execute each statement
-        for statement in create_tables_sql.split(';'):
-            statement = statement.strip()
-            if statement and not statement.startswith('--'):
-                print(f"Executing: {statement[:50]}...")
-                connection.execute(text(statement))
-                connection.commit()
-        
-    print("\n✅ All tables created successfully!")
-    
-except Exception as e:
-    print(f"\n❌ Error creating tables: {e}")
@@ -1,33 +1,119 @@
 import os
-from sqlalchemy import create_engine
+import itertools
+import threading
+from typing import Optional
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from dotenv import load_dotenv
+from cache_utils import TTLCache
+from instrumentation import instrument_engine
 
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./rekite.db")
 
-# Use SQLite for development if PostgreSQL is not available
-if DATABASE_URL.startswith("postgresql"):
-    engine = create_engine(
-        DATABASE_URL,
-        pool_pre_ping=True,  # Test connections before using them
-        pool_recycle=300,    # Recycle connections after 5 minutes (Supabase timeout)
-        pool_size=5,         # Number of connections to keep in pool
-        max_overflow=10,     # Max additional connections beyond pool_size
-        connect_args={
-            "sslmode": "require",  # Required for Supabase
-            "connect_timeout": 10,
-        }
-    )
-else:
-    engine = create_engine(
-        DATABASE_URL, connect_args={"check_same_thread": False}
+# "async" serves the deck, card and study routes from async handlers on an
+# asyncpg/aiosqlite engine; "sync" keeps the threadpool + psycopg2 handlers
+DATABASE_MODE = os.getenv("DATABASE_MODE", "sync").lower()
+
+# Optional comma-separated read replicas for dashboard reads (see get_read_db)
+READ_REPLICA_URLS = [url.strip() for url in os.getenv("READ_REPLICA_URLS", "").split(",") if url.strip()]
+# Seconds between background SELECT 1 probes of the read replicas
+REPLICA_HEALTH_CHECK_SECONDS = float(os.getenv("REPLICA_HEALTH_CHECK_SECONDS", "10"))
+# Seconds a user's reads stay on the primary after they commit a write
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", "10"))
+
+# SQLite profile for single-node deployments (applied to every new connection)
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "65536"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+# Serialize writing sessions in-process instead of letting them fight over the file lock
+SQLITE_SINGLE_WRITER = os.getenv("SQLITE_SINGLE_WRITER", "true").lower() == "true"
+
+def _create_engine(url: str, name: str):
+    """Engine for url, instrumented under the pool label name (see /metrics)"""
+    engine = _build_engine(url)
+    instrument_engine(engine, name)
+    return engine
+
+def _build_engine(url: str):
+    # Use SQLite for development if PostgreSQL is not available
+    if url.startswith("postgresql"):
+        return create_engine(
+            url,
+            pool_pre_ping=True,  # Test connections before using them
+            pool_recycle=300,    # Recycle connections after 5 minutes (Supabase timeout)
+            pool_size=5,         # Number of connections to keep in pool
+            max_overflow=10,     # Max additional connections beyond pool_size
+            connect_args={
+                "sslmode": "require",  # Required for Supabase
+                "connect_timeout": 10,
+            }
+        )
+    sqlite_engine = create_engine(
+        url, connect_args={"check_same_thread": False}
     )
+    configure_sqlite(sqlite_engine)
+    return sqlite_engine
+
+def configure_sqlite(sqlite_engine) -> None:
+    """
+    Apply the SQLite profile (SQLITE_* settings) to each new connection
+
+    WAL lets readers run alongside the writer, synchronous=NORMAL drops the
+    fsync per commit (still durable against application crashes), and
+    busy_timeout makes a blocked writer wait instead of failing with
+    "database is locked".
+    """
+    @event.listens_for(sqlite_engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute(f"PRAGMA busy_timeout = {SQLITE_BUSY_TIMEOUT_MS}")
+            cursor.execute(f"PRAGMA journal_mode = {SQLITE_JOURNAL_MODE}")
+            cursor.execute(f"PRAGMA synchronous = {SQLITE_SYNCHRONOUS}")
+            # Negative cache_size is in KiB rather than pages
+            cursor.execute(f"PRAGMA cache_size = -{SQLITE_CACHE_SIZE_KB}")
+            cursor.execute(f"PRAGMA mmap_size = {SQLITE_MMAP_SIZE}")
+        finally:
+            cursor.close()
+
+def use_single_writer(session_factory: sessionmaker) -> None:
+    """
+    Let one session at a time write through session_factory
+
+    The lock is taken on a session's first flush (pysqlite only opens the
+    write transaction at the first INSERT/UPDATE/DELETE, so reads before it
+    run freely) and released when that transaction commits, rolls back or is
+    closed. Concurrent review commits then queue in-process rather than
+    spinning on SQLite's file lock. A writer that waits longer than
+    SQLITE_BUSY_TIMEOUT_MS goes ahead and leaves it to busy_timeout.
+    """
+    write_lock = threading.Lock()
+    
+    @event.listens_for(session_factory, "before_flush")
+    def _acquire_write_lock(session, flush_context, instances):
+        if session.info.get("write_lock"):
+            return
+        if write_lock.acquire(timeout=SQLITE_BUSY_TIMEOUT_MS / 1000):
+            session.info["write_lock"] = True
+    
+    @event.listens_for(session_factory, "after_transaction_end")
+    def _release_write_lock(session, transaction):
+        if transaction.parent is None and session.info.pop("write_lock", False):
+            write_lock.release()
+
+engine = _create_engine(DATABASE_URL, "primary")
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+if DATABASE_URL.startswith("sqlite") and SQLITE_SINGLE_WRITER:
+    use_single_writer(SessionLocal)
+
 Base = declarative_base()
 
 def get_db():
@@ -36,3 +122,148 @@ def get_db():
         yield db
     finally:
         db.close()
+
+class Replica:
+    """A read replica with a cached health status"""
+    
+    def __init__(self, url: str, name: str):
+        self.url = url
+        self.engine = _create_engine(url, name)
+        self.sessionmaker = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+        self.healthy = True
+        # Connection errors on this replica take it out of rotation right away
+        event.listen(self.engine, "handle_error", self._on_error)
+    
+    def _on_error(self, context) -> None:
+        if context.is_disconnect or isinstance(context.sqlalchemy_exception, OperationalError):
+            self.healthy = False
+    
+    def is_available(self) -> bool:
+        """Last known health; never touches the network (see start_replica_health_checks)"""
+        return self.healthy
+    
+    def check(self) -> None:
+        """Probe the replica with SELECT 1 and update its health"""
+        try:
+            with self.engine.connect() as connection:
+                connection.execute(text("SELECT 1"))
+            self.healthy = True
+        except Exception as e:
+            if self.healthy:
+                print(f"Read replica unavailable, reading from primary: {e}")
+            self.healthy = False
+
+replicas = [Replica(url, f"replica{index}") for index, url in enumerate(READ_REPLICA_URLS)]
+_replica_cycle = itertools.count()
+
+# Users who committed recently; their reads go to the primary so they see their own writes
+recent_writers = TTLCache(maxsize=100000, ttl=READ_YOUR_WRITES_SECONDS)
+
+@event.listens_for(SessionLocal, "after_flush")
+def _note_write(session, flush_context):
+    session.info["wrote"] = True
+
+@event.listens_for(SessionLocal, "after_commit")
+def _mark_recent_writer(session):
+    # user_id is set on the request session by auth_utils.get_current_user
+    if session.info.pop("wrote", False) and "user_id" in session.info:
+        recent_writers.set(session.info["user_id"], True)
+
+_replica_health_stop = threading.Event()
+
+def _check_replicas() -> None:
+    while not _replica_health_stop.wait(REPLICA_HEALTH_CHECK_SECONDS):
+        for replica in replicas:
+            replica.check()
+
+def start_replica_health_checks() -> None:
+    """
+    Probe the replicas every REPLICA_HEALTH_CHECK_SECONDS on a background
+    thread, so a dead replica's connect timeout is never paid by a request
+    """
+    if replicas:
+        _replica_health_stop.clear()
+        threading.Thread(target=_check_replicas, name="replica-health", daemon=True).start()
+
+def stop_replica_health_checks() -> None:
+    _replica_health_stop.set()
+
+def read_sessionmaker_for(user_id: Optional[int] = None) -> sessionmaker:
+    """
+    Session factory for a read-only request: a healthy replica (round robin),
+    or the primary if there are none, all are down, or the user just wrote
+    """
+    if not replicas or (user_id is not None and recent_writers.get(user_id)):
+        return SessionLocal
+    
+    start = next(_replica_cycle)
+    for offset in range(len(replicas)):
+        replica = replicas[(start + offset) % len(replicas)]
+        if replica.is_available():
+            return replica.sessionmaker
+    return SessionLocal
+
+def get_async_database_url(url: str = DATABASE_URL) -> str:
+    """DATABASE_URL with the async driver (asyncpg for PostgreSQL, aiosqlite for SQLite)"""
+    scheme, rest = url.split("://", 1)
+    if scheme.startswith("postgres"):
+        return f"postgresql+asyncpg://{rest}"
+    if scheme.startswith("sqlite"):
+        return f"sqlite+aiosqlite://{rest}"
+    return url
+
+_async_engine = None
+_async_session_factory = None
+
+def get_async_engine():
+    """
+    Async engine, created on first use so the async drivers stay optional
+    in sync mode
+    """
+    global _async_engine
+    if _async_engine is None:
+        from sqlalchemy.ext.asyncio import create_async_engine
+        
+        async_url = get_async_database_url()
+        if async_url.startswith("postgresql"):
+            _async_engine = create_async_engine(
+                async_url,
+                pool_pre_ping=True,
+                pool_recycle=300,
+                pool_size=5,
+                max_overflow=10,
+                connect_args={
+                    "ssl": "require",
+                    "timeout": 10,
+                    # Supabase's transaction-mode pooler can't use prepared statements
+                    "statement_cache_size": 0,
+                }
+            )
+        else:
+            _async_engine = create_async_engine(async_url)
+            configure_sqlite(_async_engine.sync_engine)
+        instrument_engine(_async_engine.sync_engine, "async")
+    return _async_engine
+
+def get_async_session_factory():
+    global _async_session_factory
+    if _async_session_factory is None:
+        from sqlalchemy.ext.asyncio import async_sessionmaker
+        
+        # Objects stay readable after commit without another (implicit) round trip
+        _async_session_factory = async_sessionmaker(
+            bind=get_async_engine(), autoflush=False, expire_on_commit=False
+        )
+    return _async_session_factory
+
+async def get_async_db():
+    async with get_async_session_factory()() as db:
+        yield db
+
+async def dispose_async_engine() -> None:
+    """Close the async engine's connections (called on app shutdown)"""
+    global _async_engine, _async_session_factory
+    if _async_engine is not None:
+        await _async_engine.dispose()
+        _async_engine = None
+        _async_session_factory = None
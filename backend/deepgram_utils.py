@@ -1,61 +1,215 @@
 import os
+import asyncio
+import random
+import time
 from dotenv import load_dotenv
 import base64
-from deepgram import DeepgramClient, PrerecordedOptions
+import httpx
+from transcription_cache import cache_key, transcription_cache
+from audio_preprocessing import normalize_audio
 
 load_dotenv()
 
 DEEPGRAM_API_KEY = os.getenv("DEEPGRAM_API_KEY")
+DEEPGRAM_API_URL = os.getenv("DEEPGRAM_API_URL", "https://api.deepgram.com")
+
+# Max transcriptions in flight per worker; extra requests wait for a slot
+DEEPGRAM_MAX_CONCURRENCY = int(os.getenv("DEEPGRAM_MAX_CONCURRENCY", "8"))
+DEEPGRAM_TIMEOUT_SECONDS = float(os.getenv("DEEPGRAM_TIMEOUT_SECONDS", "30"))
+DEEPGRAM_CONNECT_TIMEOUT_SECONDS = float(os.getenv("DEEPGRAM_CONNECT_TIMEOUT_SECONDS", "5"))
+DEEPGRAM_MAX_RETRIES = int(os.getenv("DEEPGRAM_MAX_RETRIES", "2"))
+DEEPGRAM_RETRY_BACKOFF_SECONDS = float(os.getenv("DEEPGRAM_RETRY_BACKOFF_SECONDS", "0.5"))
+
+# Largest audio upload accepted, enforced while the body streams in
+MAX_AUDIO_UPLOAD_BYTES = int(os.getenv("MAX_AUDIO_UPLOAD_BYTES", str(10 * 1024 * 1024)))
+
+# Transcription options (same as the previous PrerecordedOptions)
+TRANSCRIPTION_OPTIONS = {
+    "model": "nova-2",
+    "smart_format": "true",
+    "language": "en",
+    "punctuate": "true",
+}
+
+# Rate limiting and transient upstream failures are worth retrying
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+class TranscriptionUnavailable(Exception):
+    """Transcription is not configured (no DEEPGRAM_API_KEY)"""
+
+_client = None
+_semaphore = None
+
+# Upload size and upstream latency, split by whether preprocessing applied
+_upload_stats = {
+    kind: {"requests": 0, "bytes_before": 0, "bytes_sent": 0, "upstream_seconds": 0.0}
+    for kind in ("normalized", "passthrough", "skipped")
+}
+
+def get_client() -> httpx.AsyncClient:
+    """
+    Shared async HTTP client for Deepgram
+    Keeps connections alive between requests instead of a new client
+    (and TLS handshake) per transcription
+    """
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            base_url=DEEPGRAM_API_URL,
+            headers={"Authorization": f"Token {DEEPGRAM_API_KEY}"},
+            timeout=httpx.Timeout(DEEPGRAM_TIMEOUT_SECONDS, connect=DEEPGRAM_CONNECT_TIMEOUT_SECONDS),
+            limits=httpx.Limits(
+                max_connections=DEEPGRAM_MAX_CONCURRENCY,
+                max_keepalive_connections=DEEPGRAM_MAX_CONCURRENCY,
+            ),
+        )
+    return _client
+
+async def close_client() -> None:
+    """Close the shared client (called on app shutdown)"""
+    global _client, _semaphore
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+    _semaphore = None
+
+def _get_semaphore() -> asyncio.Semaphore:
+    global _semaphore
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(DEEPGRAM_MAX_CONCURRENCY)
+    return _semaphore
+
+async def _post_with_retries(audio_bytes: bytes, mimetype: str) -> dict:
+    """POST audio to Deepgram's prerecorded endpoint, retrying transient failures"""
+    client = get_client()
+
+    for attempt in range(DEEPGRAM_MAX_RETRIES + 1):
+        try:
+            response = await client.post(
+                "/v1/listen",
+                params=TRANSCRIPTION_OPTIONS,
+                content=audio_bytes,
+                headers={"Content-Type": mimetype},
+            )
+            if response.status_code not in RETRYABLE_STATUS_CODES:
+                response.raise_for_status()
+                return response.json()
+            error = httpx.HTTPStatusError(
+                f"Deepgram returned {response.status_code}",
+                request=response.request,
+                response=response,
+            )
+        except (httpx.TimeoutException, httpx.TransportError) as e:
+            error = e
+
+        if attempt == DEEPGRAM_MAX_RETRIES:
+            raise error
+
+        # Exponential backoff with jitter
+        delay = DEEPGRAM_RETRY_BACKOFF_SECONDS * (2 ** attempt)
+        await asyncio.sleep(delay + random.uniform(0, delay / 2))
+
+def _record_upload(stats: dict, upstream_seconds: float) -> None:
+    if stats["normalized"]:
+        kind = "normalized"
+    elif "decode_error" in stats:
+        kind = "skipped"  # A WAV/PCM upload that failed to decode
+    else:
+        kind = "passthrough"
+    totals = _upload_stats[kind]
+    totals["requests"] += 1
+    totals["bytes_before"] += stats["bytes_before"]
+    totals["bytes_sent"] += stats["bytes_after"]
+    totals["upstream_seconds"] += upstream_seconds
+
+def get_upload_stats() -> dict:
+    """
+    Average payload size and upstream latency with and without preprocessing
+    ("skipped": WAV/PCM uploads that failed to decode and were sent unchanged)
+    """
+    result = {}
+    for kind, totals in _upload_stats.items():
+        requests = totals["requests"]
+        result[kind] = {
+            "requests": requests,
+            "avg_bytes_before": totals["bytes_before"] / requests if requests else 0.0,
+            "avg_bytes_sent": totals["bytes_sent"] / requests if requests else 0.0,
+            "avg_upstream_ms": 1000 * totals["upstream_seconds"] / requests if requests else 0.0,
+        }
+    return result
+
+def _parse_transcript(payload: dict) -> tuple[str, float]:
+    """Extract transcript and confidence from a prerecorded response"""
+    channels = (payload.get("results") or {}).get("channels") or []
+    if channels:
+        alternatives = channels[0].get("alternatives") or []
+        if alternatives:
+            transcript = alternatives[0].get("transcript") or ""
+            confidence = alternatives[0].get("confidence") or 0.0
+            return transcript, confidence
+    return "", 0.0
+
+async def transcribe_audio_bytes(audio_bytes: bytes, mimetype: str = "audio/*") -> tuple[str, float]:
+    """
+    Transcribe raw audio bytes using Deepgram API
+    Runs on the event loop without blocking it; at most
+    DEEPGRAM_MAX_CONCURRENCY calls are in flight at once, and identical
+    audio is answered from the transcription cache
+
+    Args:
+        audio_bytes: Encoded audio (webm, wav, ...); WAV/PCM is normalized
+            to 16 kHz mono with silence trimmed before upload
+        mimetype: Content type of the audio
+
+    Returns:
+        tuple: (transcript, confidence_score)
+
+    Raises:
+        TranscriptionUnavailable: If DEEPGRAM_API_KEY is not configured
+    """
+    if not DEEPGRAM_API_KEY:
+        raise TranscriptionUnavailable("Transcription not available (API key not configured)")
+
+    async def transcribe_upstream():
+        # Downmix/resample/trim off the event loop; unsupported formats pass through
+        normalized = await asyncio.to_thread(normalize_audio, audio_bytes, mimetype)
+        async with _get_semaphore():
+            started = time.perf_counter()
+            payload = await _post_with_retries(normalized.audio, normalized.mimetype)
+            upstream_seconds = time.perf_counter() - started
+        _record_upload(normalized.stats, upstream_seconds)
+        return _parse_transcript(payload)
+
+    try:
+        # Retries of the same audio are served from cache (or share the in-flight call)
+        key = cache_key(audio_bytes, {**TRANSCRIPTION_OPTIONS, "mimetype": mimetype})
+        return await transcription_cache.get_or_transcribe(key, transcribe_upstream)
+
+    except Exception as e:
+        print(f"Deepgram transcription error: {e}")
+        return "", 0.0
 
 async def transcribe_audio(audio_base64: str) -> tuple[str, float]:
     """
     Transcribe audio using Deepgram API
-    
+
     Args:
         audio_base64: Base64 encoded audio data
-        
+
     Returns:
         tuple: (transcript, confidence_score)
+
+    Raises:
+        TranscriptionUnavailable: If DEEPGRAM_API_KEY is not configured
     """
     if not DEEPGRAM_API_KEY:
-        return "Transcription not available (API key not configured)", 0.0
-    
+        raise TranscriptionUnavailable("Transcription not available (API key not configured)")
+
+    # Decode base64 audio
     try:
-        # Initialize Deepgram client
-        deepgram = DeepgramClient(DEEPGRAM_API_KEY)
-        
-        # Decode base64 audio
         audio_bytes = base64.b64decode(audio_base64)
-        
-        # Prepare audio source
-        source = {"buffer": audio_bytes}
-        
-        # Configure transcription options
-        options = PrerecordedOptions(
-            model="nova-2",
-            smart_format=True,
-            language="en",
-            punctuate=True,
-        )
-        
-        # Transcribe audio
-        response = deepgram.listen.prerecorded.v("1").transcribe_file(
-            source,
-            options
-        )
-        
-        # Extract transcript and confidence
-        if response and response.results:
-            channels = response.results.channels
-            if channels and len(channels) > 0:
-                alternatives = channels[0].alternatives
-                if alternatives and len(alternatives) > 0:
-                    transcript = alternatives[0].transcript or ""
-                    confidence = alternatives[0].confidence or 0.0
-                    return transcript, confidence
-        
-        return "", 0.0
-        
-    except Exception as e:
+    except ValueError as e:
         print(f"Deepgram transcription error: {e}")
         return "", 0.0
+
+    return await transcribe_audio_bytes(audio_bytes)
@@ -0,0 +1,147 @@
+"""
+Pluggable embedding backends for answer scoring
+
+- sentence-transformers: the fp32 PyTorch SentenceTransformer model
+- onnx: an exported, dynamically quantized (int8) ONNX Runtime model loaded
+  from a local file (see export_onnx.py)
+
+Every backend returns unit-length float32 vectors, so cosine similarity is a
+dot product regardless of the backend in use.
+"""
+import os
+import importlib.util
+from abc import ABC, abstractmethod
+from typing import List
+
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "sentence-transformers")
+ONNX_MODEL_PATH = os.getenv("ONNX_MODEL_PATH", "models/all-MiniLM-L6-v2-int8.onnx")
+ONNX_TOKENIZER_PATH = os.getenv("ONNX_TOKENIZER_PATH", "models/tokenizer.json")
+ONNX_MAX_SEQ_LENGTH = int(os.getenv("ONNX_MAX_SEQ_LENGTH", "256"))
+ONNX_THREADS = int(os.getenv("ONNX_THREADS", "0"))  # 0 lets ONNX Runtime decide
+
+
+class EmbeddingBackend(ABC):
+    """Interface implemented by every embedding backend"""
+
+    name = "base"
+
+    def __init__(self, model_name: str):
+        self.model_name = model_name
+
+    @classmethod
+    @abstractmethod
+    def is_available(cls) -> bool:
+        """Whether the packages this backend needs are installed"""
+
+    @abstractmethod
+    def load(self) -> None:
+        """Load model weights; called once, off the request path"""
+
+    @abstractmethod
+    def encode(self, texts: List[str]):
+        """Encode texts into a (len(texts), dim) array of unit-length float32 vectors"""
+
+
+class SentenceTransformerBackend(EmbeddingBackend):
+    """fp32 PyTorch SentenceTransformer"""
+
+    name = "sentence-transformers"
+
+    @classmethod
+    def is_available(cls) -> bool:
+        return importlib.util.find_spec("sentence_transformers") is not None
+
+    def load(self) -> None:
+        from sentence_transformers import SentenceTransformer
+        self.model = SentenceTransformer(self.model_name)
+
+    def encode(self, texts: List[str]):
+        import numpy as np
+
+        embeddings = self.model.encode(
+            texts,
+            batch_size=len(texts),
+            convert_to_numpy=True,
+            normalize_embeddings=True
+        )
+        return embeddings.astype(np.float32)
+
+
+class OnnxBackend(EmbeddingBackend):
+    """
+    Quantized ONNX Runtime model
+
+    The graph is the bare transformer (token embeddings out); mean pooling
+    and normalization match the SentenceTransformer pipeline and are done in NumPy.
+    """
+
+    name = "onnx"
+
+    def __init__(self, model_name: str, model_path: str = ONNX_MODEL_PATH, tokenizer_path: str = ONNX_TOKENIZER_PATH):
+        super().__init__(model_name)
+        self.model_path = model_path
+        self.tokenizer_path = tokenizer_path
+
+    @classmethod
+    def is_available(cls) -> bool:
+        return all(importlib.util.find_spec(pkg) is not None for pkg in ("onnxruntime", "tokenizers", "numpy"))
+
+    def load(self) -> None:
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        if not os.path.exists(self.model_path):
+            raise FileNotFoundError(f"ONNX model not found at {self.model_path} (run export_onnx.py)")
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if ONNX_THREADS:
+            options.intra_op_num_threads = ONNX_THREADS
+
+        self.session = ort.InferenceSession(self.model_path, options, providers=["CPUExecutionProvider"])
+        self.input_names = {model_input.name for model_input in self.session.get_inputs()}
+
+        self.tokenizer = Tokenizer.from_file(self.tokenizer_path)
+        self.tokenizer.enable_truncation(max_length=ONNX_MAX_SEQ_LENGTH)
+        self.tokenizer.enable_padding()
+
+    def encode(self, texts: List[str]):
+        import numpy as np
+
+        encodings = self.tokenizer.encode_batch(texts)
+        input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+
+        feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self.input_names:
+            feeds["token_type_ids"] = np.array([e.type_ids for e in encodings], dtype=np.int64)
+
+        token_embeddings = self.session.run(None, feeds)[0]
+
+        # Mean pooling over real (non-padding) tokens, then L2 normalize
+        mask = attention_mask[:, :, None].astype(np.float32)
+        summed = (token_embeddings * mask).sum(axis=1)
+        counts = np.clip(mask.sum(axis=1), 1e-9, None)
+        embeddings = summed / counts
+        norms = np.clip(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12, None)
+        return (embeddings / norms).astype(np.float32)
+
+
+BACKENDS = {
+    SentenceTransformerBackend.name: SentenceTransformerBackend,
+    OnnxBackend.name: OnnxBackend,
+}
+
+
+def get_backend_class(name: str = EMBEDDING_BACKEND):
+    """Look up a backend class by name (EMBEDDING_BACKEND by default)"""
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown embedding backend '{name}'; choose one of {sorted(BACKENDS)}")
+    return BACKENDS[name]
+
+
+def create_backend(model_name: str, name: str = EMBEDDING_BACKEND) -> EmbeddingBackend:
+    """Create and load an embedding backend"""
+    backend = get_backend_class(name)(model_name)
+    backend.load()
+    return backend
@@ -0,0 +1,70 @@
+"""
+Export the SBERT model to ONNX and quantize it to int8 for CPU inference
+
+Usage:
+    python export_onnx.py [output_dir]
+
+Writes <output_dir>/<model>-fp32.onnx, <output_dir>/<model>-int8.onnx and
+<output_dir>/tokenizer.json (default output_dir: models/). Requires torch,
+sentence-transformers, onnx and onnxruntime; only onnxruntime and tokenizers
+are needed at serving time (EMBEDDING_BACKEND=onnx).
+"""
+import os
+import sys
+
+import torch
+from onnxruntime.quantization import QuantType, quantize_dynamic
+from sentence_transformers import SentenceTransformer
+
+from sbert_utils import MODEL_NAME
+
+output_dir = sys.argv[1] if len(sys.argv) > 1 else "models"
+os.makedirs(output_dir, exist_ok=True)
+
+model_slug = os.path.basename(MODEL_NAME.rstrip("/"))
+fp32_path = os.path.join(output_dir, f"{model_slug}-fp32.onnx")
+int8_path = os.path.join(output_dir, f"{model_slug}-int8.onnx")
+
+print(f"Loading {MODEL_NAME}...")
+sentence_model = SentenceTransformer(MODEL_NAME, device="cpu")
+transformer = sentence_model[0].auto_model.eval()
+tokenizer = sentence_model[0].tokenizer
+
+# The ONNX graph outputs token embeddings; pooling/normalization run in NumPy
+sample = tokenizer(["export sample sentence"], return_tensors="pt")
+input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+dynamic_axes["token_embeddings"] = {0: "batch", 1: "sequence"}
+
+
+class TokenEmbeddings(torch.nn.Module):
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, *inputs):
+        return self.model(**dict(zip(input_names, inputs))).last_hidden_state
+
+
+print(f"Exporting fp32 graph to {fp32_path}...")
+with torch.no_grad():
+    torch.onnx.export(
+        TokenEmbeddings(transformer),
+        tuple(sample[name] for name in input_names),
+        fp32_path,
+        input_names=input_names,
+        output_names=["token_embeddings"],
+        dynamic_axes=dynamic_axes,
+        opset_version=17,
+        dynamo=False,
+    )
+
+print(f"Quantizing weights to int8 at {int8_path}...")
+quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+
+tokenizer.save_pretrained(output_dir)
+
+for path in (fp32_path, int8_path):
+    print(f"  {path}: {os.path.getsize(path) / 1e6:.1f} MB")
+print(f"\n✅ Done. Serve it with EMBEDDING_BACKEND=onnx ONNX_MODEL_PATH={int8_path} "
+      f"ONNX_TOKENIZER_PATH={os.path.join(output_dir, 'tokenizer.json')}")
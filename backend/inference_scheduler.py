@@ -0,0 +1,157 @@
+"""
+Micro-batching scheduler for embedding inference
+
+Concurrent requests submit texts to a shared queue. A single worker thread
+collects them for a short window (or until the batch is full), runs one
+batched encode, and hands each caller its own vector.
+"""
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Sequence
+
+BATCH_WINDOW_MS = float(os.getenv("SBERT_BATCH_WINDOW_MS", "5"))
+MAX_BATCH_SIZE = int(os.getenv("SBERT_MAX_BATCH_SIZE", "32"))
+
+# Upper bounds of the batch size histogram buckets
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+
+
+class InferenceScheduler:
+    """
+    Collects encode requests from many threads into batched encode calls
+
+    Args:
+        encode_batch: Function taking a list of texts and returning one vector per text
+        window_ms: How long to wait for more requests after the first one arrives
+        max_batch_size: Flush immediately once this many texts are queued
+    """
+
+    def __init__(
+        self,
+        encode_batch: Callable[[List[str]], Sequence],
+        window_ms: float = BATCH_WINDOW_MS,
+        max_batch_size: int = MAX_BATCH_SIZE
+    ):
+        self.encode_batch = encode_batch
+        self.window = max(0.0, window_ms) / 1000.0
+        self.max_batch_size = max(1, max_batch_size)
+
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._worker = None
+        self._stats_lock = threading.Lock()
+        self._reset_stats()
+
+    def _reset_stats(self):
+        self._batches = 0
+        self._items = 0
+        self._encoded = 0
+        self._max_batch = 0
+        self._batch_size_buckets = {bound: 0 for bound in BATCH_SIZE_BUCKETS}
+        self._queue_delay_sum = 0.0
+        self._queue_delay_max = 0.0
+        self._encode_time_sum = 0.0
+        self._errors = 0
+
+    def _ensure_worker(self):
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(
+                target=self._run, name="inference-scheduler", daemon=True
+            )
+            self._worker.start()
+
+    def submit(self, text: str) -> Future:
+        """Queue a text for encoding and return a Future for its vector"""
+        future = Future()
+        with self._cond:
+            self._ensure_worker()
+            self._queue.append((text, future, time.perf_counter()))
+            self._cond.notify()
+        return future
+
+    def encode(self, text: str, timeout: float = None):
+        """Encode a single text, blocking until its batch has run"""
+        return self.submit(text).result(timeout)
+
+    def encode_many(self, texts: List[str], timeout: float = None) -> list:
+        """Encode several texts; they are queued together so they share a batch"""
+        futures = [self.submit(text) for text in texts]
+        return [future.result(timeout) for future in futures]
+
+    def _next_batch(self) -> list:
+        with self._cond:
+            while not self._queue:
+                self._cond.wait()
+
+            # Hold the batch open for the window, unless it fills up first
+            deadline = time.perf_counter() + self.window
+            while len(self._queue) < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+            size = min(len(self._queue), self.max_batch_size)
+            return [self._queue.popleft() for _ in range(size)]
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            started = time.perf_counter()
+
+            # Identical texts in the same batch (e.g. a shared definition) are encoded once
+            unique_texts = list(dict.fromkeys(text for text, _, _ in batch))
+
+            try:
+                vectors = self.encode_batch(unique_texts)
+            except Exception as e:
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                with self._stats_lock:
+                    self._errors += 1
+                continue
+
+            by_text = dict(zip(unique_texts, vectors))
+            for text, future, _ in batch:
+                future.set_result(by_text[text])
+
+            self._record(batch, len(unique_texts), started, time.perf_counter())
+
+    def _record(self, batch: list, encoded: int, started: float, finished: float):
+        size = len(batch)
+        delays = [started - queued_at for _, _, queued_at in batch]
+
+        with self._stats_lock:
+            self._batches += 1
+            self._items += size
+            self._encoded += encoded
+            self._max_batch = max(self._max_batch, size)
+            for bound in BATCH_SIZE_BUCKETS:
+                if size <= bound:
+                    self._batch_size_buckets[bound] += 1
+                    break
+            self._queue_delay_sum += sum(delays)
+            self._queue_delay_max = max(self._queue_delay_max, max(delays))
+            self._encode_time_sum += finished - started
+
+    def get_stats(self) -> Dict:
+        """Snapshot of batch size and queueing delay metrics"""
+        with self._stats_lock:
+            return {
+                "window_ms": self.window * 1000.0,
+                "max_batch_size": self.max_batch_size,
+                "queued": len(self._queue),
+                "batches": self._batches,
+                "items": self._items,
+                "texts_encoded": self._encoded,
+                "errors": self._errors,
+                "avg_batch_size": self._items / self._batches if self._batches else 0.0,
+                "max_batch_size_seen": self._max_batch,
+                "batch_size_buckets": dict(self._batch_size_buckets),
+                "avg_queue_delay_ms": 1000.0 * self._queue_delay_sum / self._items if self._items else 0.0,
+                "max_queue_delay_ms": 1000.0 * self._queue_delay_max,
+                "avg_encode_ms": 1000.0 * self._encode_time_sum / self._batches if self._batches else 0.0,
+            }
@@ -0,0 +1,334 @@
+"""
+Request, connection-pool and query metrics in Prometheus text format
+
+instrument_engine() hooks a SQLAlchemy engine's pool and cursor events,
+MetricsMiddleware times every request and attributes the statements it ran,
+and render_metrics() produces the body served by GET /metrics.
+"""
+import re
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+COUNT_BUCKETS = (1, 2, 3, 5, 8, 13, 21, 34, 55, 100)
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter, one series per label combination"""
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount: float = 1) -> None:
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for label_values, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labels, label_values)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram, one series per label combination"""
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = (), buckets: Iterable[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self._series: Dict[Tuple[str, ...], list] = {}  # labels -> [bucket counts, sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values) -> None:
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for label_values, (counts, total, count) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    le = f'le="{_format_value(bound)}"'
+                    lines.append(f"{self.name}_bucket{_format_labels(self.labels, label_values, le)} {cumulative}")
+                label_text = _format_labels(self.labels, label_values)
+                lines.append(f"{self.name}_sum{label_text} {_format_value(total)}")
+                lines.append(f"{self.name}_count{label_text} {count}")
+        return lines
+
+
+http_request_duration = Histogram(
+    "rekite_http_request_duration_seconds",
+    "Request latency by route template",
+    ("method", "route", "status"),
+)
+db_checkout_wait = Histogram(
+    "rekite_db_pool_checkout_wait_seconds",
+    "Time spent waiting for a pooled connection (includes opening a new one)",
+    ("pool",),
+    QUERY_BUCKETS,
+)
+db_checkout_timeouts = Counter(
+    "rekite_db_pool_checkout_timeouts_total",
+    "Checkouts that gave up because the pool stayed exhausted",
+    ("pool",),
+)
+db_overflow_checkouts = Counter(
+    "rekite_db_pool_overflow_checkouts_total",
+    "Checkouts served by an overflow connection beyond pool_size",
+    ("pool",),
+)
+db_statement_duration = Histogram(
+    "rekite_db_statement_duration_seconds",
+    "Cursor execution time by statement type",
+    ("pool", "operation"),
+    QUERY_BUCKETS,
+)
+db_statements_per_request = Histogram(
+    "rekite_db_statements_per_request",
+    "Number of SQL statements executed while serving a request",
+    ("route",),
+    COUNT_BUCKETS,
+)
+db_time_per_request = Histogram(
+    "rekite_db_time_per_request_seconds",
+    "Total cursor execution time while serving a request",
+    ("route",),
+    QUERY_BUCKETS,
+)
+
+_histograms_and_counters = (
+    http_request_duration,
+    db_checkout_wait,
+    db_checkout_timeouts,
+    db_overflow_checkouts,
+    db_statement_duration,
+    db_statements_per_request,
+    db_time_per_request,
+)
+
+# [statement count, seconds] of the request being served; a mutable list so
+# the threadpool copy of the context updates the same totals
+_request_db: ContextVar[Optional[list]] = ContextVar("request_db", default=None)
+
+_engines: Dict[str, object] = {}
+
+
+def _time_checkouts(pool, name: str) -> None:
+    # No pool event fires before a checkout starts waiting, so time the
+    # pool's internal get (blocking wait on the queue + connect on a miss)
+    do_get = pool._do_get
+
+    def timed_do_get():
+        started = time.perf_counter()
+        try:
+            return do_get()
+        except PoolTimeoutError:
+            db_checkout_timeouts.inc(name)
+            raise
+        finally:
+            db_checkout_wait.observe(time.perf_counter() - started, name)
+
+    pool._do_get = timed_do_get
+
+
+def instrument_engine(engine, name: str) -> None:
+    """
+    Record checkout wait, overflow use and statement timings for an engine
+
+    Args:
+        engine: SQLAlchemy Engine (for an AsyncEngine pass engine.sync_engine)
+        name: Value of the "pool" label, e.g. "primary" or "replica0"
+    """
+    _engines[name] = engine
+    _time_checkouts(engine.pool, name)
+
+    # dispose() swaps in a new pool (listeners carry over, the wrapper doesn't)
+    @event.listens_for(engine, "engine_disposed")
+    def _on_disposed(engine):
+        _time_checkouts(engine.pool, name)
+
+    size = getattr(engine.pool, "size", None)
+    if callable(size):
+        @event.listens_for(engine.pool, "checkout")
+        def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+            pool = engine.pool
+            if pool.checkedout() > pool.size():
+                db_overflow_checkouts.inc(name)
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_execute(conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._metrics_started = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_execute(conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, "_metrics_started", None)
+        if started is None:
+            return
+        elapsed = time.perf_counter() - started
+        operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "OTHER"
+        db_statement_duration.observe(elapsed, name, operation)
+
+        totals = _request_db.get()
+        if totals is not None:
+            totals[0] += 1
+            totals[1] += elapsed
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording request latency and per-request statement
+    count/time, labelled with the matched route template (not the raw path)
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        totals = [0, 0.0]
+        token = _request_db.set(totals)
+        started = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            _request_db.reset(token)
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or "unmatched"
+            http_request_duration.observe(elapsed, scope["method"], route_path, str(status_code))
+            db_statements_per_request.observe(totals[0], route_path)
+            db_time_per_request.observe(totals[1], route_path)
+
+
+def _gauge(name: str, help_text: str, samples: List[Tuple[str, float]]) -> List[str]:
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} gauge"]
+    lines.extend(f"{name}{labels} {_format_value(value)}" for labels, value in samples)
+    return lines
+
+
+def _pool_gauges() -> List[str]:
+    occupancy, sizes, overflow, idle = [], [], [], []
+    for name, engine in sorted(_engines.items()):
+        pool = engine.pool
+        labels = f'{{pool="{_escape(name)}"}}'
+        checked_out = pool.checkedout() if hasattr(pool, "checkedout") else 0
+        occupancy.append((labels, checked_out))
+        if hasattr(pool, "size"):
+            sizes.append((labels, pool.size()))
+            overflow.append((labels, max(0, checked_out - pool.size())))
+        if hasattr(pool, "checkedin"):
+            idle.append((labels, pool.checkedin()))
+    return (
+        _gauge("rekite_db_pool_checked_out", "Connections currently checked out", occupancy)
+        + _gauge("rekite_db_pool_idle", "Connections idle in the pool", idle)
+        + _gauge("rekite_db_pool_size", "Configured pool_size", sizes)
+        + _gauge("rekite_db_pool_overflow_in_use", "Checked-out connections beyond pool_size", overflow)
+    )
+
+
+def _metric_name(*parts: str) -> str:
+    return re.sub(r"[^a-zA-Z0-9_]", "_", "_".join(parts))
+
+
+def render_stats(prefix: str, stats: dict) -> List[str]:
+    """
+    Gauges for the numeric values of a /stats-style dict
+
+    Nested dicts become labelled series: a dict of dicts is labelled by
+    kind (e.g. transcription_uploads.normalized.requests), a dict of numbers
+    by bucket (e.g. inference.batch_size_buckets["2-4"]).
+    """
+    lines = []
+    for key, value in stats.items():
+        if isinstance(value, (int, float)):
+            name = _metric_name(prefix, key)
+            lines += _gauge(name, f"{prefix} {key}", [("", float(value))])
+        elif isinstance(value, dict) and value and all(isinstance(v, dict) for v in value.values()):
+            series: Dict[str, list] = {}
+            for kind, inner in value.items():
+                for inner_key, inner_value in inner.items():
+                    if isinstance(inner_value, (int, float)):
+                        series.setdefault(inner_key, []).append((f'{{kind="{_escape(kind)}"}}', float(inner_value)))
+            for inner_key, samples in series.items():
+                lines += _gauge(_metric_name(prefix, key, inner_key), f"{prefix} {key} {inner_key}", samples)
+        elif isinstance(value, dict) and value:
+            samples = [
+                (f'{{bucket="{_escape(bucket)}"}}', float(count))
+                for bucket, count in value.items()
+                if isinstance(count, (int, float))
+            ]
+            lines += _gauge(_metric_name(prefix, key), f"{prefix} {key}", samples)
+    return lines
+
+
+def render_metrics(stats: Optional[Dict[str, dict]] = None) -> str:
+    """
+    Prometheus exposition text for all metrics
+
+    Args:
+        stats: Extra {prefix: stats dict} exported as gauges (see render_stats)
+
+    Returns:
+        Body for GET /metrics (serve with CONTENT_TYPE)
+    """
+    lines = []
+    for metric in _histograms_and_counters:
+        lines += metric.render()
+    lines += _pool_gauges()
+    for prefix, values in (stats or {}).items():
+        lines += render_stats(_metric_name("rekite", prefix), values)
+    return "\n".join(lines) + "\n"
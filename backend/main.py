@@ -1,10 +1,31 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import APIRouter, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from routers import auth, decks, cards, study
-from database import engine, Base
+from fastapi.responses import JSONResponse, Response
+from routers import auth, decks, cards, study, export
+from database import (
+    engine, Base, DATABASE_MODE, dispose_async_engine, start_replica_health_checks, stop_replica_health_checks,
+)
+from sbert_utils import get_inference_stats, get_model_status, is_model_failed, is_model_ready, start_warmup
+from deepgram_utils import close_client as close_deepgram_client, get_upload_stats
+from transcription_cache import transcription_cache
+from auth_utils import shutdown_password_executor
+import counters  # noqa: F401  (keeps decks.card_count and deck_due_counters in step with writes)
+from instrumentation import CONTENT_TYPE as METRICS_CONTENT_TYPE, MetricsMiddleware, render_metrics
 import os
 
-app = FastAPI(title="Re:Kite API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load the SBERT model in the background so non-ML routes serve immediately
+    start_warmup()
+    start_replica_health_checks()
+    yield
+    stop_replica_health_checks()
+    await close_deepgram_client()
+    shutdown_password_executor()
+    await dispose_async_engine()
+
+app = FastAPI(title="Re:Kite API", lifespan=lifespan)
 
 # Configure CORS - Allow frontend URLs
 allowed_origins = [
@@ -24,11 +45,41 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Route latency and per-request query count/time for /metrics
+app.add_middleware(MetricsMiddleware)
+
+def _without_routes_of(router: APIRouter, replacement: APIRouter) -> APIRouter:
+    """Copy of router minus the path/method pairs that replacement serves"""
+    replaced = {(route.path, method) for route in replacement.routes for method in route.methods}
+    remaining = APIRouter()
+    remaining.routes.extend(
+        route for route in router.routes
+        if not any((route.path, method) in replaced for method in getattr(route, "methods", None) or ())
+    )
+    return remaining
+
 # Include routers
 app.include_router(auth.router, prefix="/api/auth", tags=["auth"])
-app.include_router(decks.router, prefix="/api/decks", tags=["decks"])
-app.include_router(cards.router, prefix="/api/cards", tags=["cards"])
-app.include_router(study.router, prefix="/api/study", tags=["study"])
+
+if DATABASE_MODE == "async":
+    # Async handlers replace their sync counterparts; the rest (transcription,
+    # live answers, ...) are still served by the sync routers
+    from routers import async_decks, async_cards, async_study
+    
+    for sync_router, async_router, prefix, tag in (
+        (decks.router, async_decks.router, "/api/decks", "decks"),
+        (cards.router, async_cards.router, "/api/cards", "cards"),
+        (study.router, async_study.router, "/api/study", "study"),
+    ):
+        app.include_router(async_router, prefix=prefix, tags=[tag])
+        app.include_router(_without_routes_of(sync_router, async_router), prefix=prefix, tags=[tag])
+else:
+    app.include_router(decks.router, prefix="/api/decks", tags=["decks"])
+    app.include_router(cards.router, prefix="/api/cards", tags=["cards"])
+    app.include_router(study.router, prefix="/api/study", tags=["study"])
+
+# Streams from its own sync session in both modes
+app.include_router(export.router, prefix="/api/export", tags=["export"])
 
 @app.get("/")
 def read_root():
@@ -37,3 +88,34 @@ def read_root():
 @app.get("/health")
 def health_check():
     return {"status": "healthy"}
+
+@app.get("/ready")
+def readiness_check():
+    """
+    Reports 503 until the SBERT model is loaded and warmed up, and "degraded"
+    if it failed to load (answers are then scored by keyword matching only)
+    """
+    model_status = get_model_status()
+    if is_model_failed():
+        return {"status": "degraded", "sbert": model_status}
+    if not is_model_ready():
+        return JSONResponse(status_code=503, content={"status": "warming_up", "sbert": model_status})
+    return {"status": "ready", "sbert": model_status}
+
+@app.get("/stats")
+def get_stats():
+    return {
+        "inference": get_inference_stats(),
+        "transcription_cache": transcription_cache.get_stats(),
+        "transcription_uploads": get_upload_stats(),
+    }
+
+@app.get("/metrics")
+def get_metrics():
+    """Prometheus exposition: route latency, pool and query metrics, plus the /stats counters"""
+    body = render_metrics({
+        "inference": get_inference_stats(),
+        "transcription_cache": transcription_cache.get_stats(),
+        "transcription": {"uploads": get_upload_stats()},
+    })
+    return Response(content=body, media_type=METRICS_CONTENT_TYPE)
@@ -0,0 +1,34 @@
+"""
+Apply database migrations (replaces create_tables_sql.py)
+
+Usage:
+    python migrate.py            # apply pending migrations
+    python migrate.py --status   # list applied and pending migrations
+
+Uses DATABASE_URL like the API.
+"""
+import argparse
+import sys
+
+from migrations import MIGRATIONS, get_applied_versions, run_migrations
+
+parser = argparse.ArgumentParser(description="Apply Re:Kite database migrations")
+parser.add_argument("--status", action="store_true", help="show migration status without applying anything")
+args = parser.parse_args()
+
+try:
+    if args.status:
+        applied = set(get_applied_versions())
+        for migration in MIGRATIONS:
+            state = "applied" if migration.version in applied else "pending"
+            print(f"{migration.version}  {state:<8} {migration.description}")
+    else:
+        applied = run_migrations()
+        if applied:
+            print(f"\n✅ Applied {len(applied)} migration(s)")
+        else:
+            print("✅ Database is up to date")
+
+except Exception as e:
+    print(f"\n❌ Migration failed: {e}")
+    sys.exit(1)
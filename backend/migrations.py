@@ -0,0 +1,230 @@
+"""
+Schema migrations
+
+Each migration runs once, in order, in its own transaction, and is recorded
+in the schema_migrations table. Migrations are written to be idempotent
+(IF NOT EXISTS / inspector checks) so they can also be applied to databases
+created by the old create_tables_sql.py or Base.metadata.create_all().
+Works on SQLite and PostgreSQL.
+
+Run with `python migrate.py` (see migrate.py --help).
+"""
+from datetime import datetime, timezone
+from typing import Callable, List, NamedTuple
+
+from sqlalchemy import (
+    Column, DateTime, Float, ForeignKey, Integer, MetaData, String, Table, Text, func, inspect, select, text,
+)
+from sqlalchemy.engine import Connection, Engine
+
+from counters import repair_counters
+from database import engine as default_engine
+
+migration_metadata = MetaData()
+
+schema_migrations = Table(
+    "schema_migrations",
+    migration_metadata,
+    Column("version", String, primary_key=True),
+    Column("description", String, nullable=False),
+    Column("applied_at", DateTime(timezone=True), nullable=False),
+)
+
+
+# Tables as models.py declared them when migrations were introduced. Frozen
+# here so 0001 creates the same schema on every database, whatever models.py
+# says now; later changes belong in their own migrations.
+baseline_metadata = MetaData()
+
+Table(
+    "users",
+    baseline_metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("username", String, unique=True, index=True, nullable=False),
+    Column("hashed_password", String, nullable=False),
+    Column("created_at", DateTime(timezone=True), server_default=func.now()),
+    Column("updated_at", DateTime(timezone=True)),
+)
+
+Table(
+    "decks",
+    baseline_metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("user_id", Integer, ForeignKey("users.id"), nullable=False),
+    Column("name", String, nullable=False),
+    Column("description", Text, nullable=True),
+    Column("created_at", DateTime(timezone=True), server_default=func.now()),
+    Column("updated_at", DateTime(timezone=True)),
+)
+
+Table(
+    "cards",
+    baseline_metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("deck_id", Integer, ForeignKey("decks.id"), nullable=False),
+    Column("concept", String, nullable=False),
+    Column("definition", Text, nullable=False),
+    Column("created_at", DateTime(timezone=True), server_default=func.now()),
+    Column("updated_at", DateTime(timezone=True)),
+)
+
+Table(
+    "user_card_progress",
+    baseline_metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("user_id", Integer, ForeignKey("users.id"), nullable=False),
+    Column("card_id", Integer, ForeignKey("cards.id"), nullable=False),
+    Column("ease_factor", Float),
+    Column("interval", Integer),
+    Column("repetitions", Integer),
+    Column("next_review", DateTime(timezone=True), nullable=True),
+    Column("last_reviewed", DateTime(timezone=True), nullable=True),
+    Column("created_at", DateTime(timezone=True), server_default=func.now()),
+    Column("updated_at", DateTime(timezone=True)),
+)
+
+Table(
+    "reviews",
+    baseline_metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("card_id", Integer, ForeignKey("cards.id"), nullable=False),
+    Column("user_id", Integer, ForeignKey("users.id"), nullable=False),
+    Column("user_answer", Text, nullable=False),
+    Column("similarity_score", Float, nullable=False),
+    Column("quality", Integer, nullable=False),
+    Column("reviewed_at", DateTime(timezone=True), server_default=func.now()),
+)
+
+
+class Migration(NamedTuple):
+    version: str
+    description: str
+    apply: Callable[[Connection], None]
+
+
+def _add_column_if_missing(connection: Connection, table: str, column: str, column_type: str) -> None:
+    columns = {c["name"] for c in inspect(connection).get_columns(table)}
+    if column not in columns:
+        connection.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}"))
+
+
+def _create_index_if_missing(
+    connection: Connection, name: str, table: str, columns: List[str], unique: bool = False
+) -> None:
+    connection.execute(text(
+        f"CREATE {'UNIQUE ' if unique else ''}INDEX IF NOT EXISTS {name} ON {table} ({', '.join(columns)})"
+    ))
+
+
+def _baseline(connection: Connection) -> None:
+    """The baseline tables above (no-op for tables that already exist)"""
+    baseline_metadata.create_all(bind=connection)
+
+
+def _card_embedding_columns(connection: Connection) -> None:
+    binary_type = "BYTEA" if connection.dialect.name == "postgresql" else "BLOB"
+    _add_column_if_missing(connection, "cards", "definition_embedding", binary_type)
+    _add_column_if_missing(connection, "cards", "embedding_model", "VARCHAR")
+
+
+def _dedupe_user_card_progress(connection: Connection) -> None:
+    """
+    Remove duplicate (user_id, card_id) progress rows so the unique index can be built
+    Keeps the most recently reviewed row (lowest id among ties), which is
+    the one the study endpoints have been reading and updating
+    """
+    rows = connection.execute(text(
+        "SELECT id, user_id, card_id FROM user_card_progress "
+        "ORDER BY user_id, card_id, last_reviewed IS NULL, last_reviewed DESC, id"
+    ))
+    seen = set()
+    duplicates = []
+    for row_id, user_id, card_id in rows:
+        if (user_id, card_id) in seen:
+            duplicates.append(row_id)
+        else:
+            seen.add((user_id, card_id))
+
+    for start in range(0, len(duplicates), 500):
+        batch = duplicates[start:start + 500]
+        params = {f"id{i}": row_id for i, row_id in enumerate(batch)}
+        placeholders = ", ".join(f":{name}" for name in params)
+        connection.execute(text(f"DELETE FROM user_card_progress WHERE id IN ({placeholders})"), params)
+
+    if duplicates:
+        print(f"Removed {len(duplicates)} duplicate user_card_progress rows")
+
+
+def _hot_path_indexes(connection: Connection) -> None:
+    """Indexes for the predicates used by the study and card endpoints"""
+    _create_index_if_missing(
+        connection, "ux_user_card_progress_user_card", "user_card_progress", ["user_id", "card_id"], unique=True
+    )
+    _create_index_if_missing(
+        connection, "ix_user_card_progress_user_next_review", "user_card_progress", ["user_id", "next_review"]
+    )
+    _create_index_if_missing(connection, "ix_cards_deck_id", "cards", ["deck_id"])
+    _create_index_if_missing(connection, "ix_decks_user_id", "decks", ["user_id"])
+
+
+def _deck_counters(connection: Connection) -> None:
+    """decks.card_count and deck_due_counters, filled from the existing rows"""
+    _add_column_if_missing(connection, "decks", "card_count", "INTEGER NOT NULL DEFAULT 0")
+    connection.execute(text(
+        "CREATE TABLE IF NOT EXISTS deck_due_counters ("
+        "user_id INTEGER NOT NULL REFERENCES users (id), "
+        "deck_id INTEGER NOT NULL REFERENCES decks (id), "
+        "day DATE NOT NULL, "
+        "due_count INTEGER NOT NULL, "
+        "PRIMARY KEY (user_id, deck_id, day))"
+    ))
+    repair_counters(connection)
+
+
+def _card_page_index(connection: Connection) -> None:
+    """Lets keyset pages of a deck's cards read in id order from an index (pagination.py)"""
+    _create_index_if_missing(connection, "ix_cards_deck_id_id", "cards", ["deck_id", "id"])
+
+
+MIGRATIONS = [
+    Migration("0001", "baseline tables", _baseline),
+    Migration("0002", "cached definition embedding columns on cards", _card_embedding_columns),
+    Migration("0003", "remove duplicate user_card_progress rows", _dedupe_user_card_progress),
+    Migration("0004", "composite and foreign key indexes on hot predicates", _hot_path_indexes),
+    Migration("0005", "denormalized deck card and due-day counters", _deck_counters),
+    Migration("0006", "index for keyset pagination of deck cards", _card_page_index),
+]
+
+
+def get_applied_versions(engine: Engine = default_engine) -> List[str]:
+    migration_metadata.create_all(bind=engine)
+    with engine.connect() as connection:
+        return [row[0] for row in connection.execute(select(schema_migrations.c.version))]
+
+
+def get_pending_migrations(engine: Engine = default_engine) -> List[Migration]:
+    applied = set(get_applied_versions(engine))
+    return [migration for migration in MIGRATIONS if migration.version not in applied]
+
+
+def run_migrations(engine: Engine = default_engine) -> List[Migration]:
+    """
+    Apply all pending migrations in order
+
+    Args:
+        engine: Database to migrate
+
+    Returns:
+        list: The migrations that were applied
+    """
+    pending = get_pending_migrations(engine)
+    for migration in pending:
+        print(f"Applying {migration.version}: {migration.description}")
+        with engine.begin() as connection:
+            migration.apply(connection)
+            connection.execute(schema_migrations.insert().values(
+                version=migration.version,
+                description=migration.description,
+                applied_at=datetime.now(timezone.utc),
+            ))
+    return pending
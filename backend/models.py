@@ -1,5 +1,5 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, Float, ForeignKey
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Date, DateTime, Text, Float, ForeignKey, LargeBinary, Index
+from sqlalchemy.orm import column_property, relationship
 from sqlalchemy.sql import func
 from database import Base
 
@@ -20,23 +20,31 @@ class Deck(Base):
     __tablename__ = "decks"
     
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     name = Column(String, nullable=False)
     description = Column(Text, nullable=True)
+    card_count = Column(Integer, nullable=False, default=0, server_default="0")  # Maintained by counters.py
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
     # Relationships
     user = relationship("User", back_populates="decks")
     cards = relationship("Card", back_populates="deck", cascade="all, delete-orphan")
+    due_counters = relationship("DeckDueCounter", cascade="all, delete-orphan")
 
 class Card(Base):
     __tablename__ = "cards"
+    __table_args__ = (
+        # Keyset pages of a deck: deck_id = ? AND id > ? ORDER BY id LIMIT n
+        Index("ix_cards_deck_id_id", "deck_id", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
-    deck_id = Column(Integer, ForeignKey("decks.id"), nullable=False)
+    deck_id = Column(Integer, ForeignKey("decks.id"), nullable=False, index=True)
     concept = Column(String, nullable=False)  # The term/word to define
     definition = Column(Text, nullable=False)  # The correct definition
+    definition_embedding = Column(LargeBinary, nullable=True)  # Cached SBERT vector of the definition
+    embedding_model = Column(String, nullable=True)  # Model/version tag of the cached vector
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
@@ -48,6 +56,12 @@ class Card(Base):
 class UserCardProgress(Base):
     """Tracks user's progress on each card using spaced repetition"""
     __tablename__ = "user_card_progress"
+    __table_args__ = (
+        # One progress row per user and card; also serves lookups by (user_id, card_id)
+        Index("ux_user_card_progress_user_card", "user_id", "card_id", unique=True),
+        # Due-card queries: user_id = ? AND next_review <= ? ORDER BY next_review
+        Index("ix_user_card_progress_user_next_review", "user_id", "next_review"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -57,7 +71,9 @@ class UserCardProgress(Base):
     ease_factor = Column(Float, default=2.5)  # SM-2 algorithm ease factor
     interval = Column(Integer, default=0)  # Days until next review
     repetitions = Column(Integer, default=0)  # Number of successful repetitions
-    next_review = Column(DateTime(timezone=True), nullable=True)  # When to review next
+    # When to review next; active_history keeps the old value around so
+    # counters.py can move the card out of its previous due-day bucket
+    next_review = column_property(Column(DateTime(timezone=True), nullable=True), active_history=True)
     last_reviewed = Column(DateTime(timezone=True), nullable=True)
     
     created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -67,6 +83,18 @@ class UserCardProgress(Base):
     user = relationship("User", back_populates="card_progress")
     card = relationship("Card", back_populates="user_progress")
 
+class DeckDueCounter(Base):
+    """
+    How many of a user's cards in a deck are scheduled for review on a given
+    (UTC) day; maintained by counters.py so due counts don't scan progress rows
+    """
+    __tablename__ = "deck_due_counters"
+    
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    deck_id = Column(Integer, ForeignKey("decks.id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    due_count = Column(Integer, nullable=False, default=0)
+
 class Review(Base):
     """Stores history of review attempts"""
     __tablename__ = "reviews"
@@ -0,0 +1,102 @@
+"""
+Keyset (cursor) pagination and field projection for the list endpoints
+
+A page is fetched with `WHERE (order key) > (last key) ORDER BY key LIMIT n`
+instead of OFFSET, so every page costs the same however deep it is and rows
+inserted meanwhile don't shift later pages. The cursor handed to clients is
+the last row's key, base64-encoded JSON; treat it as opaque.
+"""
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, status
+
+CARD_FIELDS = ("id", "deck_id", "concept", "definition", "created_at", "updated_at", "next_review")
+DECK_FIELDS = ("id", "user_id", "name", "description", "card_count", "created_at", "updated_at")
+
+# Columns each ordering pages on, most significant first (id breaks ties)
+ORDER_KEYS = {
+    "id": ("id",),
+    "next_review": ("next_review", "id"),
+}
+
+
+def parse_fields(fields: Optional[str], allowed: Sequence[str]) -> Tuple[str, ...]:
+    """
+    Requested fields of a `fields=a,b,c` parameter, in order
+
+    Args:
+        fields: Comma-separated field names, or None for all fields
+        allowed: Fields the endpoint can return
+
+    Returns:
+        tuple: Field names to include in each item
+    """
+    if not fields:
+        return tuple(allowed)
+
+    requested = tuple(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+    unknown = [name for name in requested if name not in allowed]
+    if unknown or not requested:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown field(s): {', '.join(unknown) or fields!r}; choose from {', '.join(allowed)}"
+        )
+    return requested
+
+
+def _encode_value(value: Any) -> Any:
+    return {"dt": value.isoformat()} if isinstance(value, datetime) else value
+
+
+def _decode_value(value: Any) -> Any:
+    return datetime.fromisoformat(value["dt"]) if isinstance(value, dict) else value
+
+
+def encode_cursor(order: str, key: Sequence[Any]) -> str:
+    payload = json.dumps({"o": order, "k": [_encode_value(value) for value in key]}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str], order: str) -> Optional[Tuple[Any, ...]]:
+    """Key of the last row of the previous page, or None for the first page"""
+    if not cursor:
+        return None
+
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        key = tuple(_decode_value(value) for value in payload["k"])
+        valid = payload["o"] == order and len(key) == len(ORDER_KEYS[order])
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        valid = False
+
+    if not valid:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor (cursors are only valid with the order they were issued for)"
+        )
+    return key
+
+
+def build_page(rows: List[Any], fields: Sequence[str], order: str, limit: int) -> Dict[str, Any]:
+    """
+    Response body for rows fetched with LIMIT limit + 1
+
+    Returns:
+        dict: items (only the requested fields) and next_cursor (None on the last page)
+    """
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    next_cursor = None
+    if has_more:
+        last = rows[-1]._mapping
+        next_cursor = encode_cursor(order, [last[column] for column in ORDER_KEYS[order]])
+
+    return {
+        "items": [{name: row._mapping[name] for name in fields} for row in rows],
+        "next_cursor": next_cursor,
+    }
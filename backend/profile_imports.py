@@ -0,0 +1,49 @@
+"""
+Profile backend import time (cold start before the app can serve traffic)
+
+Usage:
+    python profile_imports.py [module] [top_n]
+
+Runs `python -X importtime -c "import <module>"` in a fresh interpreter and
+prints the slowest imports by cumulative time. Heavy ML packages (torch,
+sentence_transformers, deepgram) should not appear here: they are loaded
+lazily after startup.
+"""
+import subprocess
+import sys
+import time
+
+module = sys.argv[1] if len(sys.argv) > 1 else "main"
+top_n = int(sys.argv[2]) if len(sys.argv) > 2 else 25
+
+started = time.perf_counter()
+result = subprocess.run(
+    [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+    capture_output=True,
+    text=True,
+)
+wall_time = time.perf_counter() - started
+
+if result.returncode != 0:
+    print(result.stderr)
+    sys.exit(result.returncode)
+
+# Lines look like: "import time:  self [us] | cumulative | imported package"
+entries = []
+for line in result.stderr.splitlines():
+    if not line.startswith("import time:") or "cumulative" in line:
+        continue
+    _, self_us, cumulative_us, name = [part.strip() for part in line.replace("import time:", "|").split("|")]
+    entries.append((int(cumulative_us), int(self_us), name))
+
+total_us = max((cumulative for cumulative, _, name in entries if name == module), default=0)
+print(f"Import of '{module}': {total_us / 1e6:.3f}s (interpreter wall time {wall_time:.3f}s)\n")
+print(f"{'cumulative':>12} {'self':>10}  module")
+for cumulative, self_us, name in sorted(entries, reverse=True)[:top_n]:
+    print(f"{cumulative / 1e3:>10.1f}ms {self_us / 1e3:>8.1f}ms  {name.strip()}")
+
+heavy = [name for _, _, name in entries if name.split(".")[0] in ("torch", "sentence_transformers", "transformers", "deepgram")]
+if heavy:
+    print(f"\n⚠ Heavy packages imported eagerly: {sorted(set(n.split('.')[0] for n in heavy))}")
+else:
+    print("\n✓ No heavy ML packages imported at startup")
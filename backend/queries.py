@@ -0,0 +1,261 @@
+"""
+SQLAlchemy 2.0-style statements for the deck, card and study endpoints
+
+Plain select()/update() constructs, so the same statement runs on a sync
+Session (db.execute / db.scalars) and on an AsyncSession (await db.execute).
+"""
+from datetime import datetime, time
+from typing import Any, Optional, Sequence, Tuple
+
+from sqlalchemy import Select, and_, func, or_, select
+
+from models import Card, Deck, DeckDueCounter, UserCardProgress
+
+
+def owned_deck(deck_id: int, user_id: int) -> Select:
+    return select(Deck).where(Deck.id == deck_id, Deck.user_id == user_id)
+
+
+def user_decks(user_id: int) -> Select:
+    """A user's decks; card_count is the maintained column (see counters.py)"""
+    return select(Deck).where(Deck.user_id == user_id)
+
+
+def user_deck_dashboard(user_id: int, now: datetime) -> Select:
+    """
+    (Deck, card_count, due_count, new_count, last_studied) rows for all of a
+    user's decks in one grouped query
+
+    due_count matches the study queue (progress due by now), new_count is
+    cards the user has never reviewed, last_studied is the latest review.
+    """
+    return (
+        select(
+            Deck,
+            func.count(Card.id),
+            func.count(UserCardProgress.id).filter(UserCardProgress.next_review <= now),
+            func.count(Card.id).filter(UserCardProgress.last_reviewed.is_(None)),
+            func.max(UserCardProgress.last_reviewed),
+        )
+        .outerjoin(Card, Card.deck_id == Deck.id)
+        .outerjoin(
+            UserCardProgress,
+            and_(UserCardProgress.card_id == Card.id, UserCardProgress.user_id == user_id)
+        )
+        .where(Deck.user_id == user_id)
+        .group_by(Deck.id)
+    )
+
+
+def card_with_owner(card_id: int) -> Select:
+    """(Card, owner user_id) so callers can tell a missing card from someone else's"""
+    return select(Card, Deck.user_id).join(Deck, Card.deck_id == Deck.id).where(Card.id == card_id)
+
+
+def owned_card(card_id: int, user_id: int) -> Select:
+    return select(Card).join(Deck, Card.deck_id == Deck.id).where(Card.id == card_id, Deck.user_id == user_id)
+
+
+# CardResponse fields, with next_review from the user's progress row
+_CARD_RESPONSE_COLUMNS = (
+    Card.id, Card.deck_id, Card.concept, Card.definition, Card.created_at, Card.updated_at,
+    UserCardProgress.next_review,
+)
+
+
+def _with_user_progress(statement: Select, user_id: int) -> Select:
+    return statement.outerjoin(
+        UserCardProgress,
+        and_(UserCardProgress.card_id == Card.id, UserCardProgress.user_id == user_id)
+    )
+
+
+def deck_card_rows(deck_id: int, user_id: int) -> Select:
+    """CardResponse rows for every card in a deck; next_review is None without progress"""
+    statement = select(*_CARD_RESPONSE_COLUMNS).where(Card.deck_id == deck_id).order_by(Card.id)
+    return _with_user_progress(statement, user_id)
+
+
+def card_row(card_id: int, user_id: int) -> Select:
+    """
+    CardResponse row for one card plus owner_id (the deck's user, so callers
+    can tell a missing card from someone else's) and progress_id (None when
+    the user has no progress row for it)
+    """
+    statement = (
+        select(*_CARD_RESPONSE_COLUMNS, Deck.user_id.label("owner_id"), UserCardProgress.id.label("progress_id"))
+        .join(Deck, Card.deck_id == Deck.id)
+        .where(Card.id == card_id)
+    )
+    return _with_user_progress(statement, user_id)
+
+
+def owned_card_with_progress(card_id: int, user_id: int) -> Select:
+    """(Card, UserCardProgress or None) for a card in one of the user's decks"""
+    statement = (
+        select(Card, UserCardProgress)
+        .join(Deck, Card.deck_id == Deck.id)
+        .where(Card.id == card_id, Deck.user_id == user_id)
+    )
+    return _with_user_progress(statement, user_id)
+
+
+def card_progress(card_id: int, user_id: int) -> Select:
+    return select(UserCardProgress).where(
+        UserCardProgress.card_id == card_id,
+        UserCardProgress.user_id == user_id
+    )
+
+
+def _due_filter(deck_id: int, user_id: int, now: datetime) -> Select:
+    return (
+        select(Card, UserCardProgress)
+        .join(
+            UserCardProgress,
+            and_(Card.id == UserCardProgress.card_id, UserCardProgress.user_id == user_id)
+        )
+        .where(Card.deck_id == deck_id, UserCardProgress.next_review <= now)
+    )
+
+
+def next_due_card(deck_id: int, user_id: int, now: datetime) -> Select:
+    """(Card, UserCardProgress) of the card due soonest"""
+    return _due_filter(deck_id, user_id, now).order_by(UserCardProgress.next_review.asc()).limit(1)
+
+
+def cards_remaining(deck_id: int, user_id: int, now: datetime) -> Select:
+    """
+    Number of the user's cards due in a deck, without scanning the deck:
+    the due-day counters for days before today (all due by now) plus an
+    index range count over today's reviews up to now
+    """
+    today = now.date()
+    due_before_today = select(func.coalesce(func.sum(DeckDueCounter.due_count), 0)).where(
+        DeckDueCounter.user_id == user_id,
+        DeckDueCounter.deck_id == deck_id,
+        DeckDueCounter.day < today
+    )
+    due_today = select(func.count()).select_from(
+        _due_filter(deck_id, user_id, now)
+        .where(UserCardProgress.next_review >= datetime.combine(today, time.min))
+        .subquery()
+    )
+    return select(due_before_today.scalar_subquery() + due_today.scalar_subquery())
+
+
+def deck_progress(deck_id: int, user_id: int) -> Select:
+    """The user's progress rows for every card in a deck"""
+    return (
+        select(UserCardProgress)
+        .join(Card, Card.id == UserCardProgress.card_id)
+        .where(Card.deck_id == deck_id, UserCardProgress.user_id == user_id)
+    )
+
+
+_CARD_COLUMNS = {
+    "id": Card.id,
+    "deck_id": Card.deck_id,
+    "concept": Card.concept,
+    "definition": Card.definition,
+    "created_at": Card.created_at,
+    "updated_at": Card.updated_at,
+    "next_review": UserCardProgress.next_review,
+}
+
+_DECK_COLUMNS = {
+    "id": Deck.id,
+    "user_id": Deck.user_id,
+    "name": Deck.name,
+    "description": Deck.description,
+    "card_count": Deck.card_count,
+    "created_at": Deck.created_at,
+    "updated_at": Deck.updated_at,
+}
+
+
+def card_page(
+    deck_id: int,
+    user_id: int,
+    fields: Sequence[str],
+    order: str,
+    after: Optional[Tuple[Any, ...]],
+    limit: int
+) -> Select:
+    """
+    One keyset page of a deck's cards: only the named columns, ordered by
+    id or by (next_review, id) with never-scheduled cards last, starting
+    after the key of the previous page's last row; fetches limit + 1 rows
+    so the caller can tell whether there is a next page
+    """
+    names = list(dict.fromkeys(["id", *(["next_review"] if order == "next_review" else []), *fields]))
+    statement = select(*(_CARD_COLUMNS[name].label(name) for name in names)).where(Card.deck_id == deck_id)
+
+    # The progress join is only needed for next_review
+    if "next_review" in names:
+        statement = statement.outerjoin(
+            UserCardProgress,
+            and_(UserCardProgress.card_id == Card.id, UserCardProgress.user_id == user_id)
+        )
+
+    if order == "next_review":
+        next_review = UserCardProgress.next_review
+        if after is not None:
+            last_review, last_id = after
+            if last_review is None:
+                statement = statement.where(next_review.is_(None), Card.id > last_id)
+            else:
+                statement = statement.where(or_(
+                    next_review > last_review,
+                    and_(next_review == last_review, Card.id > last_id),
+                    next_review.is_(None)
+                ))
+        statement = statement.order_by(next_review.asc().nulls_last(), Card.id)
+    else:
+        if after is not None:
+            statement = statement.where(Card.id > after[0])
+        statement = statement.order_by(Card.id)
+
+    return statement.limit(limit + 1)
+
+
+def deck_page(user_id: int, fields: Sequence[str], after: Optional[Tuple[Any, ...]], limit: int) -> Select:
+    """One keyset page of a user's decks by id (limit + 1 rows, see card_page)"""
+    names = list(dict.fromkeys(["id", *fields]))
+    statement = select(*(_DECK_COLUMNS[name].label(name) for name in names)).where(Deck.user_id == user_id)
+    if after is not None:
+        statement = statement.where(Deck.id > after[0])
+    return statement.order_by(Deck.id).limit(limit + 1)
+
+
+# Columns of an export row, in output order (CSV header)
+EXPORT_COLUMNS = {
+    "deck_id": Deck.id,
+    "deck_name": Deck.name,
+    "card_id": Card.id,
+    "concept": Card.concept,
+    "definition": Card.definition,
+    "created_at": Card.created_at,
+    "updated_at": Card.updated_at,
+    "next_review": UserCardProgress.next_review,
+    "last_reviewed": UserCardProgress.last_reviewed,
+    "ease_factor": UserCardProgress.ease_factor,
+    "interval": UserCardProgress.interval,
+    "repetitions": UserCardProgress.repetitions,
+}
+
+
+def export_rows(user_id: int, deck_id: Optional[int] = None) -> Select:
+    """
+    Every card of a user's decks (or of one deck) with the user's progress,
+    ordered by deck then card so it reads through the (deck_id, id) index
+    """
+    statement = (
+        select(*(column.label(name) for name, column in EXPORT_COLUMNS.items()))
+        .select_from(Deck)
+        .join(Card, Card.deck_id == Deck.id)
+        .where(Deck.user_id == user_id)
+        .order_by(Card.deck_id, Card.id)
+    )
+    if deck_id is not None:
+        statement = statement.where(Deck.id == deck_id)
+    return _with_user_progress(statement, user_id)
@@ -0,0 +1,41 @@
+"""
+Rebuild the denormalized deck counters and report drift
+
+Usage:
+    python repair_counters.py           # fix drifted counters
+    python repair_counters.py --check   # only report; exit 1 if anything drifted
+
+Recounts decks.card_count and deck_due_counters from cards and
+user_card_progress (see counters.py) and rewrites the counters that
+disagree, in one transaction. Uses DATABASE_URL like the API. Safe to run
+from cron while the API is serving.
+"""
+import argparse
+import sys
+
+from counters import find_drift, repair_counters
+from database import engine
+
+parser = argparse.ArgumentParser(description="Rebuild Re:Kite deck counters")
+parser.add_argument("--check", action="store_true", help="report drift without changing anything")
+args = parser.parse_args()
+
+try:
+    with engine.begin() as connection:
+        drift = find_drift(connection) if args.check else repair_counters(connection)
+except Exception as e:
+    print(f"\n❌ Counter repair failed: {e}")
+    sys.exit(1)
+
+for counter, key, stored, actual in drift[:50]:
+    print(f"{counter} ({', '.join(map(str, key))}): stored {stored}, actual {actual}")
+if len(drift) > 50:
+    print(f"... and {len(drift) - 50} more")
+
+if not drift:
+    print("✅ Counters match the base tables")
+elif args.check:
+    print(f"\n❌ {len(drift)} counter(s) drifted (run without --check to repair)")
+    sys.exit(1)
+else:
+    print(f"\n✅ Repaired {len(drift)} drifted counter(s)")
@@ -0,0 +1,164 @@
+"""
+Async card handlers, served instead of routers/cards.py when DATABASE_MODE=async
+"""
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Literal, Optional
+from database import get_async_db
+from models import User, Card, UserCardProgress
+from schemas import CardCreate, CardUpdate, CardResponse, PageResponse
+from auth_utils import get_current_user_async
+from sbert_utils import update_card_embedding
+from pagination import CARD_FIELDS, build_page, decode_cursor, parse_fields
+from datetime import datetime
+import queries
+
+router = APIRouter()
+
+async def _get_owned_card(db: AsyncSession, card_id: int, user_id: int) -> Card:
+    card = (await db.execute(queries.owned_card(card_id, user_id))).scalars().first()
+
+    if not card:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Card not found"
+        )
+
+    return card
+
+@router.get("/deck/{deck_id}", response_model=List[CardResponse])
+async def get_deck_cards(
+    deck_id: int,
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get all cards for a specific deck"""
+    # Verify deck ownership
+    deck = (await db.execute(queries.owned_deck(deck_id, current_user.id))).scalars().first()
+
+    if not deck:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Deck not found"
+        )
+
+    # Cards and the user's next_review in one outer-joined query
+    rows = (await db.execute(queries.deck_card_rows(deck_id, current_user.id))).all()
+    return [CardResponse.model_validate(row) for row in rows]
+
+@router.get("/deck/{deck_id}/page", response_model=PageResponse)
+async def get_deck_cards_page(
+    deck_id: int,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    order: Literal["id", "next_review"] = "id",
+    fields: Optional[str] = None,
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get one page of a deck's cards (keyset pagination, see routers/cards.py)"""
+    selected = parse_fields(fields, CARD_FIELDS)
+    after = decode_cursor(cursor, order)
+
+    deck = (await db.execute(queries.owned_deck(deck_id, current_user.id))).scalars().first()
+
+    if not deck:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Deck not found"
+        )
+
+    rows = (await db.execute(queries.card_page(deck_id, current_user.id, selected, order, after, limit))).all()
+    return build_page(rows, selected, order, limit)
+
+@router.post("/", response_model=CardResponse, status_code=status.HTTP_201_CREATED)
+async def create_card(
+    card: CardCreate,
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Create a new card"""
+    # Verify deck ownership
+    deck = (await db.execute(queries.owned_deck(card.deck_id, current_user.id))).scalars().first()
+
+    if not deck:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Deck not found"
+        )
+
+    db_card = Card(
+        deck_id=card.deck_id,
+        concept=card.concept,
+        definition=card.definition
+    )
+    # Cache the definition embedding so reviews only encode the answer (CPU-bound: off the loop)
+    await run_in_threadpool(update_card_embedding, db_card)
+    db.add(db_card)
+    await db.flush()
+
+    # Initialize progress for this card
+    progress = UserCardProgress(
+        user_id=current_user.id,
+        card_id=db_card.id,
+        next_review=datetime.utcnow()  # Available immediately
+    )
+    db.add(progress)
+    await db.commit()
+    await db.refresh(db_card)
+
+    db_card.next_review = progress.next_review
+    return db_card
+
+@router.get("/{card_id}", response_model=CardResponse)
+async def get_card(
+    card_id: int,
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get a specific card"""
+    # Card, deck owner and next_review in one query
+    row = (await db.execute(queries.card_row(card_id, current_user.id))).first()
+
+    if not row or row.owner_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Card not found"
+        )
+
+    return CardResponse.model_validate(row)
+
+@router.put("/{card_id}", response_model=CardResponse)
+async def update_card(
+    card_id: int,
+    card_update: CardUpdate,
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Update a card"""
+    card = await _get_owned_card(db, card_id, current_user.id)
+
+    if card_update.concept is not None:
+        card.concept = card_update.concept
+    if card_update.definition is not None and card_update.definition != card.definition:
+        card.definition = card_update.definition
+        await run_in_threadpool(update_card_embedding, card)
+
+    await db.commit()
+
+    row = (await db.execute(queries.card_row(card_id, current_user.id))).first()
+    return CardResponse.model_validate(row)
+
+@router.delete("/{card_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_card(
+    card_id: int,
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Delete a card"""
+    card = await _get_owned_card(db, card_id, current_user.id)
+
+    await db.delete(card)
+    await db.commit()
+    return None
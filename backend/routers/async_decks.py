@@ -0,0 +1,134 @@
+"""
+Async deck handlers, served instead of routers/decks.py when DATABASE_MODE=async
+"""
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from datetime import datetime
+from database import get_async_db
+from models import User, Deck
+from schemas import DeckCreate, DeckUpdate, DeckResponse, DeckDashboardResponse, PageResponse
+from auth_utils import get_current_user_async
+from pagination import DECK_FIELDS, build_page, decode_cursor, parse_fields
+import queries
+
+router = APIRouter()
+
+async def _get_owned_deck(db: AsyncSession, deck_id: int, user_id: int) -> Deck:
+    deck = (await db.execute(queries.owned_deck(deck_id, user_id))).scalars().first()
+
+    if not deck:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Deck not found"
+        )
+
+    return deck
+
+@router.get("/", response_model=List[DeckResponse])
+async def get_user_decks(
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get all decks for the current user"""
+    return (await db.execute(queries.user_decks(current_user.id))).scalars().all()
+
+@router.get("/page", response_model=PageResponse)
+async def get_user_decks_page(
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get one page of the current user's decks, ordered by id (see routers/decks.py)"""
+    selected = parse_fields(fields, DECK_FIELDS)
+    after = decode_cursor(cursor, "id")
+
+    rows = (await db.execute(queries.deck_page(current_user.id, selected, after, limit))).all()
+    return build_page(rows, selected, "id", limit)
+
+@router.get("/dashboard", response_model=List[DeckDashboardResponse])
+async def get_deck_dashboard(
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get all decks with card, due and new counts and when each was last studied"""
+    rows = (await db.execute(queries.user_deck_dashboard(current_user.id, datetime.utcnow()))).all()
+
+    return [
+        DeckDashboardResponse(
+            id=deck.id,
+            user_id=deck.user_id,
+            name=deck.name,
+            description=deck.description,
+            created_at=deck.created_at,
+            updated_at=deck.updated_at,
+            card_count=card_count,
+            due_count=due_count,
+            new_count=new_count,
+            last_studied=last_studied
+        )
+        for deck, card_count, due_count, new_count, last_studied in rows
+    ]
+
+@router.post("/", response_model=DeckResponse, status_code=status.HTTP_201_CREATED)
+async def create_deck(
+    deck: DeckCreate,
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Create a new deck"""
+    db_deck = Deck(
+        user_id=current_user.id,
+        name=deck.name,
+        description=deck.description
+    )
+    db.add(db_deck)
+    await db.commit()
+    await db.refresh(db_deck)
+
+    return db_deck
+
+@router.get("/{deck_id}", response_model=DeckResponse)
+async def get_deck(
+    deck_id: int,
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get a specific deck"""
+    return await _get_owned_deck(db, deck_id, current_user.id)
+
+@router.put("/{deck_id}", response_model=DeckResponse)
+async def update_deck(
+    deck_id: int,
+    deck_update: DeckUpdate,
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Update a deck"""
+    deck = await _get_owned_deck(db, deck_id, current_user.id)
+
+    if deck_update.name is not None:
+        deck.name = deck_update.name
+    if deck_update.description is not None:
+        deck.description = deck_update.description
+
+    await db.commit()
+    await db.refresh(deck)
+
+    return deck
+
+@router.delete("/{deck_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_deck(
+    deck_id: int,
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Delete a deck"""
+    deck = await _get_owned_deck(db, deck_id, current_user.id)
+
+    # AsyncSession.delete loads the cascaded cards/progress rows itself
+    await db.delete(deck)
+    await db.commit()
+    return None
@@ -0,0 +1,276 @@
+"""
+Async study handlers, served instead of their routers/study.py counterparts
+when DATABASE_MODE=async
+
+Only the database-bound endpoints are here; transcription, live answers and
+paraphrasing keep being served by routers/study.py in both modes.
+"""
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import datetime
+from database import get_async_db
+from models import User, Card, UserCardProgress, Review
+from schemas import (
+    NextCardResponse, CardResponse, SimilarityRequest, SimilarityResponse,
+    ReviewSubmit, ReviewResponse
+)
+from auth_utils import get_current_user_async
+from sbert_utils import evaluate_answer, get_card_embedding
+from spaced_repetition import calculate_next_review
+import queries
+
+router = APIRouter()
+
+def _reset(progress: UserCardProgress) -> None:
+    progress.ease_factor = 2.5
+    progress.interval = 0
+    progress.repetitions = 0
+    progress.next_review = datetime.utcnow()
+    progress.last_reviewed = None
+
+async def _get_card_checked(db: AsyncSession, card_id: int, user_id: int, forbidden_status: int) -> Card:
+    """The card, 404 if it doesn't exist, forbidden_status if it's in someone else's deck"""
+    row = (await db.execute(queries.card_with_owner(card_id))).first()
+
+    if not row:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Card not found"
+        )
+
+    card, owner_id = row
+    if owner_id != user_id:
+        raise HTTPException(
+            status_code=forbidden_status,
+            detail="Access denied" if forbidden_status == status.HTTP_403_FORBIDDEN else "Card not found"
+        )
+
+    return card
+
+async def _get_or_create_progress(db: AsyncSession, user_id: int, card_id: int, **defaults) -> UserCardProgress:
+    """Get the user's progress row for a card, adding a fresh one if missing"""
+    progress = (await db.execute(queries.card_progress(card_id, user_id))).scalars().first()
+
+    if not progress:
+        progress = UserCardProgress(
+            user_id=user_id,
+            card_id=card_id,
+            ease_factor=2.5,
+            interval=0,
+            repetitions=0,
+            **defaults
+        )
+        db.add(progress)
+        try:
+            await db.flush()
+        except IntegrityError:
+            # A concurrent request created the row first (unique user_id, card_id)
+            await db.rollback()
+            progress = (await db.execute(queries.card_progress(card_id, user_id))).scalars().one()
+
+    return progress
+
+@router.get("/card/{card_id}", response_model=CardResponse)
+async def get_single_card_for_study(
+    card_id: int,
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get a single card for study"""
+    # Card, deck owner and progress in one query
+    row = (await db.execute(queries.card_row(card_id, current_user.id))).first()
+
+    if not row:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Card not found"
+        )
+
+    if row.owner_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Access denied"
+        )
+
+    card = CardResponse.model_validate(row)
+
+    # Create progress if the user has none for this card yet
+    if row.progress_id is None:
+        progress = await _get_or_create_progress(db, current_user.id, card_id, next_review=datetime.utcnow())
+        await db.commit()
+        card.next_review = progress.next_review
+
+    return card
+
+@router.get("/deck/{deck_id}/next", response_model=NextCardResponse)
+async def get_next_card_for_review(
+    deck_id: int,
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get the next card due for review in a deck"""
+    deck = (await db.execute(queries.owned_deck(deck_id, current_user.id))).scalars().first()
+
+    if not deck:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Deck not found"
+        )
+
+    now = datetime.utcnow()
+    card_progress_pair = (await db.execute(queries.next_due_card(deck_id, current_user.id, now))).first()
+
+    if not card_progress_pair:
+        return NextCardResponse(
+            card=None,
+            deck_name=deck.name,
+            cards_remaining=0
+        )
+
+    total_due = await db.scalar(queries.cards_remaining(deck_id, current_user.id, now))
+    card, progress = card_progress_pair
+
+    return NextCardResponse(
+        card=CardResponse(
+            id=card.id,
+            deck_id=card.deck_id,
+            concept=card.concept,
+            definition=card.definition,
+            created_at=card.created_at,
+            updated_at=card.updated_at,
+            next_review=progress.next_review
+        ),
+        deck_name=deck.name,
+        cards_remaining=total_due
+    )
+
+@router.post("/evaluate", response_model=SimilarityResponse)
+async def evaluate_similarity(
+    request: SimilarityRequest,
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Evaluate semantic similarity between user answer and correct definition"""
+    definition_embedding = None
+
+    # Reuse the card's cached definition embedding when the card is known
+    if request.card_id is not None:
+        card = (await db.execute(queries.owned_card(request.card_id, current_user.id))).scalars().first()
+
+        if card and card.definition == request.correct_definition:
+            definition_embedding = await run_in_threadpool(get_card_embedding, card)
+            if db.is_modified(card):
+                await db.commit()
+
+    try:
+        similarity_score, matched_keywords, highlighted_user, highlighted_def = await run_in_threadpool(
+            evaluate_answer,
+            request.user_answer,
+            request.correct_definition,
+            definition_embedding
+        )
+
+        return SimilarityResponse(
+            similarity_score=similarity_score,
+            matched_keywords=matched_keywords,
+            highlighted_user_answer=highlighted_user,
+            highlighted_definition=highlighted_def
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Evaluation failed: {str(e)}"
+        )
+
+@router.post("/review", response_model=ReviewResponse)
+async def submit_review(
+    review: ReviewSubmit,
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Submit a review for a card and update spaced repetition data"""
+    card = await _get_card_checked(db, review.card_id, current_user.id, status.HTTP_404_NOT_FOUND)
+
+    # Evaluate the answer against the cached definition embedding
+    # (a stale vector is refreshed here and persisted by the commit below)
+    definition_embedding = await run_in_threadpool(get_card_embedding, card)
+    similarity_score, matched_keywords, _, _ = await run_in_threadpool(
+        evaluate_answer, review.user_answer, card.definition, definition_embedding
+    )
+
+    progress = await _get_or_create_progress(db, current_user.id, review.card_id)
+
+    new_ease, new_interval, new_reps, next_review = calculate_next_review(
+        quality=review.quality,
+        ease_factor=progress.ease_factor,
+        interval=progress.interval,
+        repetitions=progress.repetitions
+    )
+    progress.ease_factor = new_ease
+    progress.interval = new_interval
+    progress.repetitions = new_reps
+    progress.next_review = next_review
+    progress.last_reviewed = datetime.utcnow()
+
+    db_review = Review(
+        card_id=review.card_id,
+        user_id=current_user.id,
+        user_answer=review.user_answer,
+        similarity_score=similarity_score,
+        quality=review.quality
+    )
+    db.add(db_review)
+    await db.commit()
+    await db.refresh(db_review)
+
+    return ReviewResponse(
+        id=db_review.id,
+        card_id=db_review.card_id,
+        similarity_score=similarity_score,
+        quality=review.quality,
+        matched_keywords=matched_keywords,
+        reviewed_at=db_review.reviewed_at
+    )
+
+@router.delete("/progress/card/{card_id}")
+async def reset_card_progress(
+    card_id: int,
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Reset progress for a specific card"""
+    await _get_card_checked(db, card_id, current_user.id, status.HTTP_403_FORBIDDEN)
+
+    progress = (await db.execute(queries.card_progress(card_id, current_user.id))).scalars().first()
+
+    if progress:
+        _reset(progress)
+        await db.commit()
+
+    return {"message": "Card progress reset successfully"}
+
+@router.delete("/progress/deck/{deck_id}")
+async def reset_deck_progress(
+    deck_id: int,
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Reset progress for all cards in a deck"""
+    deck = (await db.execute(queries.owned_deck(deck_id, current_user.id))).scalars().first()
+
+    if not deck:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Deck not found"
+        )
+
+    progress_records = (await db.execute(queries.deck_progress(deck_id, current_user.id))).scalars().all()
+
+    for progress in progress_records:
+        _reset(progress)
+
+    await db.commit()
+
+    return {"message": f"Reset progress for {len(progress_records)} cards"}
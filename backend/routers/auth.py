@@ -1,22 +1,50 @@
 from datetime import timedelta
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from database import get_db
 from models import User
 from schemas import UserCreate, UserLogin, UserResponse, Token
 from auth_utils import (
-    get_password_hash,
-    verify_password,
+    get_password_hash_async,
+    verify_password_async,
+    needs_rehash,
     create_access_token,
     ACCESS_TOKEN_EXPIRE_MINUTES
 )
 
 router = APIRouter()
 
+def _find_credentials(db: Session, username: str):
+    """
+    (id, username, hashed_password) for username, or None
+    Ends the transaction so the connection goes back to the pool while the
+    password is hashed, instead of being held for the whole bcrypt call
+    """
+    credentials = db.query(User.id, User.username, User.hashed_password).filter(
+        User.username == username
+    ).first()
+    db.rollback()
+    return credentials
+
+def _add_user(db: Session, username: str, hashed_password: str) -> User:
+    new_user = User(username=username, hashed_password=hashed_password)
+    db.add(new_user)
+    db.commit()
+    db.refresh(new_user)
+    return new_user
+
+def _update_password_hash(db: Session, user_id: int, hashed_password: str) -> None:
+    db.query(User).filter(User.id == user_id).update({User.hashed_password: hashed_password})
+    db.commit()
+
+# Password hashing runs on the dedicated bcrypt pool and database work on the
+# request threadpool, so the event loop never blocks on either
+
 @router.post("/signup", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
-def signup(user: UserCreate, db: Session = Depends(get_db)):
+async def signup(user: UserCreate, db: Session = Depends(get_db)):
     # Check if user already exists
-    db_user = db.query(User).filter(User.username == user.username).first()
+    db_user = await run_in_threadpool(_find_credentials, db, user.username)
     if db_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -24,30 +52,30 @@ def signup(user: UserCreate, db: Session = Depends(get_db)):
         )
     
     # Create new user
-    hashed_password = get_password_hash(user.password)
-    new_user = User(username=user.username, hashed_password=hashed_password)
-    db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
-    
-    return new_user
+    hashed_password = await get_password_hash_async(user.password)
+    return await run_in_threadpool(_add_user, db, user.username, hashed_password)
 
 @router.post("/login", response_model=Token)
-def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
+async def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
     # Find user
-    user = db.query(User).filter(User.username == user_credentials.username).first()
+    user = await run_in_threadpool(_find_credentials, db, user_credentials.username)
     
-    if not user or not verify_password(user_credentials.password, user.hashed_password):
+    if not user or not await verify_password_async(user_credentials.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
+    # Move the hash to the configured BCRYPT_ROUNDS (up or down) while we have the password
+    if needs_rehash(user.hashed_password):
+        hashed_password = await get_password_hash_async(user_credentials.password)
+        await run_in_threadpool(_update_password_hash, db, user.id, hashed_password)
+    
     # Create access token
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": user.username}, expires_delta=access_token_expires
+        data={"sub": user.username, "uid": user.id}, expires_delta=access_token_expires
     )
     
     return {"access_token": access_token, "token_type": "bearer"}
@@ -1,19 +1,22 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Literal, Optional
 from database import get_db
 from models import User, Deck, Card, UserCardProgress
-from schemas import CardCreate, CardUpdate, CardResponse
-from auth_utils import get_current_user
+from schemas import CardCreate, CardUpdate, CardResponse, PageResponse
+from auth_utils import get_current_user, get_read_db, get_read_user
+from sbert_utils import update_card_embedding
+from pagination import CARD_FIELDS, build_page, decode_cursor, parse_fields
 from datetime import datetime
+import queries
 
 router = APIRouter()
 
 @router.get("/deck/{deck_id}", response_model=List[CardResponse])
 def get_deck_cards(
     deck_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_read_user),
+    db: Session = Depends(get_read_db)
 ):
     """Get all cards for a specific deck"""
     # Verify deck ownership
@@ -28,17 +31,40 @@ def get_deck_cards(
             detail="Deck not found"
         )
     
-    cards = db.query(Card).filter(Card.deck_id == deck_id).all()
+    # Cards and the user's next_review in one outer-joined query
+    rows = db.execute(queries.deck_card_rows(deck_id, current_user.id)).all()
+    return [CardResponse.model_validate(row) for row in rows]
+
+@router.get("/deck/{deck_id}/page", response_model=PageResponse)
+def get_deck_cards_page(
+    deck_id: int,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    order: Literal["id", "next_review"] = "id",
+    fields: Optional[str] = None,
+    current_user: User = Depends(get_read_user),
+    db: Session = Depends(get_read_db)
+):
+    """
+    Get one page of a deck's cards (keyset pagination)
+    
+    Pass the returned next_cursor back as cursor= for the following page;
+    fields= (e.g. id,concept,next_review) limits each item to those fields
+    so list views can skip the definition text.
+    """
+    selected = parse_fields(fields, CARD_FIELDS)
+    after = decode_cursor(cursor, order)
     
-    # Add next_review info from UserCardProgress
-    for card in cards:
-        progress = db.query(UserCardProgress).filter(
-            UserCardProgress.card_id == card.id,
-            UserCardProgress.user_id == current_user.id
-        ).first()
-        card.next_review = progress.next_review if progress else None
+    deck = db.execute(queries.owned_deck(deck_id, current_user.id)).scalars().first()
+    
+    if not deck:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Deck not found"
+        )
     
-    return cards
+    rows = db.execute(queries.card_page(deck_id, current_user.id, selected, order, after, limit)).all()
+    return build_page(rows, selected, order, limit)
 
 @router.post("/", response_model=CardResponse, status_code=status.HTTP_201_CREATED)
 def create_card(
@@ -64,6 +90,8 @@ def create_card(
         concept=card.concept,
         definition=card.definition
     )
+    # Cache the definition embedding so reviews only encode the answer
+    update_card_embedding(db_card)
     db.add(db_card)
     db.commit()
     db.refresh(db_card)
@@ -87,34 +115,16 @@ def get_card(
     db: Session = Depends(get_db)
 ):
     """Get a specific card"""
-    card = db.query(Card).filter(Card.id == card_id).first()
+    # Card, deck owner and next_review in one query
+    row = db.execute(queries.card_row(card_id, current_user.id)).first()
     
-    if not card:
+    if not row or row.owner_id != current_user.id:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Card not found"
         )
     
-    # Verify deck ownership
-    deck = db.query(Deck).filter(
-        Deck.id == card.deck_id,
-        Deck.user_id == current_user.id
-    ).first()
-    
-    if not deck:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Card not found"
-        )
-    
-    # Add next_review info
-    progress = db.query(UserCardProgress).filter(
-        UserCardProgress.card_id == card.id,
-        UserCardProgress.user_id == current_user.id
-    ).first()
-    card.next_review = progress.next_review if progress else None
-    
-    return card
+    return CardResponse.model_validate(row)
 
 @router.put("/{card_id}", response_model=CardResponse)
 def update_card(
@@ -124,7 +134,7 @@ def update_card(
     db: Session = Depends(get_db)
 ):
     """Update a card"""
-    card = db.query(Card).filter(Card.id == card_id).first()
+    card = db.execute(queries.owned_card(card_id, current_user.id)).scalars().first()
     
     if not card:
         raise HTTPException(
@@ -132,34 +142,16 @@ def update_card(
             detail="Card not found"
         )
     
-    # Verify deck ownership
-    deck = db.query(Deck).filter(
-        Deck.id == card.deck_id,
-        Deck.user_id == current_user.id
-    ).first()
-    
-    if not deck:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Card not found"
-        )
-    
     if card_update.concept is not None:
         card.concept = card_update.concept
-    if card_update.definition is not None:
+    if card_update.definition is not None and card_update.definition != card.definition:
         card.definition = card_update.definition
+        update_card_embedding(card)
     
     db.commit()
-    db.refresh(card)
-    
-    # Add next_review info
-    progress = db.query(UserCardProgress).filter(
-        UserCardProgress.card_id == card.id,
-        UserCardProgress.user_id == current_user.id
-    ).first()
-    card.next_review = progress.next_review if progress else None
     
-    return card
+    row = db.execute(queries.card_row(card_id, current_user.id)).first()
+    return CardResponse.model_validate(row)
 
 @router.delete("/{card_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_card(
@@ -1,26 +1,68 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
+from datetime import datetime
 from database import get_db
-from models import User, Deck, Card
-from schemas import DeckCreate, DeckUpdate, DeckResponse
-from auth_utils import get_current_user
+from models import User, Deck
+from schemas import DeckCreate, DeckUpdate, DeckResponse, DeckDashboardResponse, PageResponse
+from auth_utils import get_current_user, get_read_db, get_read_user
+from pagination import DECK_FIELDS, build_page, decode_cursor, parse_fields
+import queries
 
 router = APIRouter()
 
 @router.get("/", response_model=List[DeckResponse])
 def get_user_decks(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_read_user),
+    db: Session = Depends(get_read_db)
 ):
     """Get all decks for the current user"""
-    decks = db.query(Deck).filter(Deck.user_id == current_user.id).all()
+    # card_count is a maintained column (counters.py), no per-deck COUNT
+    return db.execute(queries.user_decks(current_user.id)).scalars().all()
+
+@router.get("/page", response_model=PageResponse)
+def get_user_decks_page(
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    current_user: User = Depends(get_read_user),
+    db: Session = Depends(get_read_db)
+):
+    """
+    Get one page of the current user's decks, ordered by id
     
-    # Add card count to each deck
-    for deck in decks:
-        deck.card_count = db.query(Card).filter(Card.deck_id == deck.id).count()
+    Pass the returned next_cursor back as cursor= for the following page;
+    fields= limits each item to those fields.
+    """
+    selected = parse_fields(fields, DECK_FIELDS)
+    after = decode_cursor(cursor, "id")
     
-    return decks
+    rows = db.execute(queries.deck_page(current_user.id, selected, after, limit)).all()
+    return build_page(rows, selected, "id", limit)
+
+@router.get("/dashboard", response_model=List[DeckDashboardResponse])
+def get_deck_dashboard(
+    current_user: User = Depends(get_read_user),
+    db: Session = Depends(get_read_db)
+):
+    """Get all decks with card, due and new counts and when each was last studied"""
+    rows = db.execute(queries.user_deck_dashboard(current_user.id, datetime.utcnow())).all()
+    
+    return [
+        DeckDashboardResponse(
+            id=deck.id,
+            user_id=deck.user_id,
+            name=deck.name,
+            description=deck.description,
+            created_at=deck.created_at,
+            updated_at=deck.updated_at,
+            card_count=card_count,
+            due_count=due_count,
+            new_count=new_count,
+            last_studied=last_studied
+        )
+        for deck, card_count, due_count, new_count, last_studied in rows
+    ]
 
 @router.post("/", response_model=DeckResponse, status_code=status.HTTP_201_CREATED)
 def create_deck(
@@ -38,7 +80,6 @@ def create_deck(
     db.commit()
     db.refresh(db_deck)
     
-    db_deck.card_count = 0
     return db_deck
 
 @router.get("/{deck_id}", response_model=DeckResponse)
@@ -59,7 +100,6 @@ def get_deck(
             detail="Deck not found"
         )
     
-    deck.card_count = db.query(Card).filter(Card.deck_id == deck.id).count()
     return deck
 
 @router.put("/{deck_id}", response_model=DeckResponse)
@@ -89,7 +129,6 @@ def update_deck(
     db.commit()
     db.refresh(deck)
     
-    deck.card_count = db.query(Card).filter(Card.deck_id == deck.id).count()
     return deck
 
 @router.delete("/{deck_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -0,0 +1,113 @@
+"""
+Streaming export of a user's cards and study progress, for backups and LMS
+imports
+
+Rows are read in yield_per batches (a server-side cursor on PostgreSQL) and
+each batch is written to the response as NDJSON or CSV, gzip-compressed on
+the fly if asked, so an export holds one batch in memory however large the
+deck is. Served by this sync router in both DATABASE_MODEs.
+"""
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from typing import Iterable, Iterator, Literal, Optional
+from datetime import datetime
+from database import read_sessionmaker_for
+from models import User
+from auth_utils import get_read_db, get_read_user
+import csv
+import io
+import json
+import os
+import zlib
+import queries
+
+# Rows fetched from the database (and written out) per batch
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+router = APIRouter()
+
+def _isoformat(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+def _ndjson(rows: Iterable) -> str:
+    return "".join(
+        json.dumps({name: _isoformat(value) for name, value in row._mapping.items()}) + "\n"
+        for row in rows
+    )
+
+def _csv(rows: Iterable) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows([_isoformat(value) for value in row] for row in rows)
+    return buffer.getvalue()
+
+def _export_chunks(user_id: int, deck_id: Optional[int], format: str, gzip: bool) -> Iterator[bytes]:
+    """Encoded (and compressed) output, one chunk per batch of rows"""
+    compressor = zlib.compressobj(wbits=31) if gzip else None  # wbits=31: gzip container
+    
+    def encode(text: str) -> bytes:
+        data = text.encode()
+        return compressor.compress(data) if compressor else data
+    
+    if format == "csv":
+        yield encode(_csv([list(queries.EXPORT_COLUMNS)]))
+    
+    # The request's session is closed before the body is streamed, so the
+    # export reads through its own
+    with read_sessionmaker_for(user_id)() as db:
+        statement = queries.export_rows(user_id, deck_id).execution_options(yield_per=EXPORT_BATCH_SIZE)
+        for rows in db.execute(statement).partitions():
+            chunk = encode(_ndjson(rows) if format == "ndjson" else _csv(rows))
+            if chunk:
+                yield chunk
+    
+    if compressor:
+        yield compressor.flush()
+
+def _export_response(user_id: int, deck_id: Optional[int], filename: str, format: str, gzip: bool) -> StreamingResponse:
+    filename = f"{filename}.{format}" + (".gz" if gzip else "")
+    return StreamingResponse(
+        _export_chunks(user_id, deck_id, format, gzip),
+        media_type="application/gzip" if gzip else MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+@router.get("/")
+def export_all(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    gzip: bool = False,
+    current_user: User = Depends(get_read_user)
+):
+    """
+    Export every card in the user's decks, with deck name and study progress
+    
+    One row per card (see queries.EXPORT_COLUMNS), ordered by deck then card.
+    format=ndjson writes a JSON object per line, format=csv a header row and
+    then the rows; gzip=true compresses the download (.gz).
+    """
+    return _export_response(current_user.id, None, "rekite-export", format, gzip)
+
+@router.get("/deck/{deck_id}")
+def export_deck(
+    deck_id: int,
+    format: Literal["ndjson", "csv"] = "ndjson",
+    gzip: bool = False,
+    current_user: User = Depends(get_read_user),
+    db: Session = Depends(get_read_db)
+):
+    """Export one deck's cards (same rows and options as GET /api/export/)"""
+    # Verify deck ownership before the response starts
+    deck = db.execute(queries.owned_deck(deck_id, current_user.id)).scalars().first()
+    
+    if not deck:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Deck not found"
+        )
+    
+    return _export_response(current_user.id, deck_id, f"deck-{deck_id}", format, gzip)
@@ -1,19 +1,27 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, WebSocket, WebSocketDisconnect, status
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from sqlalchemy import and_
+from sqlalchemy.exc import IntegrityError
 from typing import Optional, List
 from datetime import datetime
-from database import get_db
+from database import get_db, SessionLocal
 from models import User, Deck, Card, UserCardProgress, Review
 from schemas import (
     NextCardResponse, CardResponse, TranscriptionRequest, TranscriptionResponse,
-    SimilarityRequest, SimilarityResponse, ReviewSubmit, ReviewResponse
+    SimilarityRequest, SimilarityResponse, SimilarityBatchRequest, SimilarityBatchResponse,
+    ReviewSubmit, ReviewResponse, AnswerResponse
 )
-from auth_utils import get_current_user
-from deepgram_utils import transcribe_audio
-from sbert_utils import evaluate_answer
-from spaced_repetition import calculate_next_review
+from auth_utils import get_current_user, get_read_db, get_read_user, get_user_from_token
+from deepgram_utils import transcribe_audio, transcribe_audio_bytes, MAX_AUDIO_UPLOAD_BYTES, TranscriptionUnavailable
+from sbert_utils import evaluate_answer, evaluate_answers_batch, get_card_embedding
+from spaced_repetition import calculate_next_review, get_quality_from_similarity
+from streaming_stt import open_streaming_session
+from contextlib import suppress
+import asyncio
+import json
 import random
+import queries
 
 router = APIRouter()
 
@@ -24,34 +32,26 @@ def get_single_card_for_study(
     db: Session = Depends(get_db)
 ):
     """Get a single card for study"""
-    # Get the card
-    card = db.query(Card).filter(Card.id == card_id).first()
+    # Card, deck owner and progress in one query
+    row = db.execute(queries.card_row(card_id, current_user.id)).first()
     
-    if not card:
+    if not row:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Card not found"
         )
     
     # Verify deck ownership
-    deck = db.query(Deck).filter(
-        Deck.id == card.deck_id,
-        Deck.user_id == current_user.id
-    ).first()
-    
-    if not deck:
+    if row.owner_id != current_user.id:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Access denied"
         )
     
-    # Get or create progress
-    progress = db.query(UserCardProgress).filter(
-        UserCardProgress.card_id == card_id,
-        UserCardProgress.user_id == current_user.id
-    ).first()
+    card = CardResponse.model_validate(row)
     
-    if not progress:
+    # Create progress if the user has none for this card yet
+    if row.progress_id is None:
         progress = UserCardProgress(
             user_id=current_user.id,
             card_id=card_id,
@@ -61,24 +61,25 @@ def get_single_card_for_study(
             next_review=datetime.utcnow()
         )
         db.add(progress)
-        db.commit()
-        db.refresh(progress)
-    
-    return CardResponse(
-        id=card.id,
-        deck_id=card.deck_id,
-        concept=card.concept,
-        definition=card.definition,
-        created_at=card.created_at,
-        updated_at=card.updated_at,
-        next_review=progress.next_review
-    )
+        try:
+            db.commit()
+            db.refresh(progress)
+        except IntegrityError:
+            # A concurrent request created the row first (unique user_id, card_id)
+            db.rollback()
+            progress = db.query(UserCardProgress).filter(
+                UserCardProgress.card_id == card_id,
+                UserCardProgress.user_id == current_user.id
+            ).one()
+        card.next_review = progress.next_review
+    
+    return card
 
 @router.get("/deck/{deck_id}/next", response_model=NextCardResponse)
 def get_next_card_for_review(
     deck_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_read_user),
+    db: Session = Depends(get_read_db)
 ):
     """Get the next card due for review in a deck"""
     # Verify deck ownership
@@ -108,8 +109,8 @@ def get_next_card_for_review(
     
     card_progress_pair = cards_query.first()
     
-    # Count total cards due
-    total_due = cards_query.count()
+    # Count total cards due (due-day counters + today's rows, see counters.py)
+    total_due = db.scalar(queries.cards_remaining(deck_id, current_user.id, now))
     
     if not card_progress_pair:
         return NextCardResponse(
@@ -150,22 +151,214 @@ async def transcribe_speech(
             transcript=transcript,
             confidence=confidence
         )
+    except TranscriptionUnavailable as e:
+        # Shown to the student in place of a transcript
+        return TranscriptionResponse(transcript=str(e), confidence=0.0)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Transcription failed: {str(e)}"
+        )
+
+async def _read_audio_body(request: Request) -> bytes:
+    """
+    Read a raw audio request body, enforcing MAX_AUDIO_UPLOAD_BYTES as the
+    chunks arrive rather than after buffering the whole upload
+    """
+    too_large = HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"Audio exceeds {MAX_AUDIO_UPLOAD_BYTES} bytes"
+    )
+    
+    # Reject up front when the client declares the size
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > MAX_AUDIO_UPLOAD_BYTES:
+        raise too_large
+    
+    audio = bytearray()
+    async for chunk in request.stream():
+        audio.extend(chunk)
+        if len(audio) > MAX_AUDIO_UPLOAD_BYTES:
+            raise too_large
+    
+    if not audio:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Audio body is empty"
+        )
+    
+    return bytes(audio)
+
+def _audio_mimetype(request: Request) -> str:
+    """Content type to forward to the transcriber (parameters kept for raw PCM rate/channels)"""
+    content_type = request.headers.get("content-type", "").strip()
+    return content_type if content_type.startswith("audio/") else "audio/*"
+
+@router.post("/transcribe/upload", response_model=TranscriptionResponse)
+async def transcribe_speech_upload(
+    request: Request,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Transcribe audio sent as the raw request body (e.g. Content-Type: audio/webm)
+    Avoids the ~33% base64 overhead and the extra decoded copy of /transcribe
+    """
+    audio_bytes = await _read_audio_body(request)
+    
+    try:
+        transcript, confidence = await transcribe_audio_bytes(audio_bytes, _audio_mimetype(request))
+        
+        return TranscriptionResponse(
+            transcript=transcript,
+            confidence=confidence
+        )
+    except TranscriptionUnavailable as e:
+        # Shown to the student in place of a transcript
+        return TranscriptionResponse(transcript=str(e), confidence=0.0)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Transcription failed: {str(e)}"
         )
 
+def _load_card_for_live_answer(token: str, card_id: int):
+    """
+    Authenticate a WebSocket token and load the card's definition and cached
+    embedding. Returns (definition, embedding) or None if not allowed
+    """
+    db = SessionLocal()
+    try:
+        user = get_user_from_token(token, db)
+        if user is None:
+            return None
+        
+        card = db.query(Card).join(Deck).filter(
+            Card.id == card_id,
+            Deck.user_id == user.id
+        ).first()
+        if card is None:
+            return None
+        
+        definition_embedding = get_card_embedding(card)
+        if db.is_modified(card):
+            db.commit()
+        
+        return card.definition, definition_embedding
+    finally:
+        db.close()
+
+@router.websocket("/ws/answer/{card_id}")
+async def live_answer(websocket: WebSocket, card_id: int, token: str):
+    """
+    Live transcription of a spoken answer, scored against the card when speech ends
+    
+    Connect with ?token=<JWT>. The client sends audio chunks as binary frames
+    while the student speaks, then {"type": "stop"} (or simply stops once the
+    backend detects the end of speech). The server sends:
+        {"type": "partial", "transcript": ...}  while audio is streaming
+        {"type": "final", "transcript": ..., "confidence": ...,
+         "evaluation": {SimilarityResponse fields}, "suggested_quality": 0-3}
+        {"type": "error", "detail": ...}  on failure
+    """
+    await websocket.accept()
+    
+    card = await run_in_threadpool(_load_card_for_live_answer, token, card_id)
+    if card is None:
+        await websocket.send_json({"type": "error", "detail": "Card not found or invalid credentials"})
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    definition, definition_embedding = card
+    
+    try:
+        session = await open_streaming_session()
+    except Exception as e:
+        await websocket.send_json({"type": "error", "detail": f"Transcription failed: {str(e)}"})
+        await websocket.close(code=status.WS_1011_INTERNAL_ERROR)
+        return
+    
+    async def relay_audio():
+        """Forward client audio to the STT backend until the client stops"""
+        received = 0
+        try:
+            while True:
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    break
+                if message.get("bytes"):
+                    received += len(message["bytes"])
+                    if received > MAX_AUDIO_UPLOAD_BYTES:
+                        break
+                    await session.send_audio(message["bytes"])
+                elif message.get("text") and json.loads(message["text"]).get("type") == "stop":
+                    break
+        finally:
+            # The backend may already have ended the stream (end of speech detected)
+            with suppress(Exception):
+                await session.finish()
+    
+    relay_task = asyncio.create_task(relay_audio())
+    final = None
+    try:
+        async for event in session.events():
+            if event["type"] == "partial":
+                await websocket.send_json(event)
+            else:
+                final = event
+                break
+        
+        if final is None:
+            raise RuntimeError("Transcription stream ended without a result")
+        
+        similarity_score, matched_keywords, highlighted_user, highlighted_def = await run_in_threadpool(
+            evaluate_answer, final["transcript"], definition, definition_embedding
+        )
+        
+        await websocket.send_json({
+            **final,
+            "evaluation": SimilarityResponse(
+                similarity_score=similarity_score,
+                matched_keywords=matched_keywords,
+                highlighted_user_answer=highlighted_user,
+                highlighted_definition=highlighted_def
+            ).model_dump(),
+            "suggested_quality": get_quality_from_similarity(similarity_score)
+        })
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        await websocket.send_json({"type": "error", "detail": f"Transcription failed: {str(e)}"})
+        await websocket.close(code=status.WS_1011_INTERNAL_ERROR)
+    finally:
+        relay_task.cancel()
+        await session.close()
+
 @router.post("/evaluate", response_model=SimilarityResponse)
 def evaluate_similarity(
     request: SimilarityRequest,
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
 ):
     """Evaluate semantic similarity between user answer and correct definition"""
+    definition_embedding = None
+    
+    # Reuse the card's cached definition embedding when the card is known
+    if request.card_id is not None:
+        card = db.query(Card).join(Deck).filter(
+            Card.id == request.card_id,
+            Deck.user_id == current_user.id
+        ).first()
+        
+        if card and card.definition == request.correct_definition:
+            definition_embedding = get_card_embedding(card)
+            if db.is_modified(card):
+                db.commit()
+    
     try:
         similarity_score, matched_keywords, highlighted_user, highlighted_def = evaluate_answer(
             request.user_answer,
-            request.correct_definition
+            request.correct_definition,
+            definition_embedding
         )
         
         return SimilarityResponse(
@@ -180,59 +373,71 @@ def evaluate_similarity(
             detail=f"Evaluation failed: {str(e)}"
         )
 
-@router.post("/review", response_model=ReviewResponse)
-def submit_review(
-    review: ReviewSubmit,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+@router.post("/evaluate/batch", response_model=SimilarityBatchResponse)
+def evaluate_similarity_batch(
+    request: SimilarityBatchRequest,
+    current_user: User = Depends(get_current_user)
 ):
-    """Submit a review for a card and update spaced repetition data"""
-    # Get the card and verify access
-    card = db.query(Card).filter(Card.id == review.card_id).first()
-    
-    if not card:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Card not found"
+    """Evaluate many answer/definition pairs in one call"""
+    try:
+        results = evaluate_answers_batch(
+            [(pair.user_answer, pair.correct_definition) for pair in request.pairs]
         )
-    
-    # Verify deck ownership
-    deck = db.query(Deck).filter(
-        Deck.id == card.deck_id,
-        Deck.user_id == current_user.id
-    ).first()
-    
-    if not deck:
+        
+        return SimilarityBatchResponse(results=[
+            SimilarityResponse(
+                similarity_score=similarity_score,
+                matched_keywords=matched_keywords,
+                highlighted_user_answer=highlighted_user,
+                highlighted_definition=highlighted_def
+            )
+            for similarity_score, matched_keywords, highlighted_user, highlighted_def in results
+        ])
+    except Exception as e:
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Card not found"
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Evaluation failed: {str(e)}"
         )
-    
-    # Evaluate the answer
-    similarity_score, matched_keywords, _, _ = evaluate_answer(
-        review.user_answer,
-        card.definition
-    )
-    
-    # Get or create progress
+
+def _get_or_create_progress(db: Session, user_id: int, card_id: int) -> UserCardProgress:
+    """Get the user's progress row for a card, adding a fresh one if missing"""
     progress = db.query(UserCardProgress).filter(
-        UserCardProgress.card_id == review.card_id,
-        UserCardProgress.user_id == current_user.id
+        UserCardProgress.card_id == card_id,
+        UserCardProgress.user_id == user_id
     ).first()
     
     if not progress:
         progress = UserCardProgress(
-            user_id=current_user.id,
-            card_id=review.card_id,
+            user_id=user_id,
+            card_id=card_id,
             ease_factor=2.5,
             interval=0,
             repetitions=0
         )
         db.add(progress)
-    
+        try:
+            db.flush()
+        except IntegrityError:
+            # A concurrent request created the row first (unique user_id, card_id)
+            db.rollback()
+            progress = db.query(UserCardProgress).filter(
+                UserCardProgress.card_id == card_id,
+                UserCardProgress.user_id == user_id
+            ).one()
+    
+    return progress
+
+def _record_review(
+    db: Session,
+    progress: UserCardProgress,
+    user_answer: str,
+    similarity_score: float,
+    quality: int
+) -> Review:
+    """Apply the SM-2 update to progress, store the review and commit"""
     # Calculate next review using spaced repetition algorithm
     new_ease, new_interval, new_reps, next_review = calculate_next_review(
-        quality=review.quality,
+        quality=quality,
         ease_factor=progress.ease_factor,
         interval=progress.interval,
         repetitions=progress.repetitions
@@ -247,17 +452,61 @@ def submit_review(
     
     # Create review record
     db_review = Review(
-        card_id=review.card_id,
-        user_id=current_user.id,
-        user_answer=review.user_answer,
+        card_id=progress.card_id,
+        user_id=progress.user_id,
+        user_answer=user_answer,
         similarity_score=similarity_score,
-        quality=review.quality
+        quality=quality
     )
     db.add(db_review)
     
     db.commit()
     db.refresh(db_review)
     
+    return db_review
+
+@router.post("/review", response_model=ReviewResponse)
+def submit_review(
+    review: ReviewSubmit,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Submit a review for a card and update spaced repetition data"""
+    # Get the card and verify access
+    card = db.query(Card).filter(Card.id == review.card_id).first()
+    
+    if not card:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Card not found"
+        )
+    
+    # Verify deck ownership
+    deck = db.query(Deck).filter(
+        Deck.id == card.deck_id,
+        Deck.user_id == current_user.id
+    ).first()
+    
+    if not deck:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Card not found"
+        )
+    
+    # Evaluate the answer against the cached definition embedding
+    # (a stale vector is refreshed here and persisted by the commit below)
+    similarity_score, matched_keywords, _, _ = evaluate_answer(
+        review.user_answer,
+        card.definition,
+        get_card_embedding(card)
+    )
+    
+    progress = _get_or_create_progress(db, current_user.id, review.card_id)
+    
+    db_review = _record_review(
+        db, progress, review.user_answer, similarity_score, review.quality
+    )
+    
     return ReviewResponse(
         id=db_review.id,
         card_id=db_review.card_id,
@@ -267,6 +516,134 @@ def submit_review(
         reviewed_at=db_review.reviewed_at
     )
 
+def _load_answer_context(db: Session, user_id: int, card_id: int):
+    """
+    Load the card (definition and cached embedding) and the user's progress
+    row for it in one query while transcription runs
+    
+    Read-only apart from persisting a recomputed (stale) embedding; the
+    transaction is ended before returning so the request holds no connection,
+    transaction or write lock for the length of the Deepgram call. The
+    progress row is detached first so ending the transaction doesn't expire
+    it; _evaluate_and_record attaches it again without reloading.
+    Returns (definition, embedding, progress or None) or None if the user
+    can't access the card
+    """
+    row = db.execute(queries.owned_card_with_progress(card_id, user_id)).first()
+    
+    if not row:
+        db.rollback()
+        return None
+    
+    card, progress = row
+    if progress is not None:
+        db.expunge(progress)
+    
+    definition, definition_embedding = card.definition, get_card_embedding(card)
+    if db.dirty:
+        db.commit()
+    else:
+        db.rollback()
+    return definition, definition_embedding, progress
+
+def _abandon(task: asyncio.Task) -> None:
+    """Cancel a transcription that is no longer needed, retrieving any error it already raised"""
+    task.cancel()
+    task.add_done_callback(lambda done: done.cancelled() or done.exception())
+
+def _evaluate_and_record(db: Session, user_id: int, card_id: int, definition: str, definition_embedding, progress: Optional[UserCardProgress], transcript: str, quality: Optional[int]):
+    """
+    Score the transcript and apply the review to the progress row loaded by
+    _load_answer_context (created here if the user had none) in one transaction
+    """
+    evaluation = evaluate_answer(transcript, definition, definition_embedding)
+    if quality is None:
+        quality = get_quality_from_similarity(evaluation[0])
+    
+    if progress is not None:
+        progress = db.merge(progress, load=False)
+    else:
+        progress = _get_or_create_progress(db, user_id, card_id)
+    db_review = _record_review(db, progress, transcript, evaluation[0], quality)
+    return evaluation, db_review
+
+@router.post("/answer/{card_id}", response_model=AnswerResponse)
+async def submit_spoken_answer(
+    card_id: int,
+    request: Request,
+    quality: Optional[int] = Query(None, ge=0, le=3),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Transcribe, evaluate and review a spoken answer in one request
+    
+    The audio is the raw request body (as for /transcribe/upload). The card and
+    the progress row are loaded while transcription is in flight; nothing is
+    written until the transcript is back. If quality is omitted, the quality suggested by the
+    similarity score is used. Returns what /transcribe, /evaluate and /review
+    would return, or 503 if transcription is not configured.
+    """
+    audio_bytes = await _read_audio_body(request)
+    
+    # Start transcription and load the card and progress concurrently
+    transcription = asyncio.create_task(
+        transcribe_audio_bytes(audio_bytes, _audio_mimetype(request))
+    )
+    try:
+        context = await run_in_threadpool(_load_answer_context, db, current_user.id, card_id)
+    except Exception:
+        _abandon(transcription)
+        raise
+    
+    if context is None:
+        _abandon(transcription)
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Card not found"
+        )
+    definition, definition_embedding, progress = context
+    
+    try:
+        transcript, confidence = await transcription
+    except TranscriptionUnavailable as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e)
+        )
+    if not transcript.strip():
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="No speech detected"
+        )
+    
+    (similarity_score, matched_keywords, highlighted_user, highlighted_def), db_review = await run_in_threadpool(
+        _evaluate_and_record, db, current_user.id, card_id, definition, definition_embedding, progress, transcript, quality
+    )
+    
+    return AnswerResponse(
+        transcription=TranscriptionResponse(
+            transcript=transcript,
+            confidence=confidence
+        ),
+        evaluation=SimilarityResponse(
+            similarity_score=similarity_score,
+            matched_keywords=matched_keywords,
+            highlighted_user_answer=highlighted_user,
+            highlighted_definition=highlighted_def
+        ),
+        review=ReviewResponse(
+            id=db_review.id,
+            card_id=db_review.card_id,
+            similarity_score=similarity_score,
+            quality=db_review.quality,
+            matched_keywords=matched_keywords,
+            reviewed_at=db_review.reviewed_at
+        )
+    )
+
 @router.delete("/progress/card/{card_id}")
 def reset_card_progress(
     card_id: int,
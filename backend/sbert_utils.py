@@ -1,16 +1,224 @@
+import os
+import threading
+import time
+
+from embedding_backends import EMBEDDING_BACKEND, create_backend, get_backend_class
+
+MODEL_NAME = os.getenv("SBERT_MODEL_NAME", "all-MiniLM-L6-v2")  # Fast and efficient model
+
+# Tag stored next to cached definition embeddings so vectors produced by a
+# different model, backend (e.g. int8 ONNX) or encoding scheme are detected
+# as stale and recomputed
+EMBEDDING_VERSION = f"{MODEL_NAME}:{EMBEDDING_BACKEND}:float32-normalized:v1"
+
+# Only check that the packages are installed; torch/onnxruntime and the model
+# are loaded lazily (see start_warmup) so importing this module stays cheap
+SBERT_AVAILABLE = get_backend_class(EMBEDDING_BACKEND).is_available()
+
 try:
-    from sentence_transformers import SentenceTransformer, util
-    SBERT_AVAILABLE = True
-    # Load model once at module level for efficiency
-    model = SentenceTransformer('all-MiniLM-L6-v2')  # Fast and efficient model
-except ImportError:
-    SBERT_AVAILABLE = False
-    model = None
-
-from typing import List, Tuple
+    import numpy as np
+except ImportError:  # Lightweight deployments without ML dependencies
+    np = None
+
+from inference_scheduler import InferenceScheduler
+
+from functools import lru_cache
+from typing import FrozenSet, List, NamedTuple, Tuple
 import re
 
-def calculate_similarity(text1: str, text2: str) -> float:
+# Common stop words to exclude from keywords
+STOP_WORDS = frozenset({
+    'a', 'an', 'the', 'is', 'are', 'was', 'were', 'be', 'been', 'being',
+    'have', 'has', 'had', 'do', 'does', 'did', 'will', 'would', 'could',
+    'should', 'may', 'might', 'must', 'can', 'of', 'in', 'to', 'for',
+    'with', 'on', 'at', 'from', 'by', 'about', 'as', 'into', 'through',
+    'during', 'before', 'after', 'above', 'below', 'between', 'under',
+    'again', 'further', 'then', 'once', 'here', 'there', 'when', 'where',
+    'why', 'how', 'all', 'both', 'each', 'few', 'more', 'most', 'other',
+    'some', 'such', 'no', 'nor', 'not', 'only', 'own', 'same', 'so',
+    'than', 'too', 'very', 'that', 'which', 'who', 'and', 'but', 'or',
+    'if', 'because', 'while', 'it', 'its', 'this', 'these', 'those'
+})
+
+# Whole words made of letters; matched case-insensitively on the original text
+# so token offsets can be reused for highlighting
+_WORD_PATTERN = re.compile(r'\b[A-Za-z]+\b')
+
+DEFINITION_ANALYSIS_CACHE_SIZE = int(os.getenv("DEFINITION_ANALYSIS_CACHE_SIZE", "4096"))
+
+class TextAnalysis(NamedTuple):
+    """Result of tokenizing a text once; shared by scoring, matching and highlighting"""
+    text: str
+    tokens: Tuple[Tuple[int, int, str], ...]  # (start, end, lowercase word)
+    keywords: Tuple[str, ...]  # Unique keywords in order of appearance
+    keyword_set: FrozenSet[str]
+
+model = None
+_model_lock = threading.Lock()
+_model_state = {"status": "not_loaded" if SBERT_AVAILABLE else "unavailable", "error": None, "load_seconds": None}
+
+def get_model():
+    """
+    Get the embedding backend (see embedding_backends), loading it on first use
+    
+    Returns:
+        The backend, or None if SBERT is not installed or failed to load
+        (callers then use the keyword fallback)
+    """
+    global model
+    
+    if model is not None or not SBERT_AVAILABLE:
+        return model
+    
+    with _model_lock:
+        if model is None and _model_state["status"] != "failed":
+            _model_state["status"] = "loading"
+            started = time.perf_counter()
+            try:
+                loaded = create_backend(MODEL_NAME)
+                # Run one inference so the first real request doesn't pay for lazy init
+                loaded.encode(["warmup"])
+                model = loaded
+                _model_state["status"] = "ready"
+            except Exception as e:
+                print(f"SBERT model load error: {e}")
+                _model_state["status"] = "failed"
+                _model_state["error"] = str(e)
+            _model_state["load_seconds"] = time.perf_counter() - started
+    
+    return model
+
+def start_warmup() -> None:
+    """Load the model on a background thread so startup isn't blocked"""
+    if SBERT_AVAILABLE and _model_state["status"] == "not_loaded":
+        threading.Thread(target=get_model, name="sbert-warmup", daemon=True).start()
+
+def get_model_status() -> dict:
+    """Readiness of the model: unavailable, not_loaded, loading, ready or failed"""
+    return {"model": MODEL_NAME, "backend": EMBEDDING_BACKEND, **_model_state}
+
+def is_model_ready() -> bool:
+    """True once the model is loaded (or SBERT isn't installed and keyword scoring is the configured mode)"""
+    return _model_state["status"] in ("ready", "unavailable")
+
+def is_model_failed() -> bool:
+    """True if the model failed to load; scoring falls back to keyword matching"""
+    return _model_state["status"] == "failed"
+
+def _encode_batch(texts: List[str]):
+    """Run one batched forward pass; used by the inference scheduler"""
+    return get_model().encode(texts)
+
+# Requests from concurrent /evaluate and /review calls are micro-batched
+scheduler = InferenceScheduler(_encode_batch) if SBERT_AVAILABLE else None
+
+def get_inference_stats() -> dict:
+    """Batch size and queueing delay metrics of the inference scheduler"""
+    if scheduler is None:
+        return {"sbert_available": False}
+    return {"sbert_available": True, **scheduler.get_stats()}
+
+def encode_text(text: str):
+    """
+    Encode a single text into a unit-length float32 embedding
+    
+    Args:
+        text: Input text
+        
+    Returns:
+        numpy array of shape (dim,)
+    """
+    return scheduler.encode(text)
+
+def serialize_embedding(embedding) -> bytes:
+    """Pack an embedding into raw float32 bytes for storage on the Card row"""
+    return np.asarray(embedding, dtype=np.float32).tobytes()
+
+def deserialize_embedding(data: bytes):
+    """Unpack raw float32 bytes stored on the Card row"""
+    return np.frombuffer(data, dtype=np.float32)
+
+def _store_card_embedding(card) -> None:
+    """Encode the definition and attach the vector to a Card (the model must be loaded)"""
+    card.definition_embedding = serialize_embedding(encode_text(card.definition))
+    card.embedding_model = EMBEDDING_VERSION
+
+def update_card_embedding(card) -> None:
+    """
+    Compute and attach the definition embedding to a Card
+    Call whenever the definition is created or changed; the caller commits.
+    Never waits for the model: while it is still loading (or unavailable) the
+    vector is cleared and get_card_embedding fills it in at review time
+    
+    Args:
+        card: Card ORM instance
+    """
+    if model is None:
+        card.definition_embedding = None
+        card.embedding_model = None
+        return
+    
+    _store_card_embedding(card)
+
+def get_card_embedding(card):
+    """
+    Get the cached definition embedding for a Card
+    Stale or missing vectors are recomputed and written back onto the card,
+    so they are persisted by the caller's next commit
+    
+    Args:
+        card: Card ORM instance
+        
+    Returns:
+        numpy array, or None if the SBERT model is not available
+    """
+    if get_model() is None:
+        return None
+    
+    if card.definition_embedding is None or card.embedding_model != EMBEDDING_VERSION:
+        _store_card_embedding(card)
+    
+    return deserialize_embedding(card.definition_embedding)
+
+def analyze_text(text: str) -> TextAnalysis:
+    """
+    Tokenize a text in one pass into word offsets and keywords
+    Keywords are words longer than 3 letters that are not stop words
+    
+    Args:
+        text: Input text
+        
+    Returns:
+        TextAnalysis
+    """
+    tokens = tuple(
+        (match.start(), match.end(), match.group().lower())
+        for match in _WORD_PATTERN.finditer(text)
+    )
+    
+    # Remove duplicates while preserving order
+    keywords = tuple(dict.fromkeys(
+        word for _, _, word in tokens
+        if len(word) > 3 and word not in STOP_WORDS
+    ))
+    
+    return TextAnalysis(text, tokens, keywords, frozenset(keywords))
+
+@lru_cache(maxsize=DEFINITION_ANALYSIS_CACHE_SIZE)
+def analyze_definition(definition: str) -> TextAnalysis:
+    """Cached analyze_text for card definitions, which are scored over and over"""
+    return analyze_text(definition)
+
+def _keyword_similarity(analysis1: TextAnalysis, analysis2: TextAnalysis) -> float:
+    """Jaccard similarity of the keyword sets (fallback when SBERT is not available)"""
+    keywords1, keywords2 = analysis1.keyword_set, analysis2.keyword_set
+    if not keywords1 or not keywords2:
+        return 0.0
+    intersection = len(keywords1 & keywords2)
+    union = len(keywords1 | keywords2)
+    return intersection / union if union > 0 else 0.0
+
+def calculate_similarity(text1: str, text2: str, text2_embedding=None) -> float:
     """
     Calculate semantic similarity between two texts using Sentence-BERT
     Falls back to simple keyword matching if SBERT is not available
@@ -18,29 +226,27 @@ def calculate_similarity(text1: str, text2: str) -> float:
     Args:
         text1: First text
         text2: Second text
+        text2_embedding: Optional precomputed embedding of text2 (e.g. a cached
+            card definition), in which case only text1 is encoded
         
     Returns:
         float: Similarity score between 0.0 and 1.0
     """
-    if not SBERT_AVAILABLE:
+    if get_model() is None:
         # Fallback: simple keyword matching
-        keywords1 = set(extract_keywords(text1.lower()))
-        keywords2 = set(extract_keywords(text2.lower()))
-        if not keywords1 or not keywords2:
-            return 0.0
-        # Jaccard similarity
-        intersection = len(keywords1 & keywords2)
-        union = len(keywords1 | keywords2)
-        return intersection / union if union > 0 else 0.0
-    
-    # Encode texts using SBERT
-    embeddings = model.encode([text1, text2], convert_to_tensor=True)
-    
-    # Calculate cosine similarity
-    similarity = util.cos_sim(embeddings[0], embeddings[1])
-    
-    # Convert to float and ensure range [0, 1]
-    score = float(similarity.item())
+        return _keyword_similarity(analyze_text(text1), analyze_text(text2))
+    
+    # Encode texts using SBERT, reusing the cached embedding when provided
+    if text2_embedding is not None:
+        embedding1 = encode_text(text1)
+        embedding2 = text2_embedding
+    else:
+        embedding1, embedding2 = scheduler.encode_many([text1, text2])
+    
+    # Embeddings are unit length, so cosine similarity is the dot product
+    score = float(np.dot(embedding1, embedding2))
+    
+    # Ensure range [0, 1]
     return max(0.0, min(1.0, score))
 
 def extract_keywords(text: str) -> List[str]:
@@ -54,35 +260,7 @@ def extract_keywords(text: str) -> List[str]:
     Returns:
         List of keywords
     """
-    # Common stop words to exclude
-    stop_words = {
-        'a', 'an', 'the', 'is', 'are', 'was', 'were', 'be', 'been', 'being',
-        'have', 'has', 'had', 'do', 'does', 'did', 'will', 'would', 'could',
-        'should', 'may', 'might', 'must', 'can', 'of', 'in', 'to', 'for',
-        'with', 'on', 'at', 'from', 'by', 'about', 'as', 'into', 'through',
-        'during', 'before', 'after', 'above', 'below', 'between', 'under',
-        'again', 'further', 'then', 'once', 'here', 'there', 'when', 'where',
-        'why', 'how', 'all', 'both', 'each', 'few', 'more', 'most', 'other',
-        'some', 'such', 'no', 'nor', 'not', 'only', 'own', 'same', 'so',
-        'than', 'too', 'very', 'that', 'which', 'who', 'and', 'but', 'or',
-        'if', 'because', 'while', 'it', 'its', 'this', 'these', 'those'
-    }
-    
-    # Convert to lowercase, split into words, remove punctuation
-    words = re.findall(r'\b[a-z]+\b', text.lower())
-    
-    # Filter keywords (length > 3, not stop words)
-    keywords = [w for w in words if len(w) > 3 and w not in stop_words]
-    
-    # Remove duplicates while preserving order
-    seen = set()
-    unique_keywords = []
-    for kw in keywords:
-        if kw not in seen:
-            seen.add(kw)
-            unique_keywords.append(kw)
-    
-    return unique_keywords
+    return list(analyze_text(text).keywords)
 
 def find_matched_keywords(user_answer: str, correct_definition: str) -> List[str]:
     """
@@ -95,16 +273,15 @@ def find_matched_keywords(user_answer: str, correct_definition: str) -> List[str
     Returns:
         List of matched keywords
     """
-    user_keywords = set(extract_keywords(user_answer))
-    correct_keywords = set(extract_keywords(correct_definition))
-    
-    # Find intersection
-    matched = list(user_keywords.intersection(correct_keywords))
-    return sorted(matched)
+    return _matched_keywords(analyze_text(user_answer), analyze_definition(correct_definition))
+
+def _matched_keywords(answer: TextAnalysis, definition: TextAnalysis) -> List[str]:
+    return sorted(answer.keyword_set & definition.keyword_set)
 
 def highlight_keywords(text: str, keywords: List[str]) -> str:
     """
     Highlight keywords in text with HTML markup
+    Whole words are matched case-insensitively in a single pass over the text
     
     Args:
         text: Original text
@@ -113,40 +290,135 @@ def highlight_keywords(text: str, keywords: List[str]) -> str:
     Returns:
         Text with highlighted keywords
     """
+    return _highlight_analysis(analyze_text(text), frozenset(keyword.lower() for keyword in keywords))
+
+def _highlight_analysis(analysis: TextAnalysis, keywords) -> str:
+    """Highlight keywords using the token offsets of an analysis (no rescan)"""
     if not keywords:
-        return text
+        return analysis.text
     
-    highlighted_text = text
-    
-    # Sort keywords by length (longest first) to avoid partial matches
-    sorted_keywords = sorted(keywords, key=len, reverse=True)
-    
-    for keyword in sorted_keywords:
-        # Use word boundaries for whole word matching (case-insensitive)
-        pattern = re.compile(r'\b(' + re.escape(keyword) + r')\b', re.IGNORECASE)
-        highlighted_text = pattern.sub(r'<mark>\1</mark>', highlighted_text)
+    text = analysis.text
+    parts = []
+    last = 0
+    for start, end, word in analysis.tokens:
+        if word in keywords:
+            parts.append(text[last:start])
+            parts.append('<mark>' + text[start:end] + '</mark>')
+            last = end
+    parts.append(text[last:])
+    return ''.join(parts)
+
+def _evaluate_analyses(
+    answer: TextAnalysis,
+    definition: TextAnalysis,
+    similarity_score: float
+) -> Tuple[float, List[str], str, str]:
+    matched_keywords = _matched_keywords(answer, definition)
+    matched_set = frozenset(matched_keywords)
     
-    return highlighted_text
+    return (
+        similarity_score,
+        matched_keywords,
+        _highlight_analysis(answer, matched_set),
+        _highlight_analysis(definition, matched_set)
+    )
 
-def evaluate_answer(user_answer: str, correct_definition: str) -> Tuple[float, List[str], str, str]:
+def evaluate_answer(
+    user_answer: str,
+    correct_definition: str,
+    definition_embedding=None
+) -> Tuple[float, List[str], str, str]:
     """
     Evaluate user's answer against correct definition
+    Each text is tokenized once; the analysis feeds similarity, keyword
+    matching and highlighting
     
     Args:
         user_answer: User's transcribed answer
         correct_definition: Correct definition
+        definition_embedding: Optional cached embedding of the definition
         
     Returns:
         Tuple of (similarity_score, matched_keywords, highlighted_user_answer, highlighted_definition)
     """
+    answer = analyze_text(user_answer)
+    definition = analyze_definition(correct_definition)
+    
     # Calculate semantic similarity
-    similarity_score = calculate_similarity(user_answer, correct_definition)
+    if get_model() is None:
+        similarity_score = _keyword_similarity(answer, definition)
+    else:
+        similarity_score = calculate_similarity(user_answer, correct_definition, definition_embedding)
+    
+    # Find matched keywords and highlight them in both texts
+    return _evaluate_analyses(answer, definition, similarity_score)
+
+def evaluate_answers_batch(pairs: List[Tuple[str, str]]) -> List[Tuple[float, List[str], str, str]]:
+    """
+    Evaluate many (user_answer, correct_definition) pairs at once
+    All unique texts are encoded in a single forward pass and the pairwise
+    cosine scores are computed as one matrix operation
+    
+    Args:
+        pairs: List of (user_answer, correct_definition) tuples
+        
+    Returns:
+        List of (similarity_score, matched_keywords, highlighted_user_answer,
+        highlighted_definition), one per pair, in input order
+    """
+    if not pairs:
+        return []
+    
+    # Index every distinct text once; answers and definitions often repeat
+    unique_texts = list(dict.fromkeys(text for pair in pairs for text in pair))
+    index = {text: i for i, text in enumerate(unique_texts)}
+    answer_idx = [index[answer] for answer, _ in pairs]
+    definition_idx = [index[definition] for _, definition in pairs]
+    
+    answers = {answer: analyze_text(answer) for answer, _ in pairs}
+    definitions = {definition: analyze_definition(definition) for _, definition in pairs}
+    keywords = {text: analysis.keywords for text, analysis in {**answers, **definitions}.items()}
+    
+    backend = get_model()
+    if backend is not None:
+        embeddings = backend.encode(unique_texts)
+        # Row-wise dot products of unit vectors = cosine similarities
+        scores = np.einsum("ij,ij->i", embeddings[answer_idx], embeddings[definition_idx])
+        scores = np.clip(scores, 0.0, 1.0).tolist()
+    else:
+        scores = _keyword_similarity_batch(unique_texts, keywords, answer_idx, definition_idx)
+    
+    return [
+        _evaluate_analyses(answers[user_answer], definitions[correct_definition], float(score))
+        for (user_answer, correct_definition), score in zip(pairs, scores)
+    ]
+
+def _keyword_similarity_batch(unique_texts, keywords, answer_idx, definition_idx) -> List[float]:
+    """Vectorized Jaccard similarity over keyword sets (fallback without SBERT)"""
+    if np is None:
+        results = []
+        for a, d in zip(answer_idx, definition_idx):
+            set1, set2 = set(keywords[unique_texts[a]]), set(keywords[unique_texts[d]])
+            union = len(set1 | set2)
+            results.append(len(set1 & set2) / union if set1 and set2 and union else 0.0)
+        return results
     
-    # Find matched keywords
-    matched_keywords = find_matched_keywords(user_answer, correct_definition)
+    # Binary text x vocabulary incidence matrix
+    vocabulary = {}
+    rows, cols = [], []
+    for row, text in enumerate(unique_texts):
+        for keyword in keywords[text]:
+            rows.append(row)
+            cols.append(vocabulary.setdefault(keyword, len(vocabulary)))
+    incidence = np.zeros((len(unique_texts), max(1, len(vocabulary))), dtype=bool)
+    incidence[rows, cols] = True
     
-    # Highlight keywords in both texts
-    highlighted_user = highlight_keywords(user_answer, matched_keywords)
-    highlighted_definition = highlight_keywords(correct_definition, matched_keywords)
+    answers = incidence[answer_idx]
+    definitions = incidence[definition_idx]
+    intersection = (answers & definitions).sum(axis=1)
+    union = (answers | definitions).sum(axis=1)
     
-    return similarity_score, matched_keywords, highlighted_user, highlighted_definition
+    # Match calculate_similarity: 0.0 when either side has no keywords
+    valid = answers.any(axis=1) & definitions.any(axis=1)
+    scores = np.where(valid, intersection / np.maximum(union, 1), 0.0)
+    return scores.tolist()
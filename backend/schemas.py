@@ -1,6 +1,6 @@
 from pydantic import BaseModel, Field
 from datetime import datetime
-from typing import Optional, List
+from typing import Any, Dict, Optional, List
 
 class UserBase(BaseModel):
     username: str = Field(..., min_length=3, max_length=50)
@@ -48,6 +48,11 @@ class DeckResponse(DeckBase):
     class Config:
         from_attributes = True
 
+class DeckDashboardResponse(DeckResponse):
+    due_count: int = 0
+    new_count: int = 0
+    last_studied: Optional[datetime] = None
+
 # Card Schemas
 class CardBase(BaseModel):
     concept: str = Field(..., min_length=1, max_length=200)
@@ -70,6 +75,11 @@ class CardResponse(CardBase):
     class Config:
         from_attributes = True
 
+class PageResponse(BaseModel):
+    """A keyset page; items hold only the fields requested with fields="""
+    items: List[Dict[str, Any]]
+    next_cursor: Optional[str] = None
+
 # Review Schemas
 class ReviewSubmit(BaseModel):
     card_id: int
@@ -99,6 +109,7 @@ class TranscriptionResponse(BaseModel):
 class SimilarityRequest(BaseModel):
     user_answer: str
     correct_definition: str
+    card_id: Optional[int] = None  # Reuse the card's cached definition embedding
 
 class SimilarityResponse(BaseModel):
     similarity_score: float
@@ -106,6 +117,22 @@ class SimilarityResponse(BaseModel):
     highlighted_user_answer: str
     highlighted_definition: str
 
+class SimilarityPair(BaseModel):
+    user_answer: str
+    correct_definition: str
+
+class SimilarityBatchRequest(BaseModel):
+    pairs: List[SimilarityPair] = Field(..., max_length=500)
+
+class SimilarityBatchResponse(BaseModel):
+    results: List[SimilarityResponse]
+
+# Combined transcribe + evaluate + review
+class AnswerResponse(BaseModel):
+    transcription: TranscriptionResponse
+    evaluation: SimilarityResponse
+    review: ReviewResponse
+
 # Study Session Schemas
 class NextCardResponse(BaseModel):
     card: Optional[CardResponse] = None
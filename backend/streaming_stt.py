@@ -0,0 +1,181 @@
+"""
+Streaming speech-to-text backends for live transcription
+
+A StreamingSession accepts audio chunks while the student speaks and yields
+transcript events:
+
+    {"type": "partial", "transcript": "..."}                    # may repeat
+    {"type": "final", "transcript": "...", "confidence": 0.93}  # exactly once, last
+
+STREAMING_STT_BACKEND selects the implementation:
+- deepgram: Deepgram's live /v1/listen WebSocket API
+- fake: offline backend that treats each audio chunk as UTF-8 text (for tests and local dev)
+"""
+import os
+import asyncio
+import json
+from abc import ABC, abstractmethod
+from typing import AsyncIterator, List
+from urllib.parse import urlencode
+
+from deepgram_utils import DEEPGRAM_API_KEY, DEEPGRAM_API_URL, DEEPGRAM_CONNECT_TIMEOUT_SECONDS
+
+STREAMING_STT_BACKEND = os.getenv("STREAMING_STT_BACKEND", "deepgram")
+DEEPGRAM_STREAMING_URL = os.getenv(
+    "DEEPGRAM_STREAMING_URL",
+    DEEPGRAM_API_URL.replace("https://", "wss://").replace("http://", "ws://")
+)
+# Silence (ms) after which Deepgram reports the end of speech
+STREAMING_ENDPOINTING_MS = int(os.getenv("STREAMING_ENDPOINTING_MS", "500"))
+
+STREAMING_OPTIONS = {
+    "model": "nova-2",
+    "smart_format": "true",
+    "language": "en",
+    "punctuate": "true",
+    "interim_results": "true",
+    "endpointing": str(STREAMING_ENDPOINTING_MS),
+}
+
+
+class StreamingSession(ABC):
+    """Interface implemented by every streaming backend"""
+
+    @abstractmethod
+    async def send_audio(self, chunk: bytes) -> None:
+        """Forward one chunk of audio"""
+
+    @abstractmethod
+    async def finish(self) -> None:
+        """Signal that no more audio will be sent"""
+
+    @abstractmethod
+    def events(self) -> AsyncIterator[dict]:
+        """Partial transcripts followed by one final transcript"""
+
+    @abstractmethod
+    async def close(self) -> None:
+        """Release the connection"""
+
+
+def _final_event(segments: List[str], confidences: List[float]) -> dict:
+    return {
+        "type": "final",
+        "transcript": " ".join(segments),
+        "confidence": sum(confidences) / len(confidences) if confidences else 0.0,
+    }
+
+
+class DeepgramStreamingSession(StreamingSession):
+    """Relays audio to Deepgram's live transcription WebSocket"""
+
+    def __init__(self, websocket):
+        self._ws = websocket
+
+    @classmethod
+    async def open(cls) -> "DeepgramStreamingSession":
+        if not DEEPGRAM_API_KEY:
+            raise RuntimeError("Live transcription not available (API key not configured)")
+
+        # websockets >= 13 renamed extra_headers to additional_headers
+        try:
+            from websockets.asyncio.client import connect
+            header_arg = "additional_headers"
+        except ImportError:
+            from websockets import connect
+            header_arg = "extra_headers"
+
+        websocket = await connect(
+            f"{DEEPGRAM_STREAMING_URL}/v1/listen?{urlencode(STREAMING_OPTIONS)}",
+            open_timeout=DEEPGRAM_CONNECT_TIMEOUT_SECONDS,
+            **{header_arg: {"Authorization": f"Token {DEEPGRAM_API_KEY}"}},
+        )
+        return cls(websocket)
+
+    async def send_audio(self, chunk: bytes) -> None:
+        await self._ws.send(chunk)
+
+    async def finish(self) -> None:
+        # Deepgram flushes pending results and then closes the stream
+        await self._ws.send(json.dumps({"type": "CloseStream"}))
+
+    async def events(self) -> AsyncIterator[dict]:
+        segments, confidences = [], []
+
+        async for message in self._ws:
+            if isinstance(message, bytes):
+                continue
+            data = json.loads(message)
+            if data.get("type") != "Results":
+                continue
+
+            alternatives = data.get("channel", {}).get("alternatives") or [{}]
+            transcript = alternatives[0].get("transcript") or ""
+
+            if not data.get("is_final"):
+                # Interim hypothesis for the current segment
+                yield {"type": "partial", "transcript": " ".join(segments + [transcript]).strip()}
+                continue
+
+            if transcript:
+                segments.append(transcript)
+                confidences.append(alternatives[0].get("confidence") or 0.0)
+                yield {"type": "partial", "transcript": " ".join(segments)}
+
+            # Endpointing detected the end of speech: answer is complete
+            if data.get("speech_final") and segments:
+                yield _final_event(segments, confidences)
+                return
+
+        yield _final_event(segments, confidences)
+
+    async def close(self) -> None:
+        await self._ws.close()
+
+
+class FakeStreamingSession(StreamingSession):
+    """
+    Offline stand-in for a streaming STT service
+    Each audio chunk is decoded as UTF-8 text and appended to the transcript,
+    producing one partial per chunk and a final when the stream finishes
+    """
+
+    def __init__(self):
+        self._queue = asyncio.Queue()
+
+    @classmethod
+    async def open(cls) -> "FakeStreamingSession":
+        return cls()
+
+    async def send_audio(self, chunk: bytes) -> None:
+        await self._queue.put(chunk.decode("utf-8", errors="ignore"))
+
+    async def finish(self) -> None:
+        await self._queue.put(None)
+
+    async def events(self) -> AsyncIterator[dict]:
+        words = []
+        while True:
+            text = await self._queue.get()
+            if text is None:
+                break
+            if text.strip():
+                words.append(text.strip())
+                yield {"type": "partial", "transcript": " ".join(words)}
+        yield _final_event([" ".join(words)] if words else [], [1.0] if words else [])
+
+    async def close(self) -> None:
+        pass
+
+
+BACKENDS = {
+    "deepgram": DeepgramStreamingSession,
+    "fake": FakeStreamingSession,
+}
+
+
+async def open_streaming_session(backend: str = STREAMING_STT_BACKEND) -> StreamingSession:
+    """Open a live transcription session on the configured backend"""
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown streaming STT backend '{backend}'; choose one of {sorted(BACKENDS)}")
+    return await BACKENDS[backend].open()
@@ -0,0 +1,179 @@
+"""
+Content-addressed cache for transcription results
+
+Clients on flaky networks retry uploads with identical audio. Results are
+keyed by a hash of the decoded audio bytes plus the transcription options,
+so a retry is served without another upstream call:
+
+- memory tier: bounded LRU with TTL
+- disk tier (optional, TRANSCRIPTION_CACHE_DIR): one JSON file per key, TTL checked on read
+- single-flight: concurrent requests for the same key share one upstream call
+"""
+import os
+import asyncio
+import hashlib
+import json
+import time
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from cache_utils import TTLCache
+
+TRANSCRIPTION_CACHE_SIZE = int(os.getenv("TRANSCRIPTION_CACHE_SIZE", "512"))
+TRANSCRIPTION_CACHE_TTL_SECONDS = float(os.getenv("TRANSCRIPTION_CACHE_TTL_SECONDS", "3600"))
+TRANSCRIPTION_CACHE_DIR = os.getenv("TRANSCRIPTION_CACHE_DIR")  # Unset disables the disk tier
+
+# Expired disk entries are swept after this many writes
+_DISK_PRUNE_EVERY = 100
+
+
+def cache_key(audio_bytes: bytes, options: Dict) -> str:
+    """SHA-256 of the audio and the (order-independent) transcription options"""
+    digest = hashlib.sha256(audio_bytes)
+    digest.update(json.dumps(options, sort_keys=True).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class TranscriptionCache:
+    def __init__(
+        self,
+        maxsize: int = TRANSCRIPTION_CACHE_SIZE,
+        ttl: float = TRANSCRIPTION_CACHE_TTL_SECONDS,
+        directory: Optional[str] = TRANSCRIPTION_CACHE_DIR
+    ):
+        self.memory = TTLCache(maxsize, ttl)
+        self.ttl = ttl
+        self.directory = directory
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._disk_writes = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.shared = 0
+        self.errors = 0
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _read_disk(self, key: str) -> Optional[Tuple[str, float]]:
+        try:
+            with open(self._path(key)) as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if entry["created"] + self.ttl <= time.time():
+            self._remove(self._path(key))
+            return None
+        return entry["transcript"], entry["confidence"]
+
+    def _write_disk(self, key: str, result: Tuple[str, float]) -> None:
+        # Write then rename, so readers never see a partial file
+        temp_path = f"{self._path(key)}.{os.getpid()}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump({"created": time.time(), "transcript": result[0], "confidence": result[1]}, f)
+        os.replace(temp_path, self._path(key))
+
+        self._disk_writes += 1
+        if self._disk_writes % _DISK_PRUNE_EVERY == 0:
+            self._prune_disk()
+
+    def _prune_disk(self) -> None:
+        cutoff = time.time() - self.ttl
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    self._remove(path)
+            except OSError:
+                pass
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    async def get_or_transcribe(
+        self,
+        key: str,
+        transcribe: Callable[[], Awaitable[Tuple[str, float]]]
+    ) -> Tuple[str, float]:
+        """
+        Return the cached result for key, or run transcribe() once and cache it
+        Failures propagate to every waiting caller and are not cached; if the
+        caller running transcribe() is cancelled, a waiting caller takes over
+        """
+        while True:
+            result = self.memory.get(key)
+            if result is not None:
+                return result
+
+            inflight = self._inflight.get(key)
+            if inflight is None:
+                break
+
+            # Another request is already transcribing this audio: wait for it
+            self.shared += 1
+            try:
+                return await asyncio.shield(inflight)
+            except asyncio.CancelledError:
+                # Only this caller's own cancellation propagates; when the
+                # leader's request went away, retry (the first waiter to get
+                # here becomes the new leader)
+                if not inflight.cancelled() or asyncio.current_task().cancelling():
+                    raise
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            if self.directory:
+                result = await asyncio.to_thread(self._read_disk, key)
+                if result is not None:
+                    self.disk_hits += 1
+
+            if result is None:
+                self.misses += 1
+                result = await transcribe()
+                if self.directory:
+                    try:
+                        await asyncio.to_thread(self._write_disk, key, result)
+                    except OSError as e:
+                        # A full or read-only disk must not fail the transcription
+                        print(f"Transcription cache write error: {e}")
+
+            self.memory.set(key, result)
+            future.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            self.errors += 1
+            future.set_exception(e)
+            # Mark retrieved so an unawaited failure doesn't log a warning
+            future.exception()
+            raise
+        finally:
+            del self._inflight[key]
+
+    def get_stats(self) -> Dict:
+        memory = self.memory.get_stats()
+        return {
+            "memory_hits": memory["hits"],
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "shared_inflight": self.shared,
+            "errors": self.errors,
+            "memory_size": memory["size"],
+            "memory_maxsize": memory["maxsize"],
+            "evictions": memory["evictions"],
+            "expirations": memory["expirations"],
+            "disk_enabled": bool(self.directory),
+            "ttl_seconds": self.ttl,
+        }
+
+
+transcription_cache = TranscriptionCache()